@@ -85,6 +85,22 @@ class ir_translation(osv.Model):
         params += ('machine', 'standard', 'ultra', 'pro',)
         return (query, params)
 
+    def _get_catalog_query(self, cr, lang):
+        query, params = super(ir_translation, self)._get_catalog_query(cr, lang)
+        # order translations from best to worst, like _get_source_query
+        query += """
+                    ORDER BY
+                        CASE
+                            WHEN gengo_translation=%s then 10
+                            WHEN gengo_translation=%s then 20
+                            WHEN gengo_translation=%s then 30
+                            WHEN gengo_translation=%s then 40
+                            ELSE 0
+                        END DESC
+                 """
+        params += ('machine', 'standard', 'ultra', 'pro',)
+        return (query, params)
+
     @api.model
     def _get_terms_query(self, field, records):
         query, params = super(ir_translation, self)._get_terms_query(field, records)
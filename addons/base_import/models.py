@@ -1,3 +1,4 @@
+import bisect
 import csv
 import datetime
 import io
@@ -5,6 +6,7 @@ import itertools
 import logging
 import operator
 import os
+import time
 
 from openerp.tools.mimetypes import guess_mimetype
 
@@ -60,8 +62,16 @@ class ir_import(orm.TransientModel):
             'File', help="File to check and/or import, raw binary (not base64)"),
         'file_name': fields.char('File Name'),
         'file_type': fields.char(string='File Type'),
+        'imported_rows': fields.integer(
+            'Imported Rows', help="Number of rows already committed by a batched import"),
     }
 
+    def write(self, cr, uid, ids, vals, context=None):
+        # a new file is imported from its start
+        if 'file' in vals:
+            vals = dict(vals, imported_rows=0)
+        return super(ir_import, self).write(cr, uid, ids, vals, context=context)
+
     def get_fields(self, cr, uid, model, context=None,
                    depth=FIELDS_RECURSION_LIMIT):
         """ Recursively get fields for the provided model (through
@@ -430,7 +440,10 @@ class ir_import(orm.TransientModel):
         :param fields: import mapping: maps each column to a field,
                        ``False`` for the columns to ignore
         :type fields: list(str|bool)
-        :param dict options:
+        :param dict options: with the key ``batch_size``, the rows are
+                             imported and committed by batches of about
+                             that many rows (ignored in ``dryrun`` mode),
+                             see :meth:`_import_batches`
         :param bool dryrun: performs all import operations (and
                             validations) but rollbacks writes, allows
                             getting as much errors as possible without
@@ -457,6 +470,11 @@ class ir_import(orm.TransientModel):
                 'record': False,
             }]
 
+        if options.get('batch_size') and not dryrun:
+            return self._import_batches(
+                cr, uid, record, import_fields, data, options['batch_size'],
+                context=context)
+
         _logger.info('importing %d rows...', len(data))
         import_result = self.pool[record.res_model].load(
             cr, uid, import_fields, data, context=context)
@@ -478,3 +496,61 @@ class ir_import(orm.TransientModel):
             pass
 
         return import_result['messages']
+
+    def _batches(self, model, fields, data, size):
+        """ Split the rows of ``data`` into batches of about ``size`` rows,
+        and return the list of pairs ``(start, stop)`` of their bounds. A
+        batch never splits the rows of a record: the rows that only give
+        values to one2many fields belong to the record above them.
+        """
+        o2m = set(index for index, name in enumerate(fields)
+                  if getattr(model._fields.get(name.split('/')[0]), 'type', None) == 'one2many')
+        others = [index for index in xrange(len(fields)) if index not in o2m]
+        starts = [index for index, row in enumerate(data)
+                  if any(row[i] for i in others) or not any(row[i] for i in o2m)]
+        batches = []
+        start = 0
+        while start < len(data):
+            pos = bisect.bisect_left(starts, start + size)
+            stop = starts[pos] if pos < len(starts) else len(data)
+            batches.append((start, stop))
+            start = stop
+        return batches
+
+    def _import_batches(self, cr, uid, record, fields, data, size, context=None):
+        """ Import ``data`` by batches of about ``size`` rows, and commit
+        after each batch, so that a large file does not hold a single huge
+        transaction. The number of rows committed is saved on ``record``:
+        calling :meth:`do` again resumes the import after them. The import
+        stops at the first batch with errors, which is rolled back.
+
+        :returns: the messages of the batches, with the rows numbered from
+                  the start of the file
+        """
+        model = self.pool[record.res_model]
+        messages = []
+        done = record.imported_rows
+        count = 0
+        t0 = time.time()
+        _logger.info('importing %d rows by batches of %d, from row %d...',
+                     len(data), size, done)
+        for start, stop in self._batches(model, fields, data, size):
+            if stop <= done:
+                continue
+            result = model.load(cr, uid, fields, data[start:stop], context=context)
+            for message in result['messages']:
+                if 'rows' in message:
+                    message['rows'] = {
+                        'from': message['rows']['from'] + start,
+                        'to': message['rows']['to'] + start,
+                    }
+                messages.append(message)
+            if result['ids'] is False:
+                cr.rollback()
+                break
+            self.write(cr, uid, [record.id], {'imported_rows': stop}, context=context)
+            cr.commit()
+            count += stop - start
+            _logger.info('imported %d/%d rows (%.0f rows/s)', stop, len(data),
+                         count / max(time.time() - t0, 1e-3))
+        return messages
@@ -543,3 +543,41 @@ class test_failures(TransactionCase):
             {'headers': True, 'separator': ',', 'quoting': '"'})
         self.assertFalse(
             results, "results should be empty on successful import")
+
+class test_batches(TransactionCase):
+    def test_batches(self):
+        """ A batch does not split the rows of a record """
+        Import = self.registry('base_import.import')
+        model = self.registry('base_import.tests.models.o2m')
+        data = [
+            ['a', '1'],
+            ['', '2'],
+            ['', '3'],
+            ['b', '4'],
+            ['c', ''],
+            ['d', '5'],
+            ['', '6'],
+        ]
+        self.assertEqual(
+            Import._batches(model, ['id', 'value/value'], data, 2),
+            [(0, 3), (3, 5), (5, 7)])
+        self.assertEqual(
+            Import._batches(model, ['id', 'value/value'], data, 100),
+            [(0, 7)])
+
+    def test_prefetch_references(self):
+        Related = self.env['base_import.tests.models.m2o.related']
+        record = Related.create({'value': 1})
+        self.env['ir.model.data'].create({
+            'module': '__import__', 'name': 'related_1',
+            'model': Related._name, 'res_id': record.id,
+        })
+        model = self.registry('base_import.tests.models.m2o')
+        cache = self.env['ir.fields.converter'].with_context(_import_current_module='__import__') \
+            .prefetch_references(model, [['value', 'id']], [['related_1'], ['nope'], ['']])
+        self.assertEqual(cache.keys(), [(Related._name, 'id', 'related_1')])
+        self.assertEqual(cache[(Related._name, 'id', 'related_1')][0], record.id)
+
+        cache = self.env['ir.fields.converter'].prefetch_references(
+            model, [['value', '.id']], [[str(record.id)], ['0'], ['foo']])
+        self.assertEqual(cache.keys(), [(Related._name, '.id', str(record.id))])
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import collections
 import datetime
 import json
 import logging
@@ -16,17 +17,15 @@ _logger = logging.getLogger(__name__)
 # longpolling timeout connection
 TIMEOUT = 50
 
+# number of recent notifications kept in memory per database
+BUFFER_SIZE = 10000
+
 #----------------------------------------------------------
 # Bus
 #----------------------------------------------------------
 def json_dump(v):
     return json.dumps(v, separators=(',', ':'))
 
-def hashable(key):
-    if isinstance(key, list):
-        key = tuple(key)
-    return key
-
 
 class ImBus(models.Model):
 
@@ -60,9 +59,10 @@ class ImBus(models.Model):
             # awakened and will fetch the notification in the bus table. If the
             # transaction is not commited yet, there will be nothing to fetch,
             # and the longpolling will return no notification.
+            dbname = self._cr.dbname
             def notify():
                 with openerp.sql_db.db_connect('postgres').cursor() as cr:
-                    cr.execute("notify imbus, %s", (json_dump(list(channels)),))
+                    cr.execute("notify imbus, %s", (dbname,))
             self._cr.after('commit', notify)
 
     @api.model
@@ -92,22 +92,143 @@ class ImBus(models.Model):
             })
 
         if result or force_status:
-            partner_ids = options.get('bus_presence_partner_ids')
-            if partner_ids:
-                partners = self.env['res.partner'].browse(partner_ids)
-                result += [{
-                    'id': -1,
-                    'channel': (self._cr.dbname, 'bus.presence'),
-                    'message': {'id': r.id, 'im_status': r.im_status}} for r in partners]
+            result += self.poll_status(options)
         return result
 
+    @api.model
+    def poll_status(self, options=None):
+        """ Return the presence notifications of the partners given in
+            ``options``.
+        """
+        partner_ids = (options or {}).get('bus_presence_partner_ids')
+        if not partner_ids:
+            return []
+        partners = self.env['res.partner'].browse(partner_ids)
+        return [{
+            'id': -1,
+            'channel': (self._cr.dbname, 'bus.presence'),
+            'message': {'id': r.id, 'im_status': r.im_status}} for r in partners]
+
 
 #----------------------------------------------------------
 # Dispatcher
 #----------------------------------------------------------
+class NotificationBuffer(object):
+    """ The recent notifications of a database, kept in a ring buffer. The
+        buffer contains all the notifications with an id greater than
+        ``floor``, up to the last one loaded. They are indexed by channel key,
+        so that a request only reads the notifications of its channels.
+    """
+    def __init__(self, dbname, size=BUFFER_SIZE):
+        self.dbname = dbname
+        self.size = size
+        # ids and channel keys of the notifications, in order: [(id, key)]
+        self.rows = collections.deque()
+        # notifications per channel key, in order:
+        # {key: [(id, create date, notification)]}
+        self.channels = {}
+        self.floor = None
+        self.lock = threading.RLock()
+
+    def load(self):
+        """ Load the new notifications from the database, and return their
+            channel keys.
+        """
+        with self.lock:
+            with openerp.sql_db.db_connect(self.dbname).cursor() as cr:
+                return self._load(cr)
+
+    def _load(self, cr):
+        if self.floor is None:
+            # the notifications returned by a first poll
+            cr.execute("SELECT COALESCE(max(id), 0) FROM bus_bus")
+            self.floor, = cr.fetchone()
+            cr.execute("""SELECT id, channel, message, create_date FROM bus_bus
+                          WHERE create_date > (now() at time zone 'UTC') - interval '%s seconds'
+                          ORDER BY id""", (TIMEOUT,))
+        else:
+            last = self.rows[-1][0] if self.rows else self.floor
+            cr.execute("""SELECT id, channel, message, create_date FROM bus_bus
+                          WHERE id > %s ORDER BY id""", (last,))
+        keys = set()
+        for id, channel, message, create_date in cr.fetchall():
+            self.floor = min(self.floor, id - 1)
+            self.rows.append((id, channel))
+            self.channels.setdefault(channel, collections.deque()).append((id, create_date, {
+                'id': id,
+                'channel': json.loads(channel),
+                'message': json.loads(message),
+            }))
+            keys.add(channel)
+            if len(self.rows) > self.size:
+                # drop the oldest notification
+                old_id, old_channel = self.rows.popleft()
+                rows = self.channels[old_channel]
+                rows.popleft()
+                if not rows:
+                    del self.channels[old_channel]
+                self.floor = max(self.floor, old_id)
+        return keys
+
+    def get(self, keys, last):
+        """ Return the notifications for the channel ``keys`` that follow the
+            notification ``last``, or ``None`` if the buffer does not contain
+            all of them.
+        """
+        result = []
+        # the dispatcher thread appends to the buffer meanwhile
+        with self.lock:
+            if last:
+                if self.floor is None or last < self.floor:
+                    return None
+                for key in set(keys):
+                    # the notifications of a channel are ordered by id
+                    for row in reversed(self.channels.get(key, ())):
+                        if row[0] <= last:
+                            break
+                        result.append(row)
+            else:
+                timeout_ago = datetime.datetime.utcnow()-datetime.timedelta(seconds=TIMEOUT)
+                timeout_ago = timeout_ago.strftime(DEFAULT_SERVER_DATETIME_FORMAT)
+                for key in set(keys):
+                    result.extend(row for row in self.channels.get(key, ()) if row[1] > timeout_ago)
+        result.sort(key=lambda row: row[0])
+        return [row[2] for row in result]
+
+
 class ImDispatch(object):
+    """ Answer the long polling requests from the notifications of the
+        :class:`NotificationBuffer` of their database, which are loaded once
+        per batch of postgres notifications, instead of querying ``bus.bus``
+        for every request.
+    """
     def __init__(self):
-        self.channels = {}
+        self.buffers = {}               # {dbname: NotificationBuffer}
+        self.waiters = {}               # {(dbname, channel key): [event]}
+
+    def buffer(self, dbname):
+        """ Return the buffer of ``dbname``, loaded. """
+        buf = self.buffers.get(dbname)
+        if buf is None:
+            buf = NotificationBuffer(dbname)
+            buf.load()
+            buf = self.buffers.setdefault(dbname, buf)
+        return buf
+
+    def _notifications(self, dbname, channels, last, options, force_status=False):
+        """ Return the notifications for ``channels`` after ``last``, from
+            the buffer if possible, followed by the presence notifications.
+        """
+        registry = openerp.registry(dbname)
+        keys = [json_dump(c) for c in channels]
+        notifications = self.buffer(dbname).get(keys, last)
+        if notifications is None:
+            with registry.cursor() as cr:
+                return registry['bus.bus'].poll(cr, openerp.SUPERUSER_ID, channels, last, options, force_status)
+        if (notifications or force_status) and (options or {}).get('bus_presence_partner_ids'):
+            with registry.cursor() as cr:
+                notifications += registry['bus.bus'].poll_status(cr, openerp.SUPERUSER_ID, options)
+        return notifications
 
     def poll(self, dbname, channels, last, options=None, timeout=TIMEOUT):
         if options is None:
@@ -121,25 +242,51 @@ class ImDispatch(object):
             # rename the thread to avoid tests waiting for a longpolling
             current.setName("openerp.longpolling.request.%s" % current.ident)
 
-        registry = openerp.registry(dbname)
-
         # immediatly returns if past notifications exist
-        with registry.cursor() as cr:
-            notifications = registry['bus.bus'].poll(cr, openerp.SUPERUSER_ID, channels, last, options)
+        notifications = self._notifications(dbname, channels, last, options)
         # or wait for future ones
         if not notifications:
             event = self.Event()
-            for channel in channels:
-                self.channels.setdefault(hashable(channel), []).append(event)
+            keys = [(dbname, json_dump(c)) for c in channels]
+            for key in keys:
+                self.waiters.setdefault(key, []).append(event)
             try:
                 event.wait(timeout=timeout)
-                with registry.cursor() as cr:
-                    notifications = registry['bus.bus'].poll(cr, openerp.SUPERUSER_ID, channels, last, options, force_status=True)
+            finally:
+                for key in keys:
+                    events = self.waiters.get(key)
+                    if events and event in events:
+                        events.remove(event)
+                        if not events:
+                            del self.waiters[key]
+            try:
+                notifications = self._notifications(dbname, channels, last, options, force_status=True)
             except Exception:
-                # timeout
-                pass
+                _logger.exception("Bus.poll error")
         return notifications
 
+    def stats(self):
+        """ Return the number of buffered notifications and of waiting
+            requests.
+        """
+        return sum(len(buf.rows) for buf in self.buffers.values()), \
+            sum(len(events) for events in self.waiters.values())
+
+    def notify(self, dbnames):
+        """ Load the new notifications of ``dbnames``, and wake up the
+            requests waiting for them.
+        """
+        events = set()
+        for dbname in dbnames:
+            buf = self.buffers.get(dbname)
+            if buf is None:
+                # no request is waiting on this database
+                continue
+            for key in buf.load():
+                events.update(self.waiters.pop((dbname, key), ()))
+        for event in events:
+            event.set()
+
     def loop(self):
         """ Dispatch postgres notifications to the relevant polling threads/greenlets """
         _logger.info("Bus.loop listen imbus on db postgres")
@@ -152,15 +299,11 @@ class ImDispatch(object):
                     pass
                 else:
                     conn.poll()
-                    channels = []
+                    # coalesce the notifications received meanwhile
+                    dbnames = set()
                     while conn.notifies:
-                        channels.extend(json.loads(conn.notifies.pop().payload))
-                    # dispatch to local threads/greenlets
-                    events = set()
-                    for channel in channels:
-                        events.update(self.channels.pop(hashable(channel), []))
-                    for event in events:
-                        event.set()
+                        dbnames.add(conn.notifies.pop().payload)
+                    self.notify(dbnames)
 
     def run(self):
         while True:
@@ -177,7 +320,8 @@ class ImDispatch(object):
             self.Event = gevent.event.Event
             gevent.spawn(self.run)
         elif openerp.multi_process:
-            # disabled in prefork mode
+            # disabled in the prefork HTTP workers: the long polling requests
+            # are served by the evented process (see openerp-gevent)
             return
         else:
             # threaded mode
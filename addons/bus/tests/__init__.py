@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+import test_notification_buffer
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from openerp.tests import common
+
+from ..models.bus import NotificationBuffer
+
+
+class TestNotificationBuffer(common.TransactionCase):
+
+    def setUp(self):
+        super(TestNotificationBuffer, self).setUp()
+        self.Bus = self.env['bus.bus']
+
+    def send(self, channel, message):
+        self.Bus.sendone(channel, message)
+        return self.Bus.search([], order='id desc', limit=1).id
+
+    def messages(self, notifications):
+        return [notif['message'] for notif in notifications]
+
+    def test_load_get(self):
+        id_0 = self.send('buffer_z', 'z0')
+        buf = NotificationBuffer(self.cr.dbname)
+        buf._load(self.cr)
+        self.assertLess(buf.floor, id_0)
+        self.send('buffer_a', 'a1')
+        self.send('buffer_b', 'b1')
+        id_a2 = self.send('buffer_a', 'a2')
+
+        keys = buf._load(self.cr)
+        self.assertEqual(keys, set(['"buffer_a"', '"buffer_b"']))
+        self.assertLess(buf.floor, id_0)
+
+        # the notifications of the channels, in order
+        self.assertEqual(self.messages(buf.get(['"buffer_a"'], id_0)), ['a1', 'a2'])
+        self.assertEqual(self.messages(buf.get(['"buffer_a"', '"buffer_b"'], id_0)), ['a1', 'b1', 'a2'])
+        self.assertEqual(buf.get(['"buffer_a"'], id_a2), [])
+        self.assertEqual(buf.get(['"buffer_c"'], id_0), [])
+
+        # a first poll returns the recent notifications
+        self.assertEqual(self.messages(buf.get(['"buffer_z"', '"buffer_b"'], 0)), ['z0', 'b1'])
+
+        # nothing new
+        self.assertEqual(buf._load(self.cr), set())
+
+    def test_overflow(self):
+        id_0 = self.send('buffer_z', 'z0')
+        buf = NotificationBuffer(self.cr.dbname, size=2)
+        buf._load(self.cr)
+        id_1 = self.send('buffer_a', 'a1')
+        id_2 = self.send('buffer_b', 'b1')
+        self.send('buffer_a', 'a2')
+        buf._load(self.cr)
+
+        # the oldest notifications were dropped, and the floor moved up
+        self.assertEqual(len(buf.rows), 2)
+        self.assertEqual(buf.floor, id_1)
+        self.assertNotIn('"buffer_z"', buf.channels)
+        self.assertEqual(self.messages(buf.get(['"buffer_a"', '"buffer_b"'], id_1)), ['b1', 'a2'])
+        self.assertEqual(self.messages(buf.get(['"buffer_a"'], id_2)), ['a2'])
+
+        # the requests whose last notification is below the floor are not
+        # answered from the buffer, but from the database
+        self.assertIsNone(buf.get(['"buffer_a"'], id_0))
+        notifications = self.Bus.poll(['buffer_a'], id_0)
+        self.assertEqual(self.messages(notifications), ['a1', 'a2'])
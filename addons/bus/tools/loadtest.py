@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Load test of the long polling bus.
+
+Simulate N clients polling their own channel on a running server, while a
+sender posts a message on a random channel at a given rate. The latency of
+the messages and the rate of the polls are reported at the end::
+
+    python loadtest.py --url http://localhost:8072 --db mydb --clients 1000
+
+Use the url of the longpolling port in prefork mode. With ``--gevent``,
+the clients are greenlets instead of threads, which allows many more of
+them.
+"""
+import cookielib
+import json
+import optparse
+import random
+import threading
+import time
+import urllib2
+
+
+class Client(object):
+    def __init__(self, url, db):
+        self.url = url
+        self.opener = urllib2.build_opener(urllib2.HTTPCookieProcessor(cookielib.CookieJar()))
+        # select the database in the session
+        self.opener.open('%s/web/login?db=%s' % (url, db)).read()
+
+    def call(self, path, **params):
+        data = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params})
+        request = urllib2.Request(self.url + path, data, {'Content-Type': 'application/json'})
+        response = json.loads(self.opener.open(request).read())
+        if 'error' in response:
+            raise Exception(response['error'])
+        return response['result']
+
+
+class Stats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.polls = 0
+        self.errors = 0
+        self.latencies = []
+
+    def add(self, polls=0, errors=0, latencies=()):
+        with self.lock:
+            self.polls += polls
+            self.errors += errors
+            self.latencies.extend(latencies)
+
+
+def poller(opts, number, stats, stop):
+    channel = 'loadtest-%d' % number
+    try:
+        client = Client(opts.url, opts.db)
+    except Exception:
+        stats.add(errors=1)
+        return
+    last = 0
+    while not stop.is_set():
+        try:
+            notifications = client.call('/longpolling/poll', channels=[channel], last=last)
+        except Exception:
+            stats.add(errors=1)
+            time.sleep(1)
+            continue
+        now = time.time()
+        latencies = [now - notif['message'] for notif in notifications
+                     if notif['id'] > 0 and notif['channel'] == channel]
+        last = max([last] + [notif['id'] for notif in notifications])
+        stats.add(polls=1, latencies=latencies)
+
+
+def sender(opts, stats, stop):
+    client = Client(opts.url, opts.db)
+    while not stop.is_set():
+        channel = 'loadtest-%d' % random.randrange(opts.clients)
+        try:
+            client.call('/longpolling/send', channel=channel, message=time.time())
+        except Exception:
+            stats.add(errors=1)
+        time.sleep(1.0 / opts.rate)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--url', default='http://localhost:8072')
+    parser.add_option('--db')
+    parser.add_option('--clients', type='int', default=100)
+    parser.add_option('--rate', type='float', default=10.0, help="messages sent per second")
+    parser.add_option('--duration', type='float', default=60.0, help="in seconds")
+    parser.add_option('--gevent', action='store_true', help="use greenlets for the clients")
+    opts, _ = parser.parse_args()
+    if not opts.db:
+        parser.error("--db is required")
+    if opts.gevent:
+        import gevent.monkey
+        gevent.monkey.patch_all()
+
+    stats = Stats()
+    stop = threading.Event()
+    threads = [threading.Thread(target=poller, args=(opts, n, stats, stop)) for n in xrange(opts.clients)]
+    threads.append(threading.Thread(target=sender, args=(opts, stats, stop)))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    time.sleep(opts.duration)
+    stop.set()
+
+    latencies = stats.latencies
+    print "clients: %d, duration: %.0fs" % (opts.clients, opts.duration)
+    print "polls: %d (%.1f/s), errors: %d" % (stats.polls, stats.polls / opts.duration, stats.errors)
+    print "messages received: %d, latency p50: %.3fs, p95: %.3fs, max: %.3fs" % (
+        len(latencies), percentile(latencies, 0.5), percentile(latencies, 0.95),
+        max(latencies) if latencies else 0.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -148,6 +148,8 @@ class mrp_bom(osv.osv):
     _name = 'mrp.bom'
     _description = 'Bill of Material'
     _inherit = ['mail.thread']
+    # the explosions of BoMs are searched under the record rules
+    _cache_groups = {'boms': ('rules',)}
 
     _columns = {
         'code': fields.char('Reference', size=16),
@@ -279,10 +281,127 @@ class mrp_bom(osv.osv):
         @return: result: List of dictionaries containing product details.
                  result2: List of dictionaries containing Work Center details.
         """
+        graph = self._bom_graph_get(cr, uid, bom, product, properties, routing_id=routing_id,
+                                    previous_products=previous_products, master_bom=master_bom, context=context)
+        return self._bom_graph_eval(cr, uid, [(graph, factor, level)], context=context)[0]
+
+    def _bom_explode_multi(self, cr, uid, explosions, context=None):
+        """ Explodes several BoMs at once.
+        @param explosions: List of tuples (bom, product, factor, properties, routing_id),
+                           with the same meaning as the parameters of _bom_explode.
+        @return: List of pairs (result, result2), as returned by _bom_explode, in the
+                 order of explosions.
+        """
+        graphs = [
+            (self._bom_graph_get(cr, uid, bom, product, properties, routing_id=routing_id, context=context), factor, 0)
+            for bom, product, factor, properties, routing_id in explosions
+        ]
+        return self._bom_graph_eval(cr, uid, graphs, context=context)
+
+    def _bom_requirements(self, cr, uid, explosions, context=None):
+        """ Aggregates the components needed by several BoM explosions.
+        @param explosions: List of tuples, see _bom_explode_multi.
+        @return: Dictionary {(product_id, product_uom): quantity}.
+        """
+        requirements = OrderedDict()
+        for result, _result2 in self._bom_explode_multi(cr, uid, explosions, context=context):
+            for line in result:
+                key = (line['product_id'], line['product_uom'])
+                requirements[key] = requirements.get(key, 0.0) + line['product_qty']
+        return requirements
+
+    def _bom_graph_get(self, cr, uid, bom, product, properties, routing_id=False, previous_products=None, master_bom=None, context=None):
+        """ Returns the explosion graph of a BoM, see _bom_explode_graph. """
+        return self._bom_explode_graph(
+            cr, uid, bom.id, product.id if product else False,
+            tuple(sorted(set(properties or []))), routing_id or False,
+            tuple(previous_products or []), (context or {}).get('company_id') or False,
+            time.strftime(DEFAULT_SERVER_DATE_FORMAT),
+            master_bom_id=master_bom.id if master_bom else False)
+
+    @tools.ormcache('uid', 'bom_id', 'product_id', 'properties', 'routing_id', 'previous_products', 'company_id', 'date', group='boms')
+    def _bom_explode_graph(self, cr, uid, bom_id, product_id, properties, routing_id, previous_products, company_id, date, master_bom_id=False):
+        """ Returns the structure of the explosion of a BoM, independently of the
+        quantity to produce: the BoM lines to consume, and for each line of a
+        phantom BoM, the graph of that BoM. The graph only contains ids and
+        numbers; it is cached until a BoM or a BoM line is modified, and must
+        not be modified.
+        @param date: The date the BoMs and their lines must be valid at.
+        @return: Dictionary with the keys 'bom_id', 'efficiency', 'rounding',
+                 'routing_id', 'lines' (list of tuples (line_id, product_qty,
+                 product_efficiency, product_rounding, graph or None)),
+                 'bom_ids' and 'line_ids' (all the BoMs and lines of the graph).
+        """
+        context = {'company_id': company_id} if company_id else {}
+        bom = self.browse(cr, uid, bom_id, context=context)
+        product = self.pool['product.product'].browse(cr, uid, product_id, context=context)
+        master_bom = self.browse(cr, uid, master_bom_id or bom_id, context=context)
+        graph = self._bom_graph_build(cr, uid, bom, product, list(properties), routing_id,
+                                      list(previous_products), master_bom, {}, context=context)
+        bom_ids, line_ids = set(), set()
+        todo = [graph]
+        while todo:
+            node = todo.pop()
+            bom_ids.add(node['bom_id'])
+            for line in node['lines']:
+                line_ids.add(line[0])
+                if line[4]:
+                    todo.append(line[4])
+        graph['bom_ids'] = sorted(bom_ids)
+        graph['line_ids'] = sorted(line_ids)
+        return graph
+
+    def _bom_graph_build(self, cr, uid, bom, product, properties, routing_id, previous_products, master_bom, bom_found, context=None):
+        """ Builds the graph of a BoM, see _bom_explode_graph.
+        @param bom_found: Dictionary {product_id: bom_id} of the BoMs already found
+                          for the components of the graph.
+        """
+        node = {
+            'bom_id': bom.id,
+            'efficiency': bom.product_efficiency,
+            'rounding': bom.product_rounding,
+            'routing_id': routing_id or bom.routing_id.id or False,
+            'lines': [],
+        }
+        for bom_line_id in bom.bom_line_ids:
+            if self._skip_bom_line(cr, uid, bom_line_id, product, context=context):
+                continue
+            if set(map(int, bom_line_id.property_ids or [])) - set(properties or []):
+                continue
+
+            if previous_products and bom_line_id.product_id.product_tmpl_id.id in previous_products:
+                raise UserError(_('BoM "%s" contains a BoM line with a product recursion: "%s".') % (master_bom.code or "", bom_line_id.product_id.name_get()[0][1]))
+
+            line_product = bom_line_id.product_id
+            if line_product.id not in bom_found:
+                bom_found[line_product.id] = self._bom_find(cr, uid, product_id=line_product.id, properties=properties, context=context)
+            bom_id = bom_found[line_product.id]
+
+            #If BoM should not behave like kit, just add the product, otherwise explode further
+            child = None
+            if bom_id and self.browse(cr, uid, bom_id, context=context).type == "phantom":
+                all_prod = [bom.product_tmpl_id.id] + (previous_products or [])
+                bom2 = self.browse(cr, uid, bom_id, context=context)
+                child = self._bom_graph_build(cr, uid, bom2, line_product, properties, False,
+                                              all_prod, master_bom, bom_found, context=context)
+            node['lines'].append((bom_line_id.id, bom_line_id.product_qty,
+                                  bom_line_id.product_efficiency, bom_line_id.product_rounding, child))
+        return node
+
+    def _bom_graph_eval(self, cr, uid, graphs, context=None):
+        """ Computes the products and work centers of several explosions.
+        @param graphs: List of tuples (graph, factor, level).
+        @return: List of pairs (result, result2), see _bom_explode.
+        """
         uom_obj = self.pool.get("product.uom")
         routing_obj = self.pool.get('mrp.routing')
-        master_bom = master_bom or bom
-
+        bom_ids, line_ids = set(), set()
+        for explosion in graphs:
+            bom_ids.update(explosion[0]['bom_ids'])
+            line_ids.update(explosion[0]['line_ids'])
+        # browse all the records together, so that they are read together
+        boms = dict((b.id, b) for b in self.browse(cr, uid, sorted(bom_ids), context=context))
+        lines = dict((l.id, l) for l in self.pool['mrp.bom.line'].browse(cr, uid, sorted(line_ids), context=context))
 
         def _factor(factor, product_efficiency, product_rounding):
             factor = factor / (product_efficiency or 1.0)
@@ -294,45 +413,37 @@ class mrp_bom(osv.osv):
                 factor = product_rounding
             return factor
 
-        factor = _factor(factor, bom.product_efficiency, bom.product_rounding)
-
-        result = []
-        result2 = []
-
-        routing = (routing_id and routing_obj.browse(cr, uid, routing_id)) or bom.routing_id or False
-        if routing:
-            for wc_use in routing.workcenter_lines:
-                result2.append(self._prepare_wc_line(
-                    cr, uid, bom, wc_use, level=level, factor=factor,
-                    context=context))
-
-        for bom_line_id in bom.bom_line_ids:
-            if self._skip_bom_line(cr, uid, bom_line_id, product, context=context):
-                continue
-            if set(map(int, bom_line_id.property_ids or [])) - set(properties or []):
-                continue
-
-            if previous_products and bom_line_id.product_id.product_tmpl_id.id in previous_products:
-                raise UserError(_('BoM "%s" contains a BoM line with a product recursion: "%s".') % (master_bom.code or "", bom_line_id.product_id.name_get()[0][1]))
-
-            quantity = _factor(bom_line_id.product_qty * factor, bom_line_id.product_efficiency, bom_line_id.product_rounding)
-            bom_id = self._bom_find(cr, uid, product_id=bom_line_id.product_id.id, properties=properties, context=context)
+        def _eval(node, factor, level):
+            bom = boms[node['bom_id']]
+            factor = _factor(factor, node['efficiency'], node['rounding'])
+
+            result = []
+            result2 = []
+
+            if node['routing_id']:
+                routing = routing_obj.browse(cr, uid, node['routing_id'])
+                for wc_use in routing.workcenter_lines:
+                    result2.append(self._prepare_wc_line(
+                        cr, uid, bom, wc_use, level=level, factor=factor,
+                        context=context))
+
+            for line_id, product_qty, product_efficiency, product_rounding, child in node['lines']:
+                bom_line_id = lines[line_id]
+                quantity = _factor(product_qty * factor, product_efficiency, product_rounding)
+                if child is None:
+                    result.append(self._prepare_consume_line(
+                        cr, uid, bom_line_id, quantity, context=context))
+                else:
+                    bom2 = boms[child['bom_id']]
+                    # We need to convert to units/UoM of chosen BoM
+                    factor2 = uom_obj._compute_qty_obj(cr, uid, bom_line_id.product_uom, quantity, bom2.product_uom) if quantity else quantity
+                    quantity2 = factor2 / bom2.product_qty
+                    res = _eval(child, quantity2, level + 10)
+                    result = result + res[0]
+                    result2 = result2 + res[1]
+            return result, result2
 
-            #If BoM should not behave like kit, just add the product, otherwise explode further
-            if (not bom_id) or (self.browse(cr, uid, bom_id, context=context).type != "phantom"):
-                result.append(self._prepare_consume_line(
-                    cr, uid, bom_line_id, quantity, context=context))
-            else:
-                all_prod = [bom.product_tmpl_id.id] + (previous_products or [])
-                bom2 = self.browse(cr, uid, bom_id, context=context)
-                # We need to convert to units/UoM of chosen BoM
-                factor2 = uom_obj._compute_qty(cr, uid, bom_line_id.product_uom.id, quantity, bom2.product_uom.id)
-                quantity2 = factor2 / bom2.product_qty
-                res = self._bom_explode(cr, uid, bom2, bom_line_id.product_id, quantity2,
-                    properties=properties, level=level + 10, previous_products=all_prod, master_bom=master_bom, context=context)
-                result = result + res[0]
-                result2 = result2 + res[1]
-        return result, result2
+        return [_eval(graph, factor, level) for graph, factor, level in graphs]
 
     def copy_data(self, cr, uid, id, default=None, context=None):
         if default is None:
@@ -352,9 +463,18 @@ class mrp_bom(osv.osv):
             res['value'].update({'product_uom': product.uom_id.id})
         return res
 
+    def create(self, cr, uid, values, context=None):
+        self.pool.clear_cache('boms')
+        return super(mrp_bom, self).create(cr, uid, values, context=context)
+
+    def write(self, cr, uid, ids, values, context=None):
+        self.pool.clear_cache('boms')
+        return super(mrp_bom, self).write(cr, uid, ids, values, context=context)
+
     def unlink(self, cr, uid, ids, context=None):
         if self.pool['mrp.production'].search(cr, uid, [('bom_id', 'in', ids), ('state', 'not in', ['done', 'cancel'])], context=context):
             raise UserError(_('You can not delete a Bill of Material with running manufacturing orders.\nPlease close or cancel it first.'))
+        self.pool.clear_cache('boms')
         return super(mrp_bom, self).unlink(cr, uid, ids, context=context)
 
     def onchange_product_tmpl_id(self, cr, uid, ids, product_tmpl_id, product_qty=0, context=None):
@@ -438,8 +558,17 @@ class mrp_bom_line(osv.osv):
         product_obj = self.pool.get('product.product')
         if 'product_id' in values and not 'product_uom' in values:
             values['product_uom'] = product_obj.browse(cr, uid, values.get('product_id'), context=context).uom_id.id
+        self.pool.clear_cache('boms')
         return super(mrp_bom_line, self).create(cr, uid, values, context=context)
 
+    def write(self, cr, uid, ids, values, context=None):
+        self.pool.clear_cache('boms')
+        return super(mrp_bom_line, self).write(cr, uid, ids, values, context=context)
+
+    def unlink(self, cr, uid, ids, context=None):
+        self.pool.clear_cache('boms')
+        return super(mrp_bom_line, self).unlink(cr, uid, ids, context=context)
+
     def onchange_uom(self, cr, uid, ids, product_id, product_uom, context=None):
         res = {'value': {}}
         if not product_uom or not product_id:
@@ -702,7 +831,10 @@ class mrp_production(osv.osv):
         return {'value': result}
 
 
-    def _prepare_lines(self, cr, uid, production, properties=None, context=None):
+    def _prepare_explosion(self, cr, uid, production, properties=None, context=None):
+        """ Returns the parameters of the explosion of the BoM of a production,
+        as a tuple (bom, product, factor, properties, routing_id) for
+        mrp.bom._bom_explode_multi. """
         # search BoM structure and route
         bom_obj = self.pool.get('mrp.bom')
         uom_obj = self.pool.get('product.uom')
@@ -720,9 +852,23 @@ class mrp_production(osv.osv):
 
         # get components and workcenter_lines from BoM structure
         factor = uom_obj._compute_qty(cr, uid, production.product_uom.id, production.product_qty, bom_point.product_uom.id)
+        return (bom_point, production.product_id, factor / bom_point.product_qty, properties, production.routing_id.id)
+
+    def _prepare_lines(self, cr, uid, production, properties=None, context=None):
         # product_lines, workcenter_lines
-        return bom_obj._bom_explode(cr, uid, bom_point, production.product_id, factor / bom_point.product_qty, properties, routing_id=production.routing_id.id, context=context)
+        explosion = self._prepare_explosion(cr, uid, production, properties=properties, context=context)
+        return self.pool['mrp.bom']._bom_explode_multi(cr, uid, [explosion], context=context)[0]
 
+    def _get_component_requirements(self, cr, uid, ids, properties=None, context=None):
+        """ Computes the components needed by several production orders, with
+        their BoMs exploded at once.
+        @return: Dictionary {(product_id, product_uom): quantity}
+        """
+        explosions = [
+            self._prepare_explosion(cr, uid, production, properties=properties, context=context)
+            for production in self.browse(cr, uid, ids, context=context)
+        ]
+        return self.pool['mrp.bom']._bom_requirements(cr, uid, explosions, context=context)
 
     def _action_compute_lines(self, cr, uid, ids, properties=None, context=None):
         """ Compute product_lines and workcenter_lines from BoM structure
@@ -733,13 +879,20 @@ class mrp_production(osv.osv):
         results = []
         prod_line_obj = self.pool.get('mrp.production.product.line')
         workcenter_line_obj = self.pool.get('mrp.production.workcenter.line')
-        for production in self.browse(cr, uid, ids, context=context):
+        productions = self.browse(cr, uid, ids, context=context)
+        for production in productions:
             #unlink product_lines
             prod_line_obj.unlink(cr, SUPERUSER_ID, [line.id for line in production.product_lines], context=context)
             #unlink workcenter_lines
             workcenter_line_obj.unlink(cr, SUPERUSER_ID, [line.id for line in production.workcenter_lines], context=context)
 
-            res = self._prepare_lines(cr, uid, production, properties=properties, context=context)
+        # explode the BoMs of all the productions at once
+        explosions = [
+            self._prepare_explosion(cr, uid, production, properties=properties, context=context)
+            for production in productions
+        ]
+        exploded = self.pool['mrp.bom']._bom_explode_multi(cr, uid, explosions, context=context)
+        for production, res in zip(productions, exploded):
             results = res[0] # product_lines
             results2 = res[1] # workcenter_lines
 
@@ -58,6 +58,17 @@ class product_product(osv.osv):
         'mo_count': fields.function(_bom_orders_count, string='# Manufacturing Orders', type='integer'),
     }
 
+    def write(self, cr, uid, ids, values, context=None):
+        # the cached explosions of BoMs depend on the template and the variant
+        # values of the products (see mrp.bom._bom_explode_graph)
+        if 'product_tmpl_id' in values or 'attribute_value_ids' in values:
+            self.pool.clear_cache('boms')
+        return super(product_product, self).write(cr, uid, ids, values, context=context)
+
+    def unlink(self, cr, uid, ids, context=None):
+        self.pool.clear_cache('boms')
+        return super(product_product, self).unlink(cr, uid, ids, context=context)
+
     def action_view_bom(self, cr, uid, ids, context=None):
         result = self.pool.get("product.template")._get_act_window_dict(cr, uid, 'mrp.product_open_bom', context=context)
         templates = [product.product_tmpl_id.id for product in self.browse(cr, uid, ids, context=context)]
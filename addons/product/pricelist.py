@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from itertools import chain
+from collections import OrderedDict
 import time
 
 from openerp import tools
@@ -22,6 +22,8 @@ class product_pricelist(osv.osv):
     _name = "product.pricelist"
     _description = "Pricelist"
     _order = 'name'
+    # the compiled items of pricelists (see _get_compiled_rules)
+    _cache_groups = {'pricelists': ()}
     _columns = {
         'name': fields.char('Pricelist Name', required=True, translate=True),
         'active': fields.boolean('Active', help="If unchecked, it will allow you to hide the pricelist without removing it."),
@@ -120,142 +122,229 @@ class product_pricelist(osv.osv):
     def _price_get_multi(self, cr, uid, pricelist, products_by_qty_by_partner, context=None):
         return dict((key, price[0]) for key, price in self._price_rule_get_multi(cr, uid, pricelist, products_by_qty_by_partner, context=context).items())
 
+    @tools.ormcache('pricelist_id', 'date', group='pricelists')
+    def _get_compiled_rules(self, cr, uid, pricelist_id, date):
+        """ Return the items of a pricelist valid at ``date``, as a pair
+        ``(rules, index)``: ``rules`` is the list of the items as dicts, in
+        the order they are evaluated, and ``index`` maps ``('product', id)``,
+        ``('template', id)``, ``('categ', id)`` and ``('global', None)`` to
+        the positions in ``rules`` of the items applied on them. The result
+        is cached until pricelist items change, and must not be modified.
+        """
+        cr.execute(
+            'SELECT i.id, i.min_quantity, i.product_tmpl_id, i.product_id, i.categ_id, '
+            '       i.base, i.base_pricelist_id, i.compute_price, i.fixed_price, i.percent_price, '
+            '       i.price_discount, i.price_round, i.price_surcharge, '
+            '       i.price_min_margin, i.price_max_margin '
+            'FROM product_pricelist_item AS i '
+            'LEFT JOIN product_category AS c '
+            'ON i.categ_id = c.id '
+            'WHERE (pricelist_id = %s) '
+            'AND ((i.date_start IS NULL OR i.date_start<=%s) AND (i.date_end IS NULL OR i.date_end>=%s))'
+            'ORDER BY applied_on, min_quantity desc, c.parent_left desc',
+            (pricelist_id, date, date))
+        rules = cr.dictfetchall()
+        index = {}
+        for position, rule in enumerate(rules):
+            for name in ('min_quantity', 'fixed_price', 'percent_price', 'price_discount', 'price_round',
+                         'price_surcharge', 'price_min_margin', 'price_max_margin'):
+                rule[name] = rule[name] or 0.0
+            # index the rule on its most specific criterion, the others are
+            # checked when evaluating it
+            if rule['product_id']:
+                key = ('product', rule['product_id'])
+            elif rule['product_tmpl_id']:
+                key = ('template', rule['product_tmpl_id'])
+            elif rule['categ_id']:
+                key = ('categ', rule['categ_id'])
+            else:
+                key = ('global', None)
+            index.setdefault(key, []).append(position)
+        return rules, index
+
+    def _get_categ_ancestors(self, cr, uid, categ_ids):
+        """ Return a dict mapping each category in ``categ_ids`` to the set of
+        its ancestors, itself included. The ancestors are found by following
+        ``parent_id``, as ``parent_left`` and ``parent_right`` are not set
+        while their computation is deferred (during module installation). """
+        result = dict((categ_id, set()) for categ_id in categ_ids if categ_id)
+        if result:
+            cr.execute('WITH RECURSIVE ancestor(id, parent_id) AS ('
+                       '    SELECT id, id FROM product_category WHERE id IN %s '
+                       '  UNION '
+                       '    SELECT a.id, c.parent_id FROM ancestor AS a '
+                       '    JOIN product_category AS c ON c.id = a.parent_id '
+                       '    WHERE c.parent_id IS NOT NULL'
+                       ') SELECT id, parent_id FROM ancestor', (tuple(result),))
+            for categ_id, parent_id in cr.fetchall():
+                result[categ_id].add(parent_id)
+        return result
+
     def _price_rule_get_multi(self, cr, uid, pricelist, products_by_qty_by_partner, context=None):
         context = context or {}
         date = context.get('date') and context['date'][0:10] or time.strftime(DEFAULT_SERVER_DATE_FORMAT)
         products = map(lambda x: x[0], products_by_qty_by_partner)
         product_uom_obj = self.pool.get('product.uom')
+        currency_obj = self.pool['res.currency']
+        template_obj = self.pool['product.template']
 
         if not products:
             return {}
 
-        categ_ids = {}
-        for p in products:
-            categ = p.categ_id
-            while categ:
-                categ_ids[categ.id] = True
-                categ = categ.parent_id
-        categ_ids = categ_ids.keys()
-
         is_product_template = products[0]._name == "product.template"
-        if is_product_template:
-            prod_tmpl_ids = [tmpl.id for tmpl in products]
-            # all variants of all products
-            prod_ids = [p.id for p in
-                        list(chain.from_iterable([t.product_variant_ids for t in products]))]
-        else:
-            prod_ids = [product.id for product in products]
-            prod_tmpl_ids = [product.product_tmpl_id.id for product in products]
-
-        # Load all rules
-        cr.execute(
-            'SELECT i.id '
-            'FROM product_pricelist_item AS i '
-            'LEFT JOIN product_category AS c '
-            'ON i.categ_id = c.id '
-            'WHERE (product_tmpl_id IS NULL OR product_tmpl_id = any(%s))'
-            'AND (product_id IS NULL OR product_id = any(%s))'
-            'AND (categ_id IS NULL OR categ_id = any(%s)) '
-            'AND (pricelist_id = %s) '
-            'AND ((i.date_start IS NULL OR i.date_start<=%s) AND (i.date_end IS NULL OR i.date_end>=%s))'
-            'ORDER BY applied_on, min_quantity desc, c.parent_left desc',
-            (prod_tmpl_ids, prod_ids, categ_ids, pricelist.id, date, date))
-
-        item_ids = [x[0] for x in cr.fetchall()]
-        items = self.pool.get('product.pricelist.item').browse(cr, uid, item_ids, context=context)
-        results = {}
+        rules, index = self._get_compiled_rules(cr, uid, pricelist.id, date)
+        categ_ancestors = self._get_categ_ancestors(cr, uid, set(p.categ_id.id for p in products))
+        global_positions = index.get(('global', None), [])
+
+        # compute each conversion once: the conversions of prices between UoMs
+        # and currencies are linear, and only their factors are kept
+        qty_uoms = {}
+        price_uoms = {}
+        currency_rates = {}
+
+        def qty_in_uom(from_uom_id, qty, to_uom_id):
+            key = (from_uom_id, qty, to_uom_id)
+            if key not in qty_uoms:
+                try:
+                    qty_uoms[key] = product_uom_obj._compute_qty(cr, uid, from_uom_id, qty, to_uom_id)
+                except UserError:
+                    # Ignored - incompatible UoM in context, use default product UoM
+                    qty_uoms[key] = qty
+            return qty_uoms[key]
+
+        def price_in_uom(from_uom_id, price, to_uom_id):
+            key = (from_uom_id, to_uom_id)
+            if key not in price_uoms:
+                price_uoms[key] = product_uom_obj._compute_price(cr, uid, from_uom_id, 1.0, to_uom_id)
+            return price * price_uoms[key]
+
+        def price_in_currency(from_currency_id, price, to_currency_id):
+            if not from_currency_id or not to_currency_id or from_currency_id == to_currency_id:
+                return price
+            key = (from_currency_id, to_currency_id)
+            if key not in currency_rates:
+                currency_rates[key] = currency_obj.compute(cr, uid, from_currency_id, to_currency_id, 1.0, round=False, context=context)
+            return price * currency_rates[key]
+
+        # first find the rule applied to each product
+        lines = []
         for product, qty, partner in products_by_qty_by_partner:
-            results[product.id] = 0.0
-            suitable_rule = False
-
             # Final unit price is computed according to `qty` in the `qty_uom_id` UoM.
             # An intermediary unit price may be computed according to a different UoM, in
             # which case the price_uom_id contains that UoM.
             # The final price will be converted to match `qty_uom_id`.
             qty_uom_id = context.get('uom') or product.uom_id.id
-            price_uom_id = product.uom_id.id
             qty_in_product_uom = qty
             if qty_uom_id != product.uom_id.id:
-                try:
-                    qty_in_product_uom = product_uom_obj._compute_qty(
-                        cr, uid, context['uom'], qty, product.uom_id.id)
-                except UserError:
-                    # Ignored - incompatible UoM in context, use default product UoM
-                    pass
-
-            # if Public user try to access standard price from website sale, need to call _price_get.
-            price = self.pool['product.template']._price_get(cr, uid, [product], 'list_price', context=context)[product.id]
-
-            price_uom_id = qty_uom_id
-            for rule in items:
-                if rule.min_quantity and qty_in_product_uom < rule.min_quantity:
+                qty_in_product_uom = qty_in_uom(context['uom'], qty, product.uom_id.id)
+
+            if is_product_template:
+                variant_ids = product.product_variant_ids.ids if product.product_variant_count == 1 else []
+                tmpl_id = product.id
+            else:
+                variant_ids = [product.id]
+                tmpl_id = product.product_tmpl_id.id
+            categs = categ_ancestors.get(product.categ_id.id, set())
+
+            positions = list(global_positions)
+            for variant_id in variant_ids:
+                positions += index.get(('product', variant_id), [])
+            positions += index.get(('template', tmpl_id), [])
+            for categ_id in categs:
+                positions += index.get(('categ', categ_id), [])
+
+            suitable_rule = None
+            for position in sorted(positions):
+                rule = rules[position]
+                if rule['min_quantity'] and qty_in_product_uom < rule['min_quantity']:
                     continue
-                if is_product_template:
-                    if rule.product_tmpl_id and product.id != rule.product_tmpl_id.id:
-                        continue
-                    if rule.product_id and not (product.product_variant_count == 1 and product.product_variant_ids[0].id == rule.product_id.id):
-                        # product rule acceptable on template if has only one variant
-                        continue
-                else:
-                    if rule.product_tmpl_id and product.product_tmpl_id.id != rule.product_tmpl_id.id:
-                        continue
-                    if rule.product_id and product.id != rule.product_id.id:
-                        continue
-
-                if rule.categ_id:
-                    cat = product.categ_id
-                    while cat:
-                        if cat.id == rule.categ_id.id:
-                            break
-                        cat = cat.parent_id
-                    if not cat:
-                        continue
-
-                if rule.base == 'pricelist' and rule.base_pricelist_id:
-                    price_tmp = self._price_get_multi(cr, uid, rule.base_pricelist_id, [(product, qty, partner)], context=context)[product.id]
-                    ptype_src = rule.base_pricelist_id.currency_id.id
-                    price = self.pool['res.currency'].compute(cr, uid, ptype_src, pricelist.currency_id.id, price_tmp, round=False, context=context)
+                # product rule acceptable on template if has only one variant
+                if rule['product_tmpl_id'] and tmpl_id != rule['product_tmpl_id']:
+                    continue
+                if rule['product_id'] and rule['product_id'] not in variant_ids:
+                    continue
+                if rule['categ_id'] and rule['categ_id'] not in categs:
+                    continue
+                suitable_rule = rule
+                break
+            lines.append((product, qty, partner, qty_uom_id, suitable_rule))
+
+        # then compute the base prices by batches: the public price of all
+        # products, the prices the rules are based on, and the prices in the
+        # other pricelists
+        base_products = {'list_price': OrderedDict()}
+        base_pricelists = {}
+        for product, qty, partner, qty_uom_id, rule in lines:
+            base_products['list_price'][product.id] = product
+            if rule is None:
+                continue
+            if rule['base'] == 'pricelist' and rule['base_pricelist_id']:
+                base_pricelists.setdefault(rule['base_pricelist_id'], []).append((product, qty, partner))
+            else:
+                base_products.setdefault(rule['base'], OrderedDict())[product.id] = product
+
+        # if Public user try to access standard price from website sale, need to call _price_get.
+        # price_get returns the price in the context UoM, i.e. qty_uom_id
+        base_prices = {}
+        for base, base_product_map in base_products.iteritems():
+            base_prices[base] = template_obj._price_get(cr, uid, base_product_map.values(), base, context=context)
+        pricelist_prices = {}
+        for base_pricelist_id, items in base_pricelists.iteritems():
+            base_pricelist = self.browse(cr, uid, base_pricelist_id, context=context)
+            price_tmp = self._price_get_multi(cr, uid, base_pricelist, items, context=context)
+            pricelist_prices[base_pricelist_id] = dict(
+                (product_id, price_in_currency(base_pricelist.currency_id.id, price, pricelist.currency_id.id))
+                for product_id, price in price_tmp.iteritems()
+            )
+
+        results = {}
+        for product, qty, partner, price_uom_id, rule in lines:
+            price = base_prices['list_price'][product.id]
+            if rule is not None:
+                if rule['base'] == 'pricelist' and rule['base_pricelist_id']:
+                    price = pricelist_prices[rule['base_pricelist_id']][product.id]
                 else:
-                    # if base option is public price take sale price else cost price of product
-                    # price_get returns the price in the context UoM, i.e. qty_uom_id
-                    price = self.pool['product.template']._price_get(cr, uid, [product], rule.base, context=context)[product.id]
+                    price = base_prices[rule['base']][product.id]
 
-                convert_to_price_uom = (lambda price: product_uom_obj._compute_price(
-                                            cr, uid, product.uom_id.id,
-                                            price, price_uom_id))
+                convert_to_price_uom = (lambda price: price_in_uom(product.uom_id.id, price, price_uom_id))
 
                 if price is not False:
-                    if rule.compute_price == 'fixed':
-                        price = convert_to_price_uom(rule.fixed_price)
-                    elif rule.compute_price == 'percentage':
-                        price = (price - (price * (rule.percent_price / 100))) or 0.0
+                    if rule['compute_price'] == 'fixed':
+                        price = convert_to_price_uom(rule['fixed_price'])
+                    elif rule['compute_price'] == 'percentage':
+                        price = (price - (price * (rule['percent_price'] / 100))) or 0.0
                     else:
                         #complete formula
                         price_limit = price
-                        price = (price - (price * (rule.price_discount / 100))) or 0.0
-                        if rule.price_round:
-                            price = tools.float_round(price, precision_rounding=rule.price_round)
+                        price = (price - (price * (rule['price_discount'] / 100))) or 0.0
+                        if rule['price_round']:
+                            price = tools.float_round(price, precision_rounding=rule['price_round'])
 
-                        if rule.price_surcharge:
-                            price_surcharge = convert_to_price_uom(rule.price_surcharge)
+                        if rule['price_surcharge']:
+                            price_surcharge = convert_to_price_uom(rule['price_surcharge'])
                             price += price_surcharge
 
-                        if rule.price_min_margin:
-                            price_min_margin = convert_to_price_uom(rule.price_min_margin)
+                        if rule['price_min_margin']:
+                            price_min_margin = convert_to_price_uom(rule['price_min_margin'])
                             price = max(price, price_limit + price_min_margin)
 
-                        if rule.price_max_margin:
-                            price_max_margin = convert_to_price_uom(rule.price_max_margin)
+                        if rule['price_max_margin']:
+                            price_max_margin = convert_to_price_uom(rule['price_max_margin'])
                             price = min(price, price_limit + price_max_margin)
-                    suitable_rule = rule
-                break
+                else:
+                    rule = None
             # Final price conversion into pricelist currency
-            if suitable_rule and suitable_rule.compute_price != 'fixed' and suitable_rule.base != 'pricelist':
-                price = self.pool['res.currency'].compute(cr, uid, product.currency_id.id, pricelist.currency_id.id, price, round=False, context=context)
+            if rule is not None and rule['compute_price'] != 'fixed' and rule['base'] != 'pricelist':
+                price = price_in_currency(product.currency_id.id, price, pricelist.currency_id.id)
 
-            results[product.id] = (price, suitable_rule and suitable_rule.id or False)
+            results[product.id] = (price, rule['id'] if rule is not None else False)
         return results
 
+    def unlink(self, cr, uid, ids, context=None):
+        # the items of the pricelists are deleted in cascade
+        self.pool.clear_cache('pricelists')
+        return super(product_pricelist, self).unlink(cr, uid, ids, context=context)
+
     def price_get(self, cr, uid, ids, prod_id, qty, partner=None, context=None):
         return dict((key, price[0]) for key, price in self.price_rule_get(cr, uid, ids, prod_id, qty, partner=partner, context=context).items())
 
@@ -337,6 +426,18 @@ class product_pricelist_item(osv.osv):
         (_check_margin, 'Error! The minimum margin should be lower than the maximum margin.', ['price_min_margin', 'price_max_margin'])
     ]
 
+    def create(self, cr, uid, vals, context=None):
+        self.pool.clear_cache('pricelists')
+        return super(product_pricelist_item, self).create(cr, uid, vals, context=context)
+
+    def write(self, cr, uid, ids, vals, context=None):
+        self.pool.clear_cache('pricelists')
+        return super(product_pricelist_item, self).write(cr, uid, ids, vals, context=context)
+
+    def unlink(self, cr, uid, ids, context=None):
+        self.pool.clear_cache('pricelists')
+        return super(product_pricelist_item, self).unlink(cr, uid, ids, context=context)
+
 
 class product_pricelist_item_new(models.Model):
     _inherit = "product.pricelist.item"
@@ -224,6 +224,19 @@ class product_category(osv.osv):
         (osv.osv._check_recursion, 'Error ! You cannot create recursive categories.', ['parent_id'])
     ]
 
+    # the pricelist items applied on categories are ordered by parent_left
+    def create(self, cr, uid, vals, context=None):
+        self.pool.clear_cache('pricelists')
+        return super(product_category, self).create(cr, uid, vals, context=context)
+
+    def write(self, cr, uid, ids, vals, context=None):
+        self.pool.clear_cache('pricelists')
+        return super(product_category, self).write(cr, uid, ids, vals, context=context)
+
+    def unlink(self, cr, uid, ids, context=None):
+        self.pool.clear_cache('pricelists')
+        return super(product_category, self).unlink(cr, uid, ids, context=context)
+
 
 class produce_price_history(osv.osv):
     """
@@ -109,3 +109,68 @@ class TestPricelist(TransactionCase):
         test_unit_price(3500, kg, (tonne_price - 10) / 1000.0)
         test_unit_price(2, tonne, tonne_price)
         test_unit_price(3, tonne, tonne_price - 10)
+
+    def test_30_pricelist_bulk(self):
+        # Verify that the products are priced in bulk like one by one, with
+        # the rules on parent categories, and that modified rules apply
+        cr, uid = self.cr, self.uid
+        category = self.registry('product.category')
+        categ_parent_id = category.create(cr, uid, {'name': 'Parent'})
+        categ_child_id = category.create(cr, uid, {'name': 'Child', 'parent_id': categ_parent_id})
+        spam_id = self.product_product.copy(cr, uid, self.usb_adapter_id, {'name': 'Spam', 'categ_id': categ_child_id})
+        item_id = self.registry('product.pricelist.item').create(cr, uid, {
+            'pricelist_id': self.sale_pricelist_id,
+            'applied_on': '2_product_category',
+            'categ_id': categ_parent_id,
+            'compute_price': 'percentage',
+            'percent_price': 20,
+            'min_quantity': 5,
+        })
+        pricelist = self.product_pricelist.browse(cr, uid, self.sale_pricelist_id)
+        products = self.product_product.browse(cr, uid, [self.usb_adapter_id, self.datacard_id, spam_id])
+
+        def prices(qty):
+            return self.product_pricelist._price_rule_get_multi(cr, uid, pricelist, [(p, qty, False) for p in products])
+
+        prices_1 = prices(1)
+        for product in products:
+            result = self.product_pricelist.price_rule_get(cr, uid, [pricelist.id], product.id, 1)[pricelist.id]
+            self.assertEqual(prices_1[product.id], result)
+        self.assertFalse(prices_1[spam_id][1])
+
+        prices_5 = prices(5)
+        self.assertEqual(prices_5[spam_id][1], item_id)
+        self.assertAlmostEqual(prices_5[spam_id][0], prices_1[spam_id][0] * 0.8)
+        self.assertEqual(prices_5[self.usb_adapter_id], prices_1[self.usb_adapter_id])
+
+        self.registry('product.pricelist.item').write(cr, uid, [item_id], {'percent_price': 50})
+        self.assertAlmostEqual(prices(5)[spam_id][0], prices_1[spam_id][0] * 0.5)
+
+    def test_40_pricelist_deferred_parent_store(self):
+        # The rules on categories apply while the computation of parent_left
+        # and parent_right is deferred, like during module installation
+        cr, uid = self.cr, self.uid
+        context = {'defer_parent_store_computation': True}
+        category = self.registry('product.category')
+        categ_parent_id = category.create(cr, uid, {'name': 'Deferred Parent'}, context=context)
+        categ_child_id = category.create(cr, uid, {'name': 'Deferred Child', 'parent_id': categ_parent_id}, context=context)
+        self.assertFalse(category.browse(cr, uid, categ_child_id).parent_left)
+        spam_id = self.product_product.copy(cr, uid, self.usb_adapter_id, {'name': 'Spam', 'categ_id': categ_child_id})
+        pricelist = self.product_pricelist.browse(cr, uid, self.sale_pricelist_id)
+        spam = self.product_product.browse(cr, uid, spam_id)
+
+        def price():
+            return self.product_pricelist._price_rule_get_multi(cr, uid, pricelist, [(spam, 1, False)])[spam_id]
+
+        price_before = price()
+        self.assertFalse(price_before[1])
+        item_id = self.registry('product.pricelist.item').create(cr, uid, {
+            'pricelist_id': self.sale_pricelist_id,
+            'applied_on': '2_product_category',
+            'categ_id': categ_parent_id,
+            'compute_price': 'percentage',
+            'percent_price': 20,
+        })
+        price_after = price()
+        self.assertEqual(price_after[1], item_id)
+        self.assertAlmostEqual(price_after[0], price_before[0] * 0.8)
@@ -19,6 +19,10 @@ class SaleOrder(models.Model):
     _inherit = ['mail.thread', 'ir.needaction_mixin']
     _description = "Sales Order"
     _order = 'date_order desc, id desc'
+    # amounts to invoice per team, shown on the sales team dashboard
+    _rollups = {
+        'invoicing': (['team_id', 'invoice_status', 'company_id', 'user_id'], ['amount_total']),
+    }
 
     @api.depends('order_line.price_total')
     def _amount_all(self):
@@ -76,3 +76,38 @@ class TestMoveExplode(common.TransactionCase):
         res = self.MrpBom._bom_explode(self.bom_prop_line, self.product_bom_prop, 1, properties=[self.mrp_property.id])
         res = set([p['product_id'] for p in res[0]])
         self.assertEqual(res, set([self.product_A.id, self.product_B.id]))
+
+    def test_01_bom_explode_cache(self):
+        """Check that the explosion of a BoM is cached until the BoM changes, and that BoMs can be exploded at once."""
+        properties = [self.mrp_property.id]
+        res = self.MrpBom._bom_explode(self.bom_prop_line, self.product_bom_prop, 2, properties=properties)
+        graph = self.MrpBom._bom_graph_get(self.bom_prop_line, self.product_bom_prop, properties)
+        self.assertEqual(self.MrpBom._bom_graph_get(self.bom_prop_line, self.product_bom_prop, properties), graph)
+
+        # exploding at once gives the same result
+        explosions = [(self.bom_prop_line, self.product_bom_prop, 2, properties, False),
+                      (self.bom, self.product_bom, 1.0, [], False)]
+        res_multi = self.MrpBom._bom_explode_multi(explosions)
+        self.assertEqual(res_multi[0], res)
+        self.assertEqual(res_multi[1], self.MrpBom._bom_explode(self.bom, self.product_bom, 1.0, []))
+
+        # the requirements of both explosions are summed up
+        requirements = self.MrpBom._bom_requirements(explosions + explosions[:1])
+        for line in res[0]:
+            key = (line['product_id'], line['product_uom'])
+            self.assertGreaterEqual(requirements[key], 2 * line['product_qty'])
+
+        # modifying a line of the BoM invalidates the graph
+        line = self.bom_prop_line.bom_line_ids.filtered(lambda l: l.product_id == self.product_A)
+        qty = sum(r['product_qty'] for r in res[0] if r['product_id'] == self.product_A.id)
+        line.write({'product_qty': line.product_qty * 3})
+        self.assertNotEqual(self.MrpBom._bom_graph_get(self.bom_prop_line, self.product_bom_prop, properties), graph)
+        res = self.MrpBom._bom_explode(self.bom_prop_line, self.product_bom_prop, 2, properties=properties)
+        self.assertAlmostEqual(sum(r['product_qty'] for r in res[0] if r['product_id'] == self.product_A.id), 3 * qty)
+
+    def test_02_bom_explode_cache_products(self):
+        """Check that the cached explosions are cleared by the changes of the variant values of products."""
+        self.assertIn('boms', self.registry.cache_groups['rules'])
+        self.registry.reset_any_cache_cleared()
+        self.product_bom_prop.write({'attribute_value_ids': [(5,)]})
+        self.assertIn('boms', self.registry.cache_invalidated)
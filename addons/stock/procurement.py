@@ -8,9 +8,18 @@ from openerp.tools import DEFAULT_SERVER_DATE_FORMAT, DEFAULT_SERVER_DATETIME_FO
 from openerp import SUPERUSER_ID
 from dateutil.relativedelta import relativedelta
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from psycopg2 import OperationalError
+import logging
+import time
 import openerp
 
+_logger = logging.getLogger(__name__)
+
+# default number of threads processing the shards of orderpoints, see
+# the system parameter 'stock.scheduler_workers'
+SCHEDULER_WORKERS = 4
+
 class procurement_group(osv.osv):
     _inherit = 'procurement.group'
     _columns = {
@@ -448,19 +457,107 @@ class procurement_order(osv.osv):
         '''
         Create procurement based on Orderpoint
 
-        :param bool use_new_cursor: if set, use a dedicated cursor and auto-commit after processing each procurement.
-            This is appropriate for batch jobs only.
+        :param bool use_new_cursor: if set, use dedicated cursors and auto-commit after processing each group of orderpoints.
+            This is appropriate for batch jobs only. The orderpoints are then split into shards by warehouse, which are
+            processed in parallel by a pool of threads (see the system parameter ``stock.scheduler_workers``).
         '''
         if context is None:
             context = {}
-        if use_new_cursor:
-            cr = openerp.registry(cr.dbname).cursor()
+        orderpoint_obj = self.pool.get('stock.warehouse.orderpoint')
+        dom = company_id and [('company_id', '=', company_id)] or []
+        orderpoint_ids = orderpoint_obj.search(cr, uid, dom, order="location_id")
+        if not use_new_cursor:
+            self._procure_orderpoint_shard(cr, uid, orderpoint_ids, context=context)
+            return {}
+
+        shards = self._orderpoint_shards(cr, uid, orderpoint_ids, context=context)
+        workers = int(self.pool['ir.config_parameter'].get_param(
+            cr, SUPERUSER_ID, 'stock.scheduler_workers', SCHEDULER_WORKERS))
+        dbname = cr.dbname
+
+        def run_shard(shard):
+            name, ids = shard
+            with openerp.api.Environment.manage():
+                with openerp.registry(dbname).cursor() as shard_cr:
+                    return self._procure_orderpoint_shard(shard_cr, uid, ids, use_new_cursor=True, shard=name, context=context)
+
+        start = time.time()
+        pool = ThreadPool(max(1, min(workers, len(shards))))
+        try:
+            reports = pool.map(run_shard, shards, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        _logger.info("Orderpoints: %d shards, %d orderpoints, %d procurements in %.1fs",
+                     len(shards), sum(r['orderpoints'] for r in reports),
+                     sum(r['procurements'] for r in reports), time.time() - start)
+        return {}
+
+    def _orderpoint_shards(self, cr, uid, orderpoint_ids, context=None):
+        ''' Split the given orderpoints into shards that can be processed concurrently. The orderpoints of a
+            warehouse are kept together, as their procurements may be grouped in the same documents (purchase orders,
+            pickings, ...). So are the warehouses linked by resupply routes, as the procurements of the supplied
+            warehouse create moves and procurements in the supplying one. The order of the orderpoints is kept inside
+            the shards, and the largest shards come first.
+
+            :return: list of pairs (shard name, list of orderpoint ids)
+        '''
+        warehouses = {}
+        for sub_ids in cr.split_for_in_conditions(orderpoint_ids):
+            cr.execute("SELECT id, warehouse_id FROM stock_warehouse_orderpoint WHERE id IN %s", (sub_ids,))
+            warehouses.update(cr.fetchall())
+
+        # merge the warehouses linked by resupply routes, each group is
+        # represented by its smallest warehouse id
+        parent = {}
+
+        def find(wh_id):
+            while parent.get(wh_id, wh_id) != wh_id:
+                wh_id = parent[wh_id]
+            return wh_id
+
+        cr.execute("""SELECT supplied_wh_id, supplier_wh_id FROM stock_location_route
+                      WHERE active AND supplied_wh_id IS NOT NULL AND supplier_wh_id IS NOT NULL""")
+        for wh1, wh2 in cr.fetchall():
+            root1, root2 = find(wh1), find(wh2)
+            if root1 != root2:
+                parent[max(root1, root2)] = min(root1, root2)
+
+        shards = {}
+        names = {}
+        for op_id in orderpoint_ids:
+            wh_id = warehouses.get(op_id)
+            key = find(wh_id) if wh_id else None
+            shards.setdefault(key, []).append(op_id)
+            names.setdefault(key, set()).add(wh_id)
+
+        def name(key):
+            if not key:
+                return 'no warehouse'
+            wh_ids = sorted(names[key])
+            return 'warehouse%s %s' % ('s' if len(wh_ids) > 1 else '', ', '.join(map(str, wh_ids)))
+
+        return sorted(((name(key), ids) for key, ids in shards.iteritems()),
+                      key=lambda shard: -len(shard[1]))
+
+    def _procure_orderpoint_shard(self, cr, uid, orderpoint_ids, use_new_cursor=False, shard=None, context=None):
+        ''' Create the procurements of the given orderpoints, by groups of orderpoints of the same location: the
+            availability of their products is computed at once, and their procurements are created together.
+
+            :param bool use_new_cursor: if set, commit after each group of orderpoints, and retry the groups that
+                fail because of concurrent updates
+            :return: a report of the processing, as a dict with the keys 'shard', 'orderpoints', 'procurements'
+                and 'duration'
+        '''
         orderpoint_obj = self.pool.get('stock.warehouse.orderpoint')
         procurement_obj = self.pool.get('procurement.order')
         product_obj = self.pool.get('product.product')
 
-        dom = company_id and [('company_id', '=', company_id)] or []
-        orderpoint_ids = orderpoint_obj.search(cr, uid, dom, order="location_id")
+        start = time.time()
+        orderpoint_ids = list(orderpoint_ids)
+        total = len(orderpoint_ids)
+        done = 0
+        created = 0
         prev_ids = []
         tot_procs = []
         while orderpoint_ids:
@@ -481,13 +578,14 @@ class procurement_order(osv.osv):
                     ops_dict[key] += [op]
 
             for key in product_dict.keys():
-                ctx = context.copy()
-                ctx.update({'location': ops_dict[key][0].location_id.id})
-                prod_qty = product_obj._product_available(cr, uid, [x.id for x in product_dict[key]],
-                                                          context=ctx)
-                subtract_qty = orderpoint_obj.subtract_procurements_from_orderpoints(cr, uid, [x.id for x in ops_dict[key]], context=context)
-                for op in ops_dict[key]:
-                    try:
+                try:
+                    ctx = context.copy()
+                    ctx.update({'location': ops_dict[key][0].location_id.id})
+                    prod_qty = product_obj._product_available(cr, uid, [x.id for x in product_dict[key]],
+                                                              context=ctx)
+                    subtract_qty = orderpoint_obj.subtract_procurements_from_orderpoints(cr, uid, [x.id for x in ops_dict[key]], context=context)
+                    vals_list = []
+                    for op in ops_dict[key]:
                         prods = prod_qty[op.product_id.id]['virtual_available']
                         if prods is None:
                             continue
@@ -504,19 +602,20 @@ class procurement_order(osv.osv):
 
                             qty_rounded = float_round(qty, precision_rounding=op.product_uom.rounding)
                             if qty_rounded > 0:
-                                proc_id = procurement_obj.create(cr, uid,
-                                                                 self._prepare_orderpoint_procurement(cr, uid, op, qty_rounded, context=context),
-                                                                 context=dict(context, procurement_autorun_defer=True))
-                                tot_procs.append(proc_id)
-                            if use_new_cursor:
-                                cr.commit()
-                    except OperationalError:
-                        if use_new_cursor:
-                            orderpoint_ids.append(op.id)
-                            cr.rollback()
-                            continue
-                        else:
-                            raise
+                                vals_list.append(self._prepare_orderpoint_procurement(cr, uid, op, qty_rounded, context=context))
+                    proc_ids = procurement_obj.create_multi(cr, uid, vals_list,
+                                                            context=dict(context, procurement_autorun_defer=True))
+                    if use_new_cursor:
+                        cr.commit()
+                    tot_procs += proc_ids
+                    created += len(proc_ids)
+                except OperationalError:
+                    if use_new_cursor:
+                        orderpoint_ids.extend(op.id for op in ops_dict[key])
+                        cr.rollback()
+                        continue
+                    else:
+                        raise
             try:
                 tot_procs.reverse()
                 self.run(cr, uid, tot_procs, context=context)
@@ -532,12 +631,18 @@ class procurement_order(osv.osv):
 
             if use_new_cursor:
                 cr.commit()
+            done += len(ids)
+            if shard:
+                _logger.info("Orderpoints of %s: %d/%d processed, %d procurements created, %.1fs",
+                             shard, min(done, total), total, created, time.time() - start)
             if prev_ids == ids:
                 break
             else:
                 prev_ids = ids
 
-        if use_new_cursor:
-            cr.commit()
-            cr.close()
-        return {}
+        return {
+            'shard': shard,
+            'orderpoints': total,
+            'procurements': created,
+            'duration': time.time() - start,
+        }
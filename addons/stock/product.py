@@ -1,13 +1,23 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import operator as py_operator
+
 from openerp.osv import fields, osv
 from openerp.tools.translate import _
-from openerp.tools.safe_eval import safe_eval as eval
 import openerp.addons.decimal_precision as dp
 from openerp.tools.float_utils import float_round
 from openerp.exceptions import UserError
 
+OPERATORS = {
+    '<': py_operator.lt,
+    '>': py_operator.gt,
+    '<=': py_operator.le,
+    '>=': py_operator.ge,
+    '=': py_operator.eq,
+    '!=': py_operator.ne,
+}
+
 class product_product(osv.osv):
     _inherit = "product.product"
         
@@ -84,29 +94,14 @@ class product_product(osv.osv):
 
         operator = context.get('compute_child', True) and 'child_of' or 'in'
         domain = context.get('force_company', False) and ['&', ('company_id', '=', context['force_company'])] or []
-        locations = location_obj.browse(cr, uid, location_ids, context=context)
-        if operator == "child_of" and locations and locations[0].parent_left != 0:
-            loc_domain = []
-            dest_loc_domain = []
-            for loc in locations:
-                if loc_domain:
-                    loc_domain = ['|'] + loc_domain  + ['&', ('location_id.parent_left', '>=', loc.parent_left), ('location_id.parent_left', '<', loc.parent_right)]
-                    dest_loc_domain = ['|'] + dest_loc_domain + ['&', ('location_dest_id.parent_left', '>=', loc.parent_left), ('location_dest_id.parent_left', '<', loc.parent_right)]
-                else:
-                    loc_domain += ['&', ('location_id.parent_left', '>=', loc.parent_left), ('location_id.parent_left', '<', loc.parent_right)]
-                    dest_loc_domain += ['&', ('location_dest_id.parent_left', '>=', loc.parent_left), ('location_dest_id.parent_left', '<', loc.parent_right)]
-
-            return (
-                domain + loc_domain,
-                domain + ['&'] + dest_loc_domain + ['!'] + loc_domain,
-                domain + ['&'] + loc_domain + ['!'] + dest_loc_domain
-            )
-        else:
-            return (
-                domain + [('location_id', operator, location_ids)],
-                domain + ['&', ('location_dest_id', operator, location_ids), '!', ('location_id', operator, location_ids)],
-                domain + ['&', ('location_id', operator, location_ids), '!', ('location_dest_id', operator, location_ids)]
-            )
+        # conditions on the location fields only (the hierarchy is resolved
+        # into location ids), so that read_group can use the rollups of
+        # stock.quant and stock.move
+        return (
+            domain + [('location_id', operator, location_ids)],
+            domain + ['&', ('location_dest_id', operator, location_ids), '!', ('location_id', operator, location_ids)],
+            domain + ['&', ('location_id', operator, location_ids), '!', ('location_dest_id', operator, location_ids)]
+        )
 
     def _get_domain_dates(self, cr, uid, ids, context):
         from_date = context.get('from_date', False)
@@ -119,10 +114,14 @@ class product_product(osv.osv):
         return domain
 
     def _product_available(self, cr, uid, ids, field_names=None, arg=False, context=None):
+        """ Return the quantities of products ``ids``; if ``ids`` is ``None``,
+        return those of the products that have quants or moves, as the
+        quantities of the other products are all zero.
+        """
         context = context or {}
         field_names = field_names or []
 
-        domain_products = [('product_id', 'in', ids)]
+        domain_products = [('product_id', 'in', ids)] if ids is not None else []
         domain_quant, domain_move_in, domain_move_out = [], [], []
         domain_quant_loc, domain_move_in_loc, domain_move_out_loc = self._get_domain_locations(cr, uid, ids, context=context)
         domain_move_in += self._get_domain_dates(cr, uid, ids, context=context) + [('state', 'not in', ('done', 'cancel', 'draft'))] + domain_products
@@ -150,6 +149,8 @@ class product_product(osv.osv):
 
         moves_in = dict(map(lambda x: (x['product_id'][0], x['product_qty']), moves_in))
         moves_out = dict(map(lambda x: (x['product_id'][0], x['product_qty']), moves_out))
+        if ids is None:
+            ids = list(set(quants) | set(moves_in) | set(moves_out))
         res = {}
         ctx = context.copy()
         ctx.update({'prefetch_fields': False})
@@ -175,36 +176,17 @@ class product_product(osv.osv):
             assert operator in ('<', '>', '=', '!=', '<=', '>='), 'Invalid domain operator'
             assert isinstance(value, (float, int)), 'Invalid domain right operand'
 
-            if operator == '=':
-                operator = '=='
-
-            ids = []
-            if name == 'qty_available' and (value != 0.0 or operator not in  ('==', '>=', '<=')):
-                res.append(('id', 'in', self._search_qty_available(cr, uid, operator, value, context)))
+            # only the products with quants or moves have non-zero quantities
+            compare = OPERATORS[operator]
+            quantities = self._product_available(cr, uid, None, context=context)
+            if compare(0.0, value):
+                ids = [id for id, qties in quantities.iteritems() if not compare(qties[field], value)]
+                res.append(('id', 'not in', ids))
             else:
-                product_ids = self.search(cr, uid, [], context=context)
-                if product_ids:
-                    #TODO: Still optimization possible when searching virtual quantities
-                    for element in self.browse(cr, uid, product_ids, context=context):
-                        if eval(str(element[field]) + operator + str(value)):
-                            ids.append(element.id)
-                    res.append(('id', 'in', ids))
+                ids = [id for id, qties in quantities.iteritems() if compare(qties[field], value)]
+                res.append(('id', 'in', ids))
         return res
 
-    def _search_qty_available(self, cr, uid, operator, value, context):
-        domain_quant = []
-        if context.get('lot_id'):
-            domain_quant.append(('lot_id', '=', context['lot_id']))
-        if context.get('owner_id'):
-            domain_quant.append(('owner_id', '=', context['owner_id']))
-        if context.get('package_id'):
-            domain_quant.append(('package_id', '=', context['package_id']))
-        domain_quant += self._get_domain_locations(cr, uid, [], context=context)[0]
-        quants = self.pool.get('stock.quant').read_group(cr, uid, domain_quant, ['product_id', 'qty'], ['product_id'], context=context)
-        quants = dict(map(lambda x: (x['product_id'][0], x['qty']), quants))
-        quants = dict((k, v) for k, v in quants.iteritems() if eval(str(v) + operator + str(value)))
-        return(list(quants))
-
     def _product_available_text(self, cr, uid, ids, field_names=None, arg=False, context=None):
         res = {}
         for product in self.browse(cr, uid, ids, context=context):
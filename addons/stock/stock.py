@@ -269,6 +269,10 @@ class stock_quant(osv.osv):
     """
     _name = "stock.quant"
     _description = "Quants"
+    # quantities on hand, per product and location (see product.product._product_available)
+    _rollups = {
+        'on_hand': (['product_id', 'location_id', 'company_id', 'lot_id', 'owner_id', 'package_id'], ['qty']),
+    }
 
     def _get_quant_name(self, cr, uid, ids, name, args, context=None):
         """ Forms complete name of location from parent location to child location.
@@ -696,19 +700,26 @@ class stock_quant(osv.osv):
     def _quants_get_order(self, cr, uid, quantity, move, ops=False, domain=[], orderby='in_date', context=None):
         ''' Implementation of removal strategies
             If it can not reserve, it will return a tuple (None, qty)
+
+            The quants are selected by :meth:`_quants_select`, then locked.
+            The quants already locked by concurrent transactions are skipped,
+            and the missing quantity is looked for among the next quants.
         '''
         if context is None:
             context = {}
         product = move.product_id
+        rounding = product.uom_id.rounding
         res = []
-        offset = 0
-        while float_compare(quantity, 0, precision_rounding=product.uom_id.rounding) > 0:
-            quants = self.search(cr, uid, domain, order=orderby, limit=10, offset=offset, context=context)
-            if not quants:
+        seen = []
+        while float_compare(quantity, 0, precision_rounding=rounding) > 0:
+            quant_domain = domain + [('id', 'not in', seen)] if seen else domain
+            quant_ids = self._quants_select(cr, uid, quantity, quant_domain, orderby, context=context)
+            if not quant_ids:
                 res.append((None, quantity))
                 break
-            for quant in self.browse(cr, uid, quants, context=context):
-                rounding = product.uom_id.rounding
+            seen += quant_ids
+            locked_ids = self._quants_lock(cr, uid, quant_ids, context=context)
+            for quant in self.browse(cr, uid, [qid for qid in quant_ids if qid in locked_ids], context=context):
                 if float_compare(quantity, abs(quant.qty), precision_rounding=rounding) >= 0:
                     res += [(quant, abs(quant.qty))]
                     quantity -= abs(quant.qty)
@@ -716,9 +727,47 @@ class stock_quant(osv.osv):
                     res += [(quant, quantity)]
                     quantity = 0
                     break
-            offset += 10
         return res
 
+    def _quants_select(self, cr, uid, quantity, domain, orderby, context=None):
+        """ Return the ids of the first quants matching ``domain`` in the
+        order ``orderby``, just enough for their quantities to cover
+        ``quantity``. A window function keeps the running total of the
+        quantities, so that a single query returns all the needed quants.
+        """
+        self.check_access_rights(cr, uid, 'read')
+        query = self._where_calc(cr, uid, domain, context=context)
+        self._apply_ir_rules(cr, uid, query, 'read', context=context)
+        order_by = self._generate_order_by(cr, uid, orderby, query, context=context)
+        from_clause, where_clause, where_clause_params = query.get_sql()
+        where_str = where_clause and (" WHERE %s" % where_clause) or ''
+        cr.execute("""
+            SELECT id FROM (
+                SELECT "stock_quant".id, row_number() OVER w AS seq,
+                       COALESCE(SUM(ABS("stock_quant".qty)) OVER (w ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS before
+                FROM %s%s
+                WINDOW w AS (%s)
+            ) AS quants
+            WHERE before < %%s
+            ORDER BY seq
+        """ % (from_clause, where_str, order_by.strip()), where_clause_params + [quantity])
+        seen = set()
+        return [row[0] for row in cr.fetchall() if row[0] not in seen and not seen.add(row[0])]
+
+    def _quants_lock(self, cr, uid, ids, context=None):
+        """ Lock the given quants for the current transaction, and return the
+        set of the ids locked. On PostgreSQL 9.5 and later, the quants locked
+        by concurrent transactions are skipped instead of waited for, so that
+        concurrent reservations pick different quants.
+        """
+        if cr._cnx.server_version < 90500:
+            return set(ids)
+        locked_ids = set()
+        for sub_ids in cr.split_for_in_conditions(ids):
+            cr.execute("""SELECT id FROM stock_quant WHERE id IN %s FOR UPDATE SKIP LOCKED""", (sub_ids,))
+            locked_ids.update(row[0] for row in cr.fetchall())
+        return locked_ids
+
     def _check_location(self, cr, uid, location, context=None):
         if location.usage == 'view':
             raise UserError(_('You cannot move to a location of type view %s.') % (location.name))
@@ -1784,6 +1833,10 @@ class stock_move(osv.osv):
     _name = "stock.move"
     _description = "Stock Move"
     _order = 'picking_id, sequence, id'
+    # incoming and outgoing quantities, per product and locations (see product.product._product_available)
+    _rollups = {
+        'forecast': (['product_id', 'location_id', 'location_dest_id', 'state', 'company_id', 'restrict_partner_id'], ['product_qty']),
+    }
 
     def get_price_unit(self, cr, uid, move, context=None):
         """ Returns the unit price to store on the quant """
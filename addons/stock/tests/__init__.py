@@ -3,3 +3,5 @@
 from . import test_stock_flow
 from . import test_owner_available
 from . import test_resupply
+from . import test_quants_get
+from . import test_product_available
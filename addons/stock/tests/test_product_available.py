@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from openerp.addons.stock.tests.common import TestStockCommon
+
+
+class TestProductAvailable(TestStockCommon):
+
+    def test_rollups(self):
+        Quant = self.env['stock.quant']
+        Quant.create({'product_id': self.productA.id, 'location_id': self.stock_location, 'qty': 10.0})
+        quant = Quant.create({'product_id': self.productA.id, 'location_id': self.stock_location, 'qty': 5.0})
+
+        # the quantities in a location hierarchy are summed from the rollup
+        domain = [('product_id', 'in', [self.productA.id]), ('location_id', 'child_of', [self.stock_location])]
+        query = Quant._where_calc(domain)
+        self.assertTrue(Quant._read_group_rollup(domain, [], ['qty'], query))
+
+        productA = self.productA.with_context(location=self.stock_location)
+        self.assertEqual(productA.qty_available, 15.0)
+        quant.write({'location_id': self.customer_location})
+        productA.invalidate_cache()
+        self.assertEqual(productA.qty_available, 10.0)
+
+        # searching on the quantities
+        products = self.productA | self.productB
+        Product = self.env['product.product'].with_context(location=self.stock_location)
+        self.assertEqual(Product.search([('qty_available', '>', 9.0), ('id', 'in', products.ids)]), self.productA)
+        self.assertEqual(Product.search([('virtual_available', '=', 0.0), ('id', 'in', products.ids)]), self.productB)
+        self.assertEqual(Product.search([('virtual_available', '<=', 10.0), ('id', 'in', products.ids)]), products)
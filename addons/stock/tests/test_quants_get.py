@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from openerp.addons.stock.tests.common import TestStockCommon
+
+
+class TestQuantsGet(TestStockCommon):
+
+    def setUp(self):
+        super(TestQuantsGet, self).setUp()
+        Quant = self.env['stock.quant']
+        self.quants = [Quant.create({
+            'product_id': self.productA.id,
+            'location_id': self.stock_location,
+            'qty': qty,
+            'in_date': in_date,
+        }) for qty, in_date in [(3.0, '2015-01-03 00:00:00'),
+                                (2.0, '2015-01-01 00:00:00'),
+                                (4.0, '2015-01-02 00:00:00')]]
+        self.move = self.env['stock.move'].create({
+            'name': 'a move',
+            'product_id': self.productA.id,
+            'product_uom_qty': 5.0,
+            'product_uom': self.productA.uom_id.id,
+            'location_id': self.stock_location,
+            'location_dest_id': self.customer_location,
+        })
+        self.domain = [('product_id', '=', self.productA.id),
+                       ('location_id', '=', self.stock_location),
+                       ('qty', '>', 0.0)]
+
+    def quants_get(self, qty, orderby):
+        res = self.env['stock.quant']._quants_get_order(qty, self.move, domain=self.domain, orderby=orderby)
+        return [(quant and quant.id, qty) for quant, qty in res]
+
+    def test_fifo(self):
+        q0, q1, q2 = [quant.id for quant in self.quants]
+        self.assertEqual(self.quants_get(5.0, 'in_date, id'), [(q1, 2.0), (q2, 3.0)])
+        self.assertEqual(self.quants_get(6.0, 'in_date, id'), [(q1, 2.0), (q2, 4.0)])
+        self.assertEqual(self.quants_get(12.0, 'in_date, id'),
+                         [(q1, 2.0), (q2, 4.0), (q0, 3.0), (None, 3.0)])
+
+    def test_lifo(self):
+        q0, q1, q2 = [quant.id for quant in self.quants]
+        self.assertEqual(self.quants_get(5.0, 'in_date desc, id desc'), [(q0, 3.0), (q2, 2.0)])
+        self.assertEqual(self.quants_get(1.0, 'in_date desc, id desc'), [(q0, 1.0)])
@@ -49,3 +49,36 @@ class TestResupply(TestStockCommon):
         proc2.run()
         self.assertEqual(proc2.state, 'running')
         self.assertTrue(proc2.rule_id)
+
+    def test_orderpoint_shards(self):
+        Orderpoint = self.env['stock.warehouse.orderpoint']
+        op_small1 = Orderpoint.search([('warehouse_id', '=', self.smallwh.id)])
+        op_big = Orderpoint.create({'warehouse_id': self.bigwh.id,
+                                    'location_id': self.bigwh.lot_stock_id.id,
+                                    'product_id': self.productB.id,
+                                    'product_min_qty': 10,
+                                    'product_max_qty': 20,
+                                    'product_uom': self.uom_unit.id,
+                                    })
+        op_small2 = Orderpoint.create({'warehouse_id': self.smallwh.id,
+                                       'location_id': self.smallwh.lot_stock_id.id,
+                                       'product_id': self.productC.id,
+                                       'product_min_qty': 10,
+                                       'product_max_qty': 20,
+                                       'product_uom': self.uom_unit.id,
+                                       })
+        other_wh = self.Warehouse.create({'name': 'OTHER', 'code': 'O'})
+        op_other = Orderpoint.create({'warehouse_id': other_wh.id,
+                                      'location_id': other_wh.lot_stock_id.id,
+                                      'product_id': self.productB.id,
+                                      'product_min_qty': 10,
+                                      'product_max_qty': 20,
+                                      'product_uom': self.uom_unit.id,
+                                      })
+        # the orderpoints of a warehouse stay together, in the same order, and
+        # so do the warehouses linked by resupply routes
+        shards = self.env['procurement.order']._orderpoint_shards([op_small1.id, op_other.id, op_big.id, op_small2.id])
+        self.assertEqual(shards, [
+            ('warehouses %d, %d' % (self.bigwh.id, self.smallwh.id), [op_small1.id, op_big.id, op_small2.id]),
+            ('warehouse %d' % other_wh.id, [op_other.id]),
+        ])
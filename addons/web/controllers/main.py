@@ -34,7 +34,7 @@ import openerp
 import openerp.modules.registry
 from openerp.addons.base.ir.ir_qweb import AssetsBundle, QWebTemplateNotFound
 from openerp.modules import get_resource_path
-from openerp.tools import topological_sort
+from openerp.tools import split_every, static_assets, topological_sort
 from openerp.tools.translate import _
 from openerp.tools import ustr
 from openerp import http
@@ -980,6 +980,22 @@ class Binary(http.Controller):
             response.set_cookie('fileToken', token)
         return response
 
+    @http.route('/web/assets/<string:checksum>/<string:filename>', type='http', auth="public")
+    def content_assets(self, checksum, filename):
+        """ Serve a static copy of an asset bundle that does not exist on
+        this server yet; the existing ones are served without database.
+        """
+        Attachment = request.env['ir.attachment'].sudo()
+        attachment = Attachment.search([
+            ('checksum', '=', checksum),
+            ('datas_fname', '=', filename),
+            ('url', '=like', '/web/content/%'),
+        ], limit=1)
+        if not attachment:
+            return request.not_found()
+        static_assets.save(checksum, filename, lambda: attachment.datas.decode('base64'))
+        return static_assets.get_response(request.httprequest.environ) or request.not_found()
+
     @http.route(['/web/image',
         '/web/image/<string:xmlid>',
         '/web/image/<string:xmlid>/<string:filename>',
@@ -1297,6 +1313,8 @@ class Export(http.Controller):
 
 class ExportFormat(object):
     raw_data = False
+    # the number of records exported at once
+    batch_size = 1000
 
     @property
     def content_type(self):
@@ -1320,6 +1338,30 @@ class ExportFormat(object):
         """
         raise NotImplementedError()
 
+    def stream_data(self, fields, batches):
+        """ Streaming variant of :meth:`from_data`: ``batches`` is an iterable
+        of lists of rows, and the result is an iterable of chunks of bytes.
+        The formats that cannot be written incrementally render the whole file
+        with :meth:`from_data`.
+        """
+        return [self.from_data(fields, [row for rows in batches for row in rows])]
+
+    def export_batches(self, registry, uid, model, ids, field_names, context):
+        """ Generate the exported rows of the records ``ids`` of ``model``,
+        by batches of :attr:`batch_size` records. The rows are generated
+        while the response is sent, after the request is done, hence with
+        their own cursor on ``registry``; the record cache is cleared after
+        every batch, so that the memory used does not depend on the number of
+        records.
+        """
+        if not ids:
+            return
+        with Environment.manage(), registry.cursor() as cr:
+            Model = Environment(cr, uid, context)[model]
+            for sub_ids in split_every(self.batch_size, ids):
+                yield Model.browse(sub_ids).export_data(field_names, self.raw_data).get('datas', [])
+                Model.env.invalidate_all()
+
     def base(self, data, token):
         params = json.loads(data)
         model, fields, ids, domain, import_compat = \
@@ -1335,7 +1377,16 @@ class ExportFormat(object):
             fields = [field for field in fields if field['name'] != 'id']
 
         field_names = map(operator.itemgetter('name'), fields)
-        import_data = Model.export_data(ids, field_names, self.raw_data, context=context).get('datas',[])
+        # the first batch is exported within the request, so that access and
+        # domain errors are still reported instead of an incomplete file; the
+        # request is no longer bound when the next batches are generated
+        head, tail = ids[:self.batch_size], ids[self.batch_size:]
+        records = request.env[model].with_context(context).browse(head)
+        first = records.export_data(field_names, self.raw_data).get('datas', [])
+        batches = itertools.chain(
+            [first],
+            self.export_batches(request.registry, request.uid, model, tail, field_names, context),
+        )
 
         if import_compat:
             columns_headers = field_names
@@ -1343,7 +1394,7 @@ class ExportFormat(object):
             columns_headers = [val['label'].strip() for val in fields]
 
 
-        return request.make_response(self.from_data(columns_headers, import_data),
+        return request.make_response(self.stream_data(columns_headers, batches),
             headers=[('Content-Disposition',
                             content_disposition(self.filename(model))),
                      ('Content-Type', self.content_type)],
@@ -1364,32 +1415,41 @@ class CSVExport(ExportFormat, http.Controller):
         return base + '.csv'
 
     def from_data(self, fields, rows):
+        return ''.join(self.stream_data(fields, [rows]))
+
+    def stream_data(self, fields, batches):
         fp = StringIO()
         writer = csv.writer(fp, quoting=csv.QUOTE_ALL)
 
         writer.writerow([name.encode('utf-8') for name in fields])
 
-        for data in rows:
-            row = []
-            for d in data:
-                if isinstance(d, unicode):
-                    try:
-                        d = d.encode('utf-8')
-                    except UnicodeError:
-                        pass
-                if d is False: d = None
-
-                # Spreadsheet apps tend to detect formulas on leading =, + and -
-                if type(d) is str and d.startswith(('=', '-', '+')):
-                    d = "'" + d
-
-                row.append(d)
-            writer.writerow(row)
+        for rows in batches:
+            for data in rows:
+                row = []
+                for d in data:
+                    if isinstance(d, unicode):
+                        try:
+                            d = d.encode('utf-8')
+                        except UnicodeError:
+                            pass
+                    if d is False: d = None
+
+                    # Spreadsheet apps tend to detect formulas on leading =, + and -
+                    if type(d) is str and d.startswith(('=', '-', '+')):
+                        d = "'" + d
+
+                    row.append(d)
+                writer.writerow(row)
+
+            # send what has been written so far
+            yield fp.getvalue()
+            fp.seek(0)
+            fp.truncate()
 
-        fp.seek(0)
-        data = fp.read()
+        data = fp.getvalue()
         fp.close()
-        return data
+        if data:
+            yield data
 
 class ExcelExport(ExportFormat, http.Controller):
     # Excel needs raw data to correctly handle numbers and date values
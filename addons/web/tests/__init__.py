@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import test_export
 import test_js
 import test_menu
 import test_serving_base
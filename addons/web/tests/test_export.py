@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import urllib
+from StringIO import StringIO
+
+import openerp.tests
+
+from ..controllers import main
+
+
+class TestCSVExport(openerp.tests.HttpCase):
+    def export(self, data):
+        return self.url_open('/web/export/csv?' + urllib.urlencode({'data': json.dumps(data), 'token': 'test'}))
+
+    def test_export_batches(self):
+        # the requests do not see the records created by the test
+        partners = self.env['res.partner'].search([], limit=3, order='id')
+        data = {
+            'model': 'res.partner',
+            'fields': [{'name': 'name', 'label': 'Name'}],
+            'ids': partners.ids,
+            'domain': [],
+            'import_compat': False,
+        }
+        self.authenticate('admin', 'admin')
+
+        # the rows are generated by batches after the request is done
+        batch_size = main.CSVExport.batch_size
+        main.CSVExport.batch_size = 2
+        try:
+            response = self.export(data)
+            content = response.read()
+        finally:
+            main.CSVExport.batch_size = batch_size
+
+        self.assertEqual(response.getcode(), 200)
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows, [['Name']] + [[name.encode('utf-8')] for name in partners.mapped('name')])
+
+    def test_export_access_error(self):
+        # the access error of the first batch is reported, not an empty file
+        crons = self.env['ir.cron'].search([], limit=1)
+        data = {
+            'model': 'ir.cron',
+            'fields': [{'name': 'name', 'label': 'Name'}],
+            'ids': crons.ids,
+            'domain': [],
+            'import_compat': False,
+        }
+        self.authenticate('demo', 'demo')
+        response = self.export(data)
+        self.assertEqual(response.getcode(), 500)
+        # the error is serialized in the page of the response
+        self.assertIn('access_error', response.read())
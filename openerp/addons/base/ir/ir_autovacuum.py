@@ -27,7 +27,13 @@ class AutoVacuum(models.TransientModel):
         """)
         _logger.info("GC'd %d user log entries", cr.rowcount)
 
+    def _gc_rollups(self, cr, uid, *args, **kwargs):
+        for model in self.pool.itervalues():
+            if model._rollups:
+                model._refresh_rollups(cr)
+
     def power_on(self, cr, uid, *args, **kwargs):
         self._gc_transient_models(cr, uid, *args, **kwargs)
         self._gc_user_logs(cr, uid, *args, **kwargs)
+        self._gc_rollups(cr, uid, *args, **kwargs)
         return True
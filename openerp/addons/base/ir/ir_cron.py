@@ -21,6 +21,9 @@ _logger = logging.getLogger(__name__)
 
 BASE_VERSION = load_information_from_description_file('base')['version']
 
+# channel of the notifications sent to the cron schedulers
+CRON_CHANNEL = 'cron_trigger'
+
 def str2tuple(s):
     return eval('tuple(%s)' % (s or ''))
 
@@ -57,7 +60,12 @@ class ir_cron(osv.osv):
         'model': fields.char('Object', help="Model name on which the method to be called is located, e.g. 'res.partner'."),
         'function': fields.char('Method', help="Name of the method to be called when this job is processed."),
         'args': fields.text('Arguments', help="Arguments to be passed to the method, e.g. (uid,)."),
-        'priority': fields.integer('Priority', help='The priority of the job, as an integer: 0 means higher priority, 10 means lower priority.')
+        'priority': fields.integer('Priority', help='The priority of the job, as an integer: 0 means higher priority, 10 means lower priority.'),
+        'lastcall': fields.datetime('Last Execution Date', readonly=True, help="Date of the last execution of this job."),
+        'call_count': fields.integer('Executions', readonly=True, help="Number of executions of this job."),
+        'last_duration': fields.float('Last Duration', readonly=True, help="Duration of the last execution, in seconds."),
+        'average_duration': fields.float('Average Duration', readonly=True, help="Average duration of the executions, in seconds."),
+        'max_duration': fields.float('Maximum Duration', readonly=True, help="Longest duration of the executions, in seconds."),
     }
 
     _defaults = {
@@ -68,6 +76,7 @@ class ir_cron(osv.osv):
         'interval_type' : 'months',
         'numbercall' : 1,
         'active' : 1,
+        'call_count': 0,
     }
 
     def _check_args(self, cr, uid, ids, context=None):
@@ -130,7 +139,6 @@ class ir_cron(osv.osv):
                     if _logger.isEnabledFor(logging.DEBUG):
                         end_time = time.time()
                         _logger.debug('%.3fs (%s, %s)' % (end_time - start_time, model_name, method_name))
-                    openerp.modules.registry.RegistryManager.signal_caches_change(cr.dbname)
                 else:
                     msg = "Method `%s.%s` does not exist." % (model_name, method_name)
                     _logger.warning(msg)
@@ -155,11 +163,14 @@ class ir_cron(osv.osv):
                 numbercall = job['numbercall']
 
                 ok = False
+                calls = 0
+                start = time.time()
                 while nextcall < now and numbercall:
                     if numbercall > 0:
                         numbercall -= 1
                     if not ok or job['doall']:
                         self._callback(job_cr, job['user_id'], job['model'], job['function'], job['args'], job['id'])
+                        calls += 1
                     if numbercall:
                         nextcall += _intervalTypes[job['interval_type']](job['interval_number'])
                     ok = True
@@ -168,26 +179,51 @@ class ir_cron(osv.osv):
                     addsql = ', active=False'
                 cron_cr.execute("UPDATE ir_cron SET nextcall=%s, numbercall=%s"+addsql+" WHERE id=%s",
                            (nextcall.astimezone(pytz.UTC).strftime(DEFAULT_SERVER_DATETIME_FORMAT), numbercall, job['id']))
+                if calls:
+                    self._update_job_stats(cron_cr, job['id'], calls, (time.time() - start) / calls)
                 self.invalidate_cache(job_cr, SUPERUSER_ID)
 
         finally:
             job_cr.commit()
             cron_cr.commit()
+            # signal the cleared caches once the job's changes are committed
+            openerp.modules.registry.RegistryManager.signal_caches_change(job_cr.dbname)
+
+    def _update_job_stats(self, cron_cr, job_id, calls, duration):
+        """ Record ``calls`` executions of the job ``job_id`` that took
+        ``duration`` seconds each.
+        """
+        cron_cr.execute("""UPDATE ir_cron
+                           SET lastcall=(now() at time zone 'UTC'),
+                               last_duration=%(duration)s,
+                               max_duration=GREATEST(COALESCE(max_duration, 0), %(duration)s),
+                               average_duration=(COALESCE(average_duration, 0) * COALESCE(call_count, 0)
+                                                 + %(duration)s * %(calls)s) / (COALESCE(call_count, 0) + %(calls)s),
+                               call_count=COALESCE(call_count, 0) + %(calls)s
+                           WHERE id=%(id)s""",
+                        {'id': job_id, 'calls': calls, 'duration': duration})
 
     @classmethod
     def _acquire_job(cls, db_name):
         # TODO remove 'check' argument from addons/base_action_rule/base_action_rule.py
-        """ Try to process one cron job.
+        """ Try to process the cron jobs of ``db_name``.
 
-        This selects in database all the jobs that should be processed. It then
-        tries to lock each of them and, if it succeeds, run the cron job (if it
-        doesn't succeed, it means the job was already locked to be taken care
-        of by another thread) and return.
+        This selects in database all the jobs that should be processed, and
+        runs them one after the other (see :meth:`_run_job`).
 
         If a job was processed, returns True, otherwise returns False.
         """
+        acquired = False
+        for job in cls._get_due_jobs(db_name):
+            acquired = cls._run_job(db_name, job) or acquired
+        return acquired
+
+    @classmethod
+    def _get_due_jobs(cls, db_name):
+        """ Return the jobs of ``db_name`` that should be processed (as
+        dictionaries), by order of priority.
+        """
         db = openerp.sql_db.db_connect(db_name)
-        threading.current_thread().dbname = db_name
         cr = db.cursor()
         jobs = []
         try:
@@ -213,51 +249,61 @@ class ir_cron(osv.osv):
             _logger.warning('Exception in cron:', exc_info=True)
         finally:
             cr.close()
+        return jobs
+
+    @classmethod
+    def _run_job(cls, db_name, job):
+        """ Try to lock the row of ``job`` (as returned by :meth:`_get_due_jobs`)
+        and, if it succeeds, run the cron job. If the lock cannot be taken, the
+        job is already being processed by another thread or process.
 
-        for job in jobs:
-            lock_cr = db.cursor()
+        If the job was processed, returns True, otherwise returns False.
+        """
+        db = openerp.sql_db.db_connect(db_name)
+        threading.current_thread().dbname = db_name
+        lock_cr = db.cursor()
+        try:
+            # Try to grab an exclusive lock on the job row from within the task transaction
+            # Restrict to the same conditions as for the search since the job may have already
+            # been run by an other thread when cron is running in multi thread
+            lock_cr.execute("""SELECT *
+                               FROM ir_cron
+                               WHERE numbercall != 0
+                                  AND active
+                                  AND nextcall <= (now() at time zone 'UTC')
+                                  AND id=%s
+                               FOR UPDATE NOWAIT""",
+                           (job['id'],), log_exceptions=False)
+
+            locked_job = lock_cr.fetchone()
+            if not locked_job:
+                _logger.debug("Job `%s` already executed by another process/thread. skipping it", job['name'])
+                return False
+            # Got the lock on the job row, run its code
+            _logger.debug('Starting job `%s`.', job['name'])
+            job_cr = db.cursor()
             try:
-                # Try to grab an exclusive lock on the job row from within the task transaction
-                # Restrict to the same conditions as for the search since the job may have already
-                # been run by an other thread when cron is running in multi thread
-                lock_cr.execute("""SELECT *
-                                   FROM ir_cron
-                                   WHERE numbercall != 0
-                                      AND active
-                                      AND nextcall <= (now() at time zone 'UTC')
-                                      AND id=%s
-                                   FOR UPDATE NOWAIT""",
-                               (job['id'],), log_exceptions=False)
-
-                locked_job = lock_cr.fetchone()
-                if not locked_job:
-                    _logger.debug("Job `%s` already executed by another process/thread. skipping it", job['name'])
-                    continue
-                # Got the lock on the job row, run its code
-                _logger.debug('Starting job `%s`.', job['name'])
-                job_cr = db.cursor()
-                try:
-                    registry = openerp.registry(db_name)
-                    registry[cls._name]._process_job(job_cr, job, lock_cr)
-                except Exception:
-                    _logger.exception('Unexpected exception while processing cron job %r', job)
-                finally:
-                    job_cr.close()
-
-            except psycopg2.OperationalError, e:
-                if e.pgcode == '55P03':
-                    # Class 55: Object not in prerequisite state; 55P03: lock_not_available
-                    _logger.debug('Another process/thread is already busy executing job `%s`, skipping it.', job['name'])
-                    continue
-                else:
-                    # Unexpected OperationalError
-                    raise
+                registry = openerp.registry(db_name)
+                registry[cls._name]._process_job(job_cr, job, lock_cr)
+            except Exception:
+                _logger.exception('Unexpected exception while processing cron job %r', job)
             finally:
-                # we're exiting due to an exception while acquiring the lock
-                lock_cr.close()
-
-        if hasattr(threading.current_thread(), 'dbname'): # cron job could have removed it as side-effect
-            del threading.current_thread().dbname
+                job_cr.close()
+            return True
+
+        except psycopg2.OperationalError, e:
+            if e.pgcode == '55P03':
+                # Class 55: Object not in prerequisite state; 55P03: lock_not_available
+                _logger.debug('Another process/thread is already busy executing job `%s`, skipping it.', job['name'])
+                return False
+            else:
+                # Unexpected OperationalError
+                raise
+        finally:
+            # we're exiting due to an exception while acquiring the lock
+            lock_cr.close()
+            if hasattr(threading.current_thread(), 'dbname'): # cron job could have removed it as side-effect
+                del threading.current_thread().dbname
 
     def _try_lock(self, cr, uid, ids, context=None):
         """Try to grab a dummy exclusive write-lock to the rows with the given ids,
@@ -272,13 +318,30 @@ class ir_cron(osv.osv):
                                 "This cron task is currently being executed and may not be modified "
                                 "Please try again in a few minutes"))
 
+    def _notify_scheduler(self, cr):
+        """ Wake up the cron schedulers (see :mod:`openerp.service.cron`)
+        once the current transaction is committed, so that they pick up the
+        new or modified jobs without waiting for their next poll.
+        """
+        dbname = cr.dbname
+        def notify():
+            try:
+                with openerp.sql_db.db_connect('postgres').cursor() as pg_cr:
+                    pg_cr.execute("NOTIFY %s, %%s" % CRON_CHANNEL, (dbname,))
+            except Exception:
+                _logger.warning('Cannot notify the cron schedulers for database %s', dbname, exc_info=True)
+        cr.after('commit', notify)
+
     def create(self, cr, uid, vals, context=None):
         res = super(ir_cron, self).create(cr, uid, vals, context=context)
+        self._notify_scheduler(cr)
         return res
 
     def write(self, cr, uid, ids, vals, context=None):
         self._try_lock(cr, uid, ids, context)
         res = super(ir_cron, self).write(cr, uid, ids, vals, context=context)
+        if 'nextcall' in vals or vals.get('active'):
+            self._notify_scheduler(cr)
         return res
 
     def unlink(self, cr, uid, ids, context=None):
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import collections
 import datetime
 import functools
 import itertools
@@ -297,7 +298,16 @@ class ir_fields_converter(models.AbstractModel):
                  translated user-readable name for the field and the list of
                  warnings
         :rtype: (ID|None, unicode, list)
+
+        During an import, the context key ``import_cache`` is a dict where the
+        references found are memoized (see :meth:`prefetch_references`).
         """
+        cache = self._context.get('import_cache')
+        key = (field.comodel_name, subfield, value)
+        if cache is not None and key in cache:
+            id, field_type, warnings = cache[key]
+            return id, field_type, list(warnings)
+
         id = None
         warnings = []
         action = {'type': 'ir.actions.act_window', 'target': 'new',
@@ -357,8 +367,70 @@ class ir_fields_converter(models.AbstractModel):
                 _(u"No matching record found for %(field_type)s '%(value)s' in field '%%(field)s'"),
                 {'field_type': field_type, 'value': value},
                 {'moreinfo': action})
+        if cache is not None:
+            # only references found are memoized: the missing ones may be
+            # created by the import itself
+            cache[key] = (id, field_type, list(warnings))
         return id, field_type, warnings
 
+    @api.model
+    def prefetch_references(self, model, fields, data):
+        """ Resolve the database ids and external ids referenced by the
+        many2one and many2many columns of ``data``, with a few queries per
+        column instead of a few queries per cell. The result is meant to be
+        given to :meth:`db_id_for` as the context key ``import_cache``; the
+        references by name are not resolved here, as ``name_search`` may be
+        overridden, but they are memoized by :meth:`db_id_for`.
+
+        :param model: :class:`openerp.osv.orm.Model` of the import
+        :param fields: list of field paths, as split by ``load``
+        :param data: row-major matrix of data to import
+        :returns: a dict ``{(comodel_name, subfield, value): (id, field_type, warnings)}``
+        """
+        references = collections.defaultdict(set)
+        for index, path in enumerate(fields):
+            field = self.env[model._name]._fields.get(path[0])
+            if len(path) != 2 or path[1] not in ('id', '.id') or \
+                    not field or field.type not in ('many2one', 'many2many'):
+                continue
+            values = references[(field.comodel_name, path[1])]
+            for row in data:
+                if not row[index]:
+                    continue
+                if field.type == 'many2many':
+                    values.update(row[index].split(','))
+                else:
+                    values.add(row[index])
+
+        cache = {}
+        IrModelData = self.env['ir.model.data']
+        module = self._context.get('_import_current_module', '')
+        for (comodel_name, subfield), values in references.iteritems():
+            if subfield == '.id':
+                # other values are left to db_id_for, which reports them
+                ids = {value: int(value) for value in values if value.isdigit()}
+                field_type = _(u"database id")
+                found = set(self.env[comodel_name].search([('id', 'in', ids.values())]).ids)
+                for value, id in ids.iteritems():
+                    if id in found:
+                        cache[(comodel_name, subfield, value)] = (id, field_type, [])
+            else:
+                xmlids = {value: value if '.' in value else "%s.%s" % (module, value)
+                          for value in values}
+                IrModelData._prefetch_xmlids(xmlids.values())
+                targets = collections.defaultdict(dict)
+                for value, xmlid in xmlids.iteritems():
+                    res_model, res_id = IrModelData.xmlid_to_res_model_res_id(xmlid)
+                    if res_model:
+                        targets[res_model][value] = res_id
+                field_type = _(u"external id")
+                for res_model, ids in targets.iteritems():
+                    found = set(self.env[res_model].browse(ids.values()).exists().ids)
+                    for value, id in ids.iteritems():
+                        if id in found:
+                            cache[(comodel_name, subfield, value)] = (id, field_type, [])
+        return cache
+
     def _referencing_subfield(self, record):
         """ Checks the record for the subfields allowing referencing (an
         existing record in an other table), errors out if it finds potential
@@ -782,7 +782,7 @@ class ir_model_access(osv.osv):
     # But as the method raises an exception in that case,  the key 'lang' might
     # not be really necessary as a cache key, unless the `ormcache_context`
     # decorator catches the exception (it does not at the moment.)
-    @tools.ormcache_context('uid', 'model', 'mode', 'raise_exception', keys=('lang',))
+    @tools.ormcache_context('uid', 'model', 'mode', 'raise_exception', keys=('lang',), group='access')
     def check(self, cr, uid, model, mode='read', raise_exception=True, context=None):
         if uid==1:
             # User root have all accesses
@@ -1005,6 +1005,51 @@ class ir_model_data(osv.osv):
                 raise ValueError('No record found for unique ID %s. It may have been deleted.' % (xmlid))
         return None
 
+    def _prefetch_xmlids(self, cr, uid, xmlids):
+        """ Fill in the cache of :meth:`xmlid_lookup` for the given xml ids,
+        with one query per batch of xml ids instead of two queries per xml id.
+        The xml ids that do not exist are simply ignored.
+        """
+        pairs = set(tuple(xmlid.split('.', 1)) for xmlid in xmlids if '.' in xmlid)
+        for sub_pairs in cr.split_for_in_conditions(list(pairs)):
+            cr.execute("""SELECT id, module, name, model, res_id FROM ir_model_data
+                          WHERE (module, name) IN %s AND res_id IS NOT NULL""",
+                       (tuple(sub_pairs),))
+            for imd_id, module, name, model, res_id in cr.fetchall():
+                cache, key, _ = tools.get_cache_key_counter(
+                    self.xmlid_lookup, cr, uid, '%s.%s' % (module, name))
+                cache[key] = (imd_id, model, res_id)
+
+    def _prefetched(self, cr):
+        """ Return the rows prefetched for :meth:`_update` in the transaction
+        of ``cr``, see :meth:`_prefetch_update`. They are kept on the cursor,
+        so that concurrent module loads do not see each other's rows.
+        """
+        return cr.cache.setdefault(self._name, {})
+
+    def _prefetch_update(self, cr, uid, records):
+        """ Prefetch what :meth:`_update` needs to know about the existing
+        records of the given pairs ``(model, xmlid)``, with one query per batch
+        of records of a given model instead of one query per record. The rows
+        are consumed by :meth:`_update`, and discarded by :meth:`unlink`.
+        """
+        prefetched = self._prefetched(cr)
+        prefetched.clear()
+        by_model = defaultdict(set)
+        for model, xmlid in records:
+            if model in self.pool and '.' in xmlid and self.pool[model]._auto:
+                by_model[model].add(tuple(xmlid.split('.', 1)))
+        for model, pairs in by_model.iteritems():
+            for pair in pairs:
+                prefetched[pair + (model,)] = []
+            for sub_pairs in cr.split_for_in_conditions(list(pairs)):
+                cr.execute('''SELECT imd.module, imd.name, imd.id, imd.res_id, md.id, imd.model, imd.noupdate
+                              FROM ir_model_data imd LEFT JOIN %s md ON (imd.res_id = md.id)
+                              WHERE (imd.module, imd.name) IN %%s''' % self.pool[model]._table,
+                           (tuple(sub_pairs),))
+                for row in cr.fetchall():
+                    prefetched[row[:2] + (model,)].append(row[2:])
+
     # OLD API
     def _get_id(self, cr, uid, module, xml_id):
         """Returns the id of the ir.model.data record corresponding to a given module and xml_id (cached) or raise a ValueError if not found"""
@@ -1059,9 +1104,16 @@ class ir_model_data(osv.osv):
         self.xmlid_lookup.clear_cache(self)
         return self
 
+    def create(self, cr, uid, values, context=None):
+        """ Regular create method, but discard the rows prefetched for the
+        new xml id, as they tell it does not exist. """
+        self._prefetched(cr).pop((values.get('module'), values.get('name'), values.get('model')), None)
+        return super(ir_model_data, self).create(cr, uid, values, context=context)
+
     def unlink(self, cr, uid, ids, context=None):
         """ Regular unlink method, but make sure to clear the caches. """
         self.clear_caches()
+        self._prefetched(cr).clear()
         return super(ir_model_data,self).unlink(cr, uid, ids, context=context)
 
     def _update(self,cr, uid, model, module, values, xml_id=False, store=True, noupdate=False, mode='init', res_id=False, context=None):
@@ -1075,17 +1127,20 @@ class ir_model_data(osv.osv):
             module, xml_id = xml_id.split('.')
         action_id = False
         if xml_id:
-            cr.execute('''SELECT imd.id, imd.res_id, md.id, imd.model, imd.noupdate
-                          FROM ir_model_data imd LEFT JOIN %s md ON (imd.res_id = md.id)
-                          WHERE imd.module=%%s AND imd.name=%%s''' % model_obj._table,
-                          (module, xml_id))
-            results = cr.fetchall()
+            results = self._prefetched(cr).pop((module, xml_id, model), None)
+            if results is None:
+                cr.execute('''SELECT imd.id, imd.res_id, md.id, imd.model, imd.noupdate
+                              FROM ir_model_data imd LEFT JOIN %s md ON (imd.res_id = md.id)
+                              WHERE imd.module=%%s AND imd.name=%%s''' % model_obj._table,
+                              (module, xml_id))
+                results = cr.fetchall()
             for imd_id2,res_id2,real_id2,real_model,noupdate_imd in results:
                 # In update mode, do not update a record if it's ir.model.data is flagged as noupdate
                 if mode == 'update' and noupdate_imd:
                     return res_id2
                 if not real_id2:
                     self.clear_caches()
+                    self._prefetched(cr).clear()
                     cr.execute('delete from ir_model_data where id=%s', (imd_id2,))
                     res_id = False
                 else:
@@ -33,6 +33,7 @@ from openerp.http import request
 from openerp.tools.safe_eval import safe_eval as eval
 from openerp.osv import osv, orm, fields
 from openerp.tools import html_escape as escape
+from openerp.tools import static_assets
 from openerp.tools.misc import find_in_path
 from openerp.tools.translate import _
 from openerp.modules.module import get_resource_path
@@ -167,12 +168,27 @@ class QWeb(orm.AbstractModel):
         self._render_tag[tag] = func
 
     def get_template(self, name, qwebcontext):
+        return self.compile_template(name, qwebcontext).element
+
+    def compile_template(self, name, qwebcontext):
+        """ Returns the :class:`CompiledTemplate` of the template ``name``.
+
+        Compiled templates are cached by template name and source, so that
+        any change to the underlying view gives a new compilation.
+        """
         origin_template = qwebcontext.get('__caller__') or qwebcontext['__stack__'][0]
         try:
             document = qwebcontext.loader(name)
         except ValueError:
             raise_qweb_exception(QWebTemplateNotFound, message="Loader could not find template %r" % name, template=origin_template)
+        return self._compile_template(name, document, origin_template)
+
+    @openerp.tools.conditional(not openerp.tools.config['dev_mode'],
+        openerp.tools.ormcache('name', 'document', group='views'))
+    def _compile_template(self, name, document, origin_template=None):
+        return CompiledTemplate(self, self._parse_template(name, document, origin_template))
 
+    def _parse_template(self, name, document, origin_template=None):
         if hasattr(document, 'documentElement'):
             dom = document
         elif document.startswith("<?xml"):
@@ -183,10 +199,23 @@ class QWeb(orm.AbstractModel):
         res_id = isinstance(name, (int, long)) and name or None
         for node in dom:
             if node.get('t-name') or (res_id and node.tag == "t"):
+                node.attrib.pop("name", False)
                 return node
 
         raise QWebTemplateNotFound("Template %r not found" % name, template=origin_template)
 
+    def compile_node(self, element):
+        """ Returns the :class:`CompiledNode` of ``element``, which is used by
+        :meth:`~.render_node` when rendering an element outside of a compiled
+        template.
+        """
+        return CompiledNode(self, element)
+
+    def get_compiled_node(self, element, qwebcontext):
+        nodes = qwebcontext.get('__compiled__')
+        node = nodes.get(element) if nodes else None
+        return node if node is not None else self.compile_node(element)
+
     def eval(self, expr, qwebcontext):
         try:
             return qwebcontext.safe_eval(expr)
@@ -249,52 +278,40 @@ class QWeb(orm.AbstractModel):
         qwebcontext['__stack__'] = stack
         qwebcontext['xmlid'] = str(stack[0]) # Temporary fix
 
-        element = self.get_template(id_or_xml_id, qwebcontext)
-        element.attrib.pop("name", False)
-        return self.render_node(element, qwebcontext, generated_attributes=qwebcontext.pop('generated_attributes', ''))
+        template = self.compile_template(id_or_xml_id, qwebcontext)
+        qwebcontext['__compiled__'] = template.nodes
+        return self.render_node(template.element, qwebcontext, generated_attributes=qwebcontext.pop('generated_attributes', ''))
 
     def render_node(self, element, qwebcontext, generated_attributes=''):
-        t_render = None
-        template_attributes = {}
+        node = self.get_compiled_node(element, qwebcontext)
 
-        debugger = element.get('t-debug')
-        if debugger is not None:
+        if node.debugger is not None:
             if openerp.tools.config['dev_mode']:
-                __import__(debugger).set_trace()  # pdb, ipdb, pudb, ...
+                __import__(node.debugger).set_trace()  # pdb, ipdb, pudb, ...
             else:
                 _logger.warning("@t-debug in template '%s' is only available in --dev mode" % qwebcontext['__template__'])
 
-        for (attribute_name, attribute_value) in element.attrib.iteritems():
-            attribute_name = unicode(attribute_name)
-            if attribute_name == "groups":
-                cr = qwebcontext.get('request') and qwebcontext['request'].cr or None
-                uid = qwebcontext.get('request') and qwebcontext['request'].uid or None
-                can_see = self.user_has_groups(cr, uid, groups=attribute_value) if cr and uid else False
-                if not can_see:
-                    return element.tail and self.render_tail(element.tail, element, qwebcontext) or ''
+        if node.groups is not None:
+            cr = qwebcontext.get('request') and qwebcontext['request'].cr or None
+            uid = qwebcontext.get('request') and qwebcontext['request'].uid or None
+            can_see = self.user_has_groups(cr, uid, groups=node.groups) if cr and uid else False
+            if not can_see:
+                return element.tail and self.render_tail(element.tail, element, qwebcontext) or ''
 
-            attribute_value = attribute_value.encode("utf8")
-
-            if attribute_name.startswith("t-"):
-                for attribute in self._render_att:
-                    if attribute_name[2:].startswith(attribute):
-                        attrs = self._render_att[attribute](
-                            self, element, attribute_name, attribute_value, qwebcontext)
-                        for att, val in attrs:
-                            if not val: continue
-                            generated_attributes += self.render_attribute(element, att, val, qwebcontext)
-                        break
-                else:
-                    if attribute_name[2:] in self._render_tag:
-                        t_render = attribute_name[2:]
-                    template_attributes[attribute_name[2:]] = attribute_value
-            else:
+        for (attribute, attribute_name, attribute_value) in node.attributes:
+            if attribute is None:
                 generated_attributes += self.render_attribute(element, attribute_name, attribute_value, qwebcontext)
-
-        if t_render:
-            result = self._render_tag[t_render](self, element, template_attributes, generated_attributes, qwebcontext)
+                continue
+            attrs = self._render_att[attribute](
+                self, element, attribute_name, attribute_value, qwebcontext)
+            for att, val in attrs:
+                if not val: continue
+                generated_attributes += self.render_attribute(element, att, val, qwebcontext)
+
+        if node.t_render:
+            result = self._render_tag[node.t_render](self, element, node.template_attributes, generated_attributes, qwebcontext)
         else:
-            result = self.render_element(element, template_attributes, generated_attributes, qwebcontext)
+            result = self.render_element(element, node.template_attributes, generated_attributes, qwebcontext)
 
         if element.tail:
             result += self.render_tail(element.tail, element, qwebcontext)
@@ -314,7 +331,7 @@ class QWeb(orm.AbstractModel):
             g_inner = inner.encode('utf-8') if isinstance(inner, unicode) else inner
         else:
             g_inner = [] if element.text is None else [self.render_text(element.text, element, qwebcontext)]
-            for current_node in element.iterchildren(tag=etree.Element):
+            for current_node in self.get_compiled_node(element, qwebcontext).children:
                 try:
                     g_inner.append(self.render_node(current_node, qwebcontext,
                         generated_attributes= name == "t" and generated_attributes or ''))
@@ -480,6 +497,19 @@ class QWeb(orm.AbstractModel):
         async = self.get_attr_bool(template_attributes.get('async'), default=False)
         return bundle.to_html(css=css, js=js, debug=bool(qwebcontext.get('debug')), async=async, qwebcontext=qwebcontext)
 
+    @openerp.tools.conditional(not openerp.tools.config['dev_mode'],
+        openerp.tools.ormcache('xmlid', 'html', 'type', group='views'))
+    def _get_asset_urls(self, xmlid, html, type, bundle):
+        """ Return the urls of the static copies of the ``type`` files
+        (``'js'`` or ``'css'``) of ``bundle``, identified by its ``xmlid``
+        and its rendering ``html``.
+
+        Outside of dev mode, the result is cached, so that the source files
+        of the bundle are not checked on every rendering; they are expected
+        not to change while the server runs.
+        """
+        return bundle.static_urls(type)
+
     def render_tag_set(self, element, template_attributes, generated_attributes, qwebcontext):
         if "value" in template_attributes:
             qwebcontext[template_attributes["set"]] = self.eval_object(template_attributes["value"], qwebcontext)
@@ -540,6 +570,69 @@ class QWeb(orm.AbstractModel):
                 return True
         return default
 
+class CompiledNode(object):
+    """ Pre-processed QWeb element: its attributes are decoded and classified
+    once, instead of being inspected each time the element is rendered.
+
+    ``attributes`` is the list of ``(att, name, value)`` to generate, in
+    document order, where ``att`` is the key of the ``render_att_*`` method
+    to call, or ``None`` for a static attribute.
+    """
+    __slots__ = ['debugger', 'groups', 'attributes', 't_render',
+                 'template_attributes', 'children']
+
+    def __init__(self, qweb, element):
+        self.debugger = element.get('t-debug')
+        self.groups = None
+        self.attributes = []
+        self.t_render = None
+        self.template_attributes = {}
+        self.children = list(element.iterchildren(tag=etree.Element))
+
+        for (attribute_name, attribute_value) in element.attrib.iteritems():
+            attribute_name = unicode(attribute_name)
+            if attribute_name == "groups":
+                self.groups = attribute_value
+
+            attribute_value = attribute_value.encode("utf8")
+
+            if attribute_name.startswith("t-"):
+                for attribute in qweb._render_att:
+                    if attribute_name[2:].startswith(attribute):
+                        self.attributes.append((attribute, attribute_name, attribute_value))
+                        break
+                else:
+                    if attribute_name[2:] in qweb._render_tag:
+                        self.t_render = attribute_name[2:]
+                    self.template_attributes[attribute_name[2:]] = attribute_value
+            else:
+                self.attributes.append((None, attribute_name, attribute_value))
+
+
+class CompiledTemplate(object):
+    """ Template compiled for rendering: the root ``element`` of the template
+    and the :class:`CompiledNode` of each of its elements, by element.
+
+    Compiled templates are shared between renderings, so neither the elements
+    nor the nodes may be modified by the rendering.
+
+    Templates are not compiled into Python functions: rendering still walks
+    the element tree and calls the ``render_tag_*`` and ``render_att_*``
+    methods, which modules extend. Only the parsing of the template and the
+    classification of the attributes are done once, and the expressions are
+    compiled once by :func:`~openerp.tools.safe_eval.safe_compile`.
+    """
+    __slots__ = ['element', 'nodes']
+
+    def __init__(self, qweb, element):
+        self.element = element
+        # the mapping keeps the element proxies alive, which guarantees that
+        # lxml returns the same objects when traversing the tree
+        self.nodes = dict(
+            (node, qweb.compile_node(node))
+            for node in element.iter(tag=etree.Element)
+        )
+
 #--------------------------------------------------------------------
 # QWeb Fields converters
 #--------------------------------------------------------------------
@@ -1191,20 +1284,23 @@ class AssetsBundle(object):
         else:
             if qwebcontext is None:
                 qwebcontext = QWebContext(self.cr, self.uid, {})
+            qweb = self.registry['ir.qweb']
             if css and self.stylesheets:
-                css_attachments = self.css()
-                if not self.css_errors:
-                    for attachment in css_attachments:
-                        el = etree.fromstring('<link href="%s" rel="stylesheet"/>' % attachment.url)
-                        response.append(self.registry['ir.qweb'].render_node(el, qwebcontext))
-                else:
+                try:
+                    css_urls = qweb._get_asset_urls(self.xmlid, self.html, 'css', self)
+                except AssetError:
                     msg = '\n'.join(self.css_errors)
                     self.stylesheets.append(StylesheetAsset(self, inline=self.css_message(msg)))
                     for style in self.stylesheets:
                         response.append(style.to_html())
+                else:
+                    for url in css_urls:
+                        el = etree.fromstring('<link href="%s" rel="stylesheet"/>' % url)
+                        response.append(qweb.render_node(el, qwebcontext))
             if js and self.javascripts:
-                el = etree.fromstring('<script %s type="text/javascript" src="%s"></script>' % (async and 'async="async"' or '', self.js().url))
-                response.append(self.registry['ir.qweb'].render_node(el, qwebcontext))
+                [js_url] = qweb._get_asset_urls(self.xmlid, self.html, 'js', self)
+                el = etree.fromstring('<script %s type="text/javascript" src="%s"></script>' % (async and 'async="async"' or '', js_url))
+                response.append(qweb.render_node(el, qwebcontext))
         response.extend(self.remains)
         return sep + sep.join(response)
 
@@ -1286,6 +1382,24 @@ class AssetsBundle(object):
 
         return ira.browse(self.cr, openerp.SUPERUSER_ID, attachment_id, context=self.context)
 
+    def static_urls(self, type):
+        """ Return the urls of the static copies of the attachments of type
+        ``type`` (``'js'`` or ``'css'``) of the bundle, generating them if
+        necessary. Raise an :class:`AssetError` if the stylesheets cannot be
+        compiled.
+        """
+        if type == 'js':
+            attachments = self.js()
+        else:
+            attachments = self.css()
+            if self.css_errors:
+                raise AssetError('\n'.join(self.css_errors))
+        return tuple(
+            static_assets.save(attachment.checksum, attachment.datas_fname,
+                               lambda: attachment.datas.decode('base64'))
+            for attachment in attachments
+        )
+
     def js(self):
         attachments = self.get_attachments('js')
         if not attachments:
@@ -8,6 +8,13 @@ from openerp.osv import fields, osv, expression
 from openerp.tools.safe_eval import safe_eval as eval
 from openerp.tools.misc import unquote as unquote
 
+def _freeze(value):
+    """ Return a hashable version of the domain or domain value ``value``. """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
 class ir_rule(osv.osv):
     _name = 'ir.rule'
     _order = 'name'
@@ -85,7 +92,7 @@ class ir_rule(osv.osv):
         (_check_model_name, 'Rules can not be applied on the Record Rules model.', ['model_id']),
     ]
 
-    @tools.ormcache('uid', 'model_name', 'mode')
+    @tools.ormcache('uid', 'model_name', 'mode', group='rules')
     def _compute_domain(self, cr, uid, model_name, mode="read"):
         if mode not in self._MODES:
             raise ValueError('Invalid mode: %r' % (mode,))
@@ -105,15 +112,16 @@ class ir_rule(osv.osv):
         if rule_ids:
             # browse user as super-admin root to avoid access errors!
             user = self.pool.get('res.users').browse(cr, SUPERUSER_ID, uid)
+            user_group_ids = set(user.groups_id.ids)
+            # evaluate the domains as UID to have the correct eval context
+            eval_context = self._eval_context(cr, uid)
             global_domains = []                 # list of domains
             group_domains = {}                  # map: group -> list of domains
             for rule in self.browse(cr, SUPERUSER_ID, rule_ids):
-                # read 'domain' as UID to have the correct eval context for the rule.
-                rule_domain = self.read(cr, uid, [rule.id], ['domain'])[0]['domain']
-                dom = expression.normalize_domain(rule_domain)
-                for group in rule.groups:
-                    if group in user.groups_id:
-                        group_domains.setdefault(group, []).append(dom)
+                dom = expression.normalize_domain(eval(rule.domain_force, eval_context) if rule.domain_force else [])
+                for group_id in rule.groups.ids:
+                    if group_id in user_group_ids:
+                        group_domains.setdefault(group_id, []).append(dom)
                 if not rule.groups:
                     global_domains.append(dom)
             # combine global domains and group domains
@@ -125,6 +133,48 @@ class ir_rule(osv.osv):
             return domain
         return []
 
+    def _is_cacheable_domain(self, cr, model_name, domain):
+        """ Return whether the SQL of ``domain`` on ``model_name`` only
+            depends on the models' fields and on data whose changes clear the
+            cache group 'rules'. This is the case for conditions on the
+            columns of the model, and for hierarchical conditions on companies
+            (changing companies clears all the caches).
+        """
+        model = self.pool[model_name]
+        for element in domain:
+            if expression.is_leaf(element) and element[1] in ('child_of', 'parent_of'):
+                column = model._columns.get(element[0])
+                if not (column and column._type == 'many2one' and column._obj == 'res.company'
+                        and isinstance(element[2], (int, long, list, tuple))):
+                    return False
+            elif expression.term_shape(model, element) is None:
+                return False
+        return True
+
+    def _domain_sql(self, cr, model_name, domain):
+        """ Return the where clauses, their parameters and the tables of the
+            SQL query that implements ``domain`` on ``model_name``.
+        """
+        # _where_calc is called as superuser. This means that rules can
+        # involve objects on which the real uid has no acces rights.
+        # This means also there is no implicit restriction (e.g. an object
+        # references another object the user can't see).
+        query = self.pool[model_name]._where_calc(cr, SUPERUSER_ID, domain, active_test=False)
+        return tuple(query.where_clause), tuple(query.where_clause_params), tuple(query.tables)
+
+    @tools.ormcache('model_name', 'key', group='rules')
+    def _cached_domain_sql(self, cr, model_name, key, domain):
+        """ Same as :meth:`_domain_sql`, for a domain given by its hashable
+            form ``key``. The queries are shared by all the users whose rules
+            give the same domain, like the users with the same groups and
+            companies.
+        """
+        return self._domain_sql(cr, model_name, domain)
+
+    def clear_caches(self):
+        """ Clear the caches of record rules only. """
+        self.pool.clear_cache('rules')
+
     def clear_cache(self, cr, uid):
         """ Deprecated, use `clear_caches` instead. """
         self.clear_caches()
@@ -132,12 +182,11 @@ class ir_rule(osv.osv):
     def domain_get(self, cr, uid, model_name, mode='read', context=None):
         dom = self._compute_domain(cr, uid, model_name, mode)
         if dom:
-            # _where_calc is called as superuser. This means that rules can
-            # involve objects on which the real uid has no acces rights.
-            # This means also there is no implicit restriction (e.g. an object
-            # references another object the user can't see).
-            query = self.pool[model_name]._where_calc(cr, SUPERUSER_ID, dom, active_test=False)
-            return query.where_clause, query.where_clause_params, query.tables
+            if self._is_cacheable_domain(cr, model_name, dom):
+                clauses, params, tables = self._cached_domain_sql(cr, model_name, _freeze(dom), dom)
+            else:
+                clauses, params, tables = self._domain_sql(cr, model_name, dom)
+            return list(clauses), list(params), list(tables)
         return [], [], ['"' + self.pool[model_name]._table + '"']
 
     def unlink(self, cr, uid, ids, context=None):
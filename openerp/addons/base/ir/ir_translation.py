@@ -306,6 +306,12 @@ class ir_translation(osv.osv):
                 translations[res_id] = value
         return translations
 
+    def clear_caches(self):
+        """ Clear the caches of translations, and the caches that depend on
+        them, like views and menus.
+        """
+        self.pool.clear_cache('translations')
+
     def _set_ids(self, cr, uid, name, tt, lang, ids, value, src=None):
         self.clear_caches()
         cr.execute('update ir_translation '
@@ -361,7 +367,7 @@ class ir_translation(osv.osv):
         
         return (query, params)
 
-    @tools.ormcache('name', 'types', 'lang', 'source', 'res_id')
+    @tools.ormcache('name', 'types', 'lang', 'source', 'res_id', group='translations')
     def __get_source(self, cr, uid, name, types, lang, source, res_id):
         # res_id is a tuple or None, otherwise ormcache cannot cache it!
         query, params = self._get_source_query(cr, uid, name, types, lang, source, res_id)
@@ -398,7 +404,63 @@ class ir_translation(osv.osv):
                 res_id = (res_id,)
             else:
                 res_id = tuple(res_id)
-        return self.__get_source(cr, uid, name, types, lang, source, res_id)
+            return self.__get_source(cr, uid, name, types, lang, source, res_id)
+        if 'model' in types:
+            return self.__get_source(cr, uid, name, types, lang, source, res_id)
+
+        catalog = self._get_catalog(cr, lang)
+        if source:
+            source = tools.ustr(source)
+            for key in ((tt, tools.ustr(name), source) if name else ('src', tt, source) for tt in types):
+                if key in catalog:
+                    return catalog[key]
+            return source
+        else:
+            for key in (('name', tt, tools.ustr(name)) for tt in types):
+                if key in catalog:
+                    return catalog[key]
+            return u''
+
+    def _get_catalog(self, cr, lang):
+        """ Return the translated terms of ``lang``, except the model terms, as
+        a dict with keys:
+
+        - ``(type, name, src)`` for the terms with a source,
+        - ``('src', type, src)`` for the terms with a source, whatever their name,
+        - ``('name', type, name)`` for the terms by name.
+
+        The catalog is loaded with one query, and kept in the translations
+        cache of the current process until that cache is cleared.
+        """
+        # the namespace of the key is not a model: not shared among processes,
+        # which would unpickle the whole catalog at every lookup
+        key = ('ir.translation.catalog', lang)
+        cache = self.pool.caches['translations']
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        query, params = self._get_catalog_query(cr, lang)
+        cr.execute(query, params)
+        catalog = {}
+        for tt, name, src, value in cr.fetchall():
+            if src:
+                catalog.setdefault((tt, name, src), value)
+                catalog.setdefault(('src', tt, src), value)
+            if name:
+                catalog.setdefault(('name', tt, name), value)
+        cache[key] = catalog
+        return catalog
+
+    def _get_catalog_query(self, cr, lang):
+        """ Utility function that makes the query for the catalog of ``lang``
+        (see :meth:`_get_catalog`). When several rows translate the same
+        term, the first one is kept: the query is ordered like the one of
+        :meth:`_get_source_query`, whose first row is used.
+        """
+        query = """ SELECT type, name, src, value FROM ir_translation
+                    WHERE lang=%s AND type!='model' AND value!='' """
+        return query, (lang,)
 
     @api.model
     def _get_terms_query(self, field, records):
@@ -477,7 +539,7 @@ class ir_translation(osv.osv):
         discarded.unlink()
 
     @api.model
-    @tools.ormcache_context('model_name', keys=('lang',))
+    @tools.ormcache_context('model_name', keys=('lang',), group='translations')
     def get_field_string(self, model_name):
         """ Return the translation of fields strings in the context's language.
         Note that the result contains the available translations only.
@@ -489,7 +551,7 @@ class ir_translation(osv.osv):
         return {field.name: field.field_description for field in fields}
 
     @api.model
-    @tools.ormcache_context('model_name', keys=('lang',))
+    @tools.ormcache_context('model_name', keys=('lang',), group='translations')
     def get_field_help(self, model_name):
         """ Return the translation of fields help in the context's language.
         Note that the result contains the available translations only.
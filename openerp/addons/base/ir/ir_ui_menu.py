@@ -24,7 +24,7 @@ class ir_ui_menu(osv.osv):
         self.pool['ir.model.access'].register_cache_clearing_method(self._name, 'clear_caches')
 
     @api.model
-    @tools.ormcache('frozenset(self.env.user.groups_id.ids)', 'debug')
+    @tools.ormcache('frozenset(self.env.user.groups_id.ids)', 'debug', group='menus')
     def _visible_menu_ids(self, debug=False):
         """ Return the ids of the menu items visible to the user. """
         # retrieve all menus, and determine which ones are visible
@@ -122,6 +122,10 @@ class ir_ui_menu(osv.osv):
             parent_path = ''
         return parent_path + elmt.name
 
+    def clear_caches(self):
+        """ Clear the caches of menus only. """
+        self.pool.clear_cache('menus')
+
     def create(self, cr, uid, values, context=None):
         self.clear_caches()
         return super(ir_ui_menu, self).create(cr, uid, values, context=context)
@@ -238,7 +242,7 @@ class ir_ui_menu(osv.osv):
         return self.search(cr, uid, menu_domain, context=context)
 
     @api.cr_uid_context
-    @tools.ormcache_context('uid', keys=('lang',))
+    @tools.ormcache_context('uid', keys=('lang',), group='menus')
     def load_menus_root(self, cr, uid, context=None):
         fields = ['name', 'sequence', 'parent_id', 'action', 'web_icon_data']
         menu_root_ids = self.get_user_roots(cr, uid, context=context)
@@ -252,7 +256,7 @@ class ir_ui_menu(osv.osv):
         }
 
     @api.cr_uid_context
-    @tools.ormcache_context('uid', 'debug', keys=('lang',))
+    @tools.ormcache_context('uid', 'debug', keys=('lang',), group='menus')
     def load_menus(self, cr, uid, debug, context=None):
         """ Loads all menu items (all applications and their sub-menus).
 
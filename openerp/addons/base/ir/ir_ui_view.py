@@ -927,7 +927,8 @@ class view(osv.osv):
     # apply ormcache_context decorator unless in dev mode...
     @tools.conditional(not config['dev_mode'],
         tools.ormcache_context('uid', 'view_id',
-            keys=('lang', 'inherit_branding', 'editable', 'translatable', 'edit_translations')))
+            keys=('lang', 'inherit_branding', 'editable', 'translatable', 'edit_translations'),
+            group='views'))
     def _read_template(self, cr, uid, view_id, context=None):
         arch = self.read_combined(cr, uid, view_id, fields=['arch'], context=context)['arch']
         arch_tree = etree.fromstring(arch)
@@ -949,6 +950,10 @@ class view(osv.osv):
     def get_view_id(self, cr, uid, xml_id, context=None):
         return self.pool['ir.model.data'].xmlid_to_res_id(cr, uid, xml_id, raise_if_not_found=True)
 
+    def clear_caches(self):
+        """ Clear the caches of views only. """
+        self.pool.clear_cache('views')
+
     def clear_cache(self):
         """ Deprecated, use `clear_caches` instead. """
         if not config['dev_mode']:
@@ -1028,7 +1033,7 @@ class view(osv.osv):
         # Deprecated: templates are translated once read from database
         return arch
 
-    @openerp.tools.ormcache('uid', 'id')
+    @openerp.tools.ormcache('uid', 'id', group='views')
     def get_view_xmlid(self, cr, uid, id):
         imd = self.pool['ir.model.data']
         domain = [('model', '=', 'ir.ui.view'), ('res_id', '=', id)]
@@ -413,7 +413,7 @@ class res_users(osv.osv):
             default['login'] = _("%s (copy)") % user2copy['login']
         return super(res_users, self).copy(cr, uid, id, default, context)
 
-    @tools.ormcache('uid')
+    @tools.ormcache('uid', group='access')
     def context_get(self, cr, uid, context=None):
         user = self.browse(cr, SUPERUSER_ID, uid, context)
         result = {}
@@ -548,7 +548,7 @@ class res_users(osv.osv):
         return self._has_group(self.env.cr, uid, group_ext_id)
 
     @api.noguess
-    @tools.ormcache('uid', 'group_ext_id')
+    @tools.ormcache('uid', 'group_ext_id', group='access')
     def _has_group(self, cr, uid, group_ext_id):
         """Checks whether user belongs to given group.
 
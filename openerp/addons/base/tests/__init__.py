@@ -2,6 +2,9 @@ import test_acl
 import test_api
 import test_base
 import test_basecase
+import test_cache_store
+import test_convert
+import test_cron
 import test_db_cursor
 import test_expression
 import test_func
@@ -11,6 +14,7 @@ import test_ir_filters
 import test_ir_sequence
 import test_ir_sequence_date_range
 import test_ir_values
+import test_lru
 import test_mail
 import test_menu
 import test_orm
@@ -20,6 +24,7 @@ import test_qweb
 import test_res_config
 import test_res_lang
 import test_search
+import test_session_store
 import test_translate
 #import test_uninstall
 import test_user_has_group
@@ -164,5 +164,38 @@ class TestACL(common.TransactionCase):
         # cleanup
         self.erp_manager_group.write({'users': [(3, self.demo_uid)]})
 
+
+class TestRuleSQL(common.TransactionCase):
+
+    def test_rule_sql(self):
+        Partner = self.env['res.partner']
+        Rule = self.registry('ir.rule')
+        cr, demo_uid = self.cr, self.env.ref('base.user_demo').id
+        p1 = Partner.create({'name': 'test_rule_sql 1', 'ref': 'TRS-ALLOWED'})
+        p2 = Partner.create({'name': 'test_rule_sql 2', 'ref': 'TRS-FORBIDDEN'})
+        self.env['ir.rule'].create({
+            'name': 'test_rule_sql',
+            'model_id': self.env.ref('base.model_res_partner').id,
+            'domain_force': "['|', ('ref', '=', False), ('ref', '!=', 'TRS-FORBIDDEN')]",
+        })
+
+        clauses = Rule.domain_get(cr, demo_uid, 'res.partner', 'write')
+        self.assertTrue(clauses[0])
+        self.assertEqual(Rule.domain_get(cr, demo_uid, 'res.partner', 'write'), clauses)
+
+        # check the records in bulk
+        self.assertItemsEqual(
+            self.registry('res.partner')._filter_access_rules(cr, demo_uid, [p1.id, p2.id], 'write'),
+            [p1.id])
+        Partner.sudo(demo_uid).browse(p1.id).check_access_rule('write')
+        with self.assertRaises(AccessError):
+            Partner.sudo(demo_uid).browse([p1.id, p2.id]).check_access_rule('write')
+
+        # only the domains that depend on the fields and the companies are cached
+        self.assertTrue(Rule._is_cacheable_domain(cr, 'res.partner',
+            ['|', ('company_id', 'child_of', [1]), ('ref', '=', False)]))
+        self.assertFalse(Rule._is_cacheable_domain(cr, 'res.partner', [('parent_id', 'child_of', [1])]))
+        self.assertFalse(Rule._is_cacheable_domain(cr, 'res.partner', [('parent_id.ref', '=', 'x')]))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,6 @@
 
 from openerp import models
-from openerp.tools import mute_logger
+from openerp.tools import config, mute_logger
 from openerp.tests import common
 from openerp.exceptions import AccessError
 
@@ -348,6 +348,47 @@ class TestAPI(common.TransactionCase):
             countries |= p.country_id
         self.assertLessEqual(set(countries.ids), set(country_ids))
 
+    @mute_logger('openerp.models')
+    def test_61_cache_prefetch_groups(self):
+        """ Check the prefetching of records reached together """
+        countries = self.env['res.country'].search([], limit=2)
+        self.assertEqual(len(countries), 2)
+        Partner = self.env['res.partner']
+        ids = [
+            Partner.create({'name': 'Group %d' % index, 'country_id': countries[index % 2].id}).id
+            for index in xrange(4)
+        ]
+        self.env.invalidate_all()
+        partners = Partner.browse(ids)
+        self.assertEqual(self.env.prefetch_group('res.partner', ids[0]), partners._ids)
+
+        # the countries reached from the partners make a group
+        partners[0].country_id
+        group = self.env.prefetch_group('res.country', countries[0].id)
+        self.assertEqual(set(group), set(countries.ids))
+
+        # the group is also used in another environment, where only one
+        # partner has been browsed
+        partner = Partner.with_context(prefetch_group_test=True).browse(ids[0])
+        self.assertEqual(partner.env.prefetch['res.partner'], set([partner.id]))
+        partner.name
+        name_cache = partner.env.cache[partners._fields['name']]
+        self.assertLessEqual(set(ids), set(name_cache))
+
+    def test_62_prefetch_group_size(self):
+        """ Check that prefetch groups are limited to the batch size """
+        ids = self.env['res.partner'].search([], limit=3).ids
+        self.assertEqual(len(ids), 3)
+        batch_size = config['prefetch_batch_size']
+        config['prefetch_batch_size'] = 2
+        try:
+            self.env.invalidate_all()
+            self.env['res.partner'].browse(ids)
+        finally:
+            config['prefetch_batch_size'] = batch_size
+        self.assertEqual(self.env.prefetch_group('res.partner', ids[0]), tuple(ids[:2]))
+        self.assertIsNone(self.env.prefetch_group('res.partner', ids[2]))
+
     @mute_logger('openerp.models')
     def test_70_one(self):
         """ Check method one(). """
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from openerp.tools.cache_store import LocalStore, SharedStore, StoreClient, StoreServer
+
+
+def cached_method():
+    pass
+
+
+class TestSharedStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'ormcache.sock')
+        self.server = StoreServer(self.path)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def store(self, db_name='db'):
+        return SharedStore(db_name, StoreClient(self.path), ['res.groups'])
+
+    def test_shared_entries(self):
+        store1, store2 = self.store(), self.store()
+        key = ('res.groups', cached_method, 42)
+        store1[key] = {'value': 42}
+        self.assertEqual(store2[key], {'value': 42})
+        self.assertIn(key, list(store2.iterkeys()))
+        # other databases do not see the entry
+        self.assertNotIn(key, self.store('other'))
+
+        # local entries are not shared
+        key = ('res.users', cached_method, 42)
+        store1[key] = 42
+        self.assertEqual(store1[key], 42)
+        self.assertNotIn(key, store2)
+
+        # unpicklable values are kept locally
+        key = ('res.groups', cached_method, 'lambda')
+        value = lambda: None
+        store1[key] = value
+        self.assertIs(store1[key], value)
+        self.assertNotIn(key, store2)
+
+        # unhashable keys are rejected like in a local store
+        with self.assertRaises(TypeError):
+            store1[('res.groups', cached_method, [1])]
+
+    def test_clear(self):
+        store1, store2 = self.store(), self.store()
+        shared = ('res.groups', cached_method, 1)
+        local = ('res.users', cached_method, 1)
+        store1[shared] = store1[local] = 1
+
+        # only clear local entries
+        with store1.local_only():
+            store1.clear()
+        self.assertNotIn(local, store1)
+        self.assertIn(shared, store2)
+
+        # clear a namespace
+        store1[local] = 1
+        store1.clear('res.groups')
+        self.assertNotIn(shared, store2)
+        self.assertIn(local, store1)
+
+        # clear everything
+        store1[shared] = 1
+        store2.clear()
+        self.assertNotIn(shared, store1)
+
+    def test_unavailable(self):
+        store = self.store()
+        self.server.shutdown()
+        self.server.server_close()
+        os.unlink(self.path)
+        key = ('res.groups', cached_method, 1)
+        store[key] = 1
+        self.assertEqual(store[key], 1)
+        self.assertEqual(len(store), 1)
+
+    def test_local_store(self):
+        store = LocalStore()
+        store[('res.groups', cached_method, 1)] = 1
+        store[('res.users', cached_method, 1)] = 1
+        store.clear('res.groups')
+        self.assertEqual(list(store.iterkeys()), [('res.users', cached_method, 1)])
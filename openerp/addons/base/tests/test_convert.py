@@ -0,0 +1,63 @@
+from StringIO import StringIO
+
+from openerp.tests import common
+from openerp.tools import get_cache_key_counter
+from openerp.tools.convert import convert_xml_import
+
+
+class TestXMLImport(common.TransactionCase):
+
+    def import_xml(self, xml, mode='init'):
+        idref = {}
+        convert_xml_import(self.cr, 'test_convert', StringIO(xml), idref, mode)
+        return idref
+
+    def test_prefetch_xmlids(self):
+        IMD = self.registry('ir.model.data')
+        IMD.clear_caches()
+        cache, key, _ = get_cache_key_counter(IMD.xmlid_lookup, self.cr, self.uid, 'base.group_user')
+        self.assertNotIn(key, cache)
+
+        IMD._prefetch_xmlids(self.cr, self.uid, ['base.group_user', 'base.no_such_xmlid'])
+        imd_id = IMD.search(self.cr, self.uid, [('module', '=', 'base'), ('name', '=', 'group_user')])[0]
+        self.assertEqual(cache[key], (imd_id, 'res.groups', self.ref('base.group_user')))
+        with self.assertRaises(ValueError):
+            IMD.xmlid_lookup(self.cr, self.uid, 'base.no_such_xmlid')
+
+    def test_import_update(self):
+        xml = """<odoo>
+            <record id="partner_a" model="res.partner">
+                <field name="name">%s</field>
+                <field name="country_id" ref="base.be"/>
+            </record>
+            <record id="partner_b" model="res.partner">
+                <field name="name">B</field>
+                <field name="parent_id" ref="partner_a"/>
+                <field name="company_id" eval="ref('base.main_company')"/>
+            </record>
+        </odoo>"""
+        idref = self.import_xml(xml % 'A')
+        partner_a = self.env['res.partner'].browse(idref['partner_a'])
+        partner_b = self.env['res.partner'].browse(idref['partner_b'])
+        self.assertEqual(partner_a.country_id, self.env.ref('base.be'))
+        self.assertEqual(partner_b.parent_id, partner_a)
+        self.assertEqual(partner_b.company_id, self.env.ref('base.main_company'))
+
+        # updating the records uses the prefetched data, and keeps them
+        idref = self.import_xml(xml % 'A2', mode='update')
+        self.assertEqual(idref['partner_a'], partner_a.id)
+        self.assertEqual(idref['partner_b'], partner_b.id)
+        partner_a.invalidate_cache()
+        self.assertEqual(partner_a.name, 'A2')
+        self.assertFalse(self.registry('ir.model.data')._prefetched(self.cr))
+
+        # a record deleted meanwhile is created again
+        xml_delete = """<odoo>
+            <delete model="res.partner" id="partner_b"/>
+            <record id="partner_b" model="res.partner">
+                <field name="name">B2</field>
+            </record>
+        </odoo>"""
+        idref = self.import_xml(xml_delete, mode='update')
+        self.assertNotEqual(idref['partner_b'], partner_b.id)
+        self.assertFalse(partner_b.exists())
@@ -0,0 +1,44 @@
+import unittest
+
+from openerp.service.cron import CronPool
+
+
+def jobs(*ids):
+    return [{'id': id, 'name': 'job%d' % id} for id in ids]
+
+
+class TestCronPool(unittest.TestCase):
+    def next_jobs(self, pool):
+        result = []
+        item = pool._next_job()
+        while item is not None:
+            result.append((item[0], item[1]['id']))
+            item = pool._next_job()
+        return result
+
+    def test_fairness(self):
+        pool = CronPool(4)
+        pool.queue('db1', jobs(1, 2, 3))
+        pool.queue('db2', jobs(1))
+        self.assertEqual(self.next_jobs(pool), [('db1', 1), ('db2', 1), ('db1', 2), ('db1', 3)])
+
+    def test_max_threads_per_db(self):
+        pool = CronPool(4, max_threads_per_db=1)
+        pool.queue('db1', jobs(1, 2))
+        pool.queue('db2', jobs(1))
+        self.assertEqual(self.next_jobs(pool), [('db1', 1), ('db2', 1)])
+        pool._job_done('db1', {'id': 1})
+        self.assertEqual(self.next_jobs(pool), [('db1', 2)])
+
+    def test_no_duplicate(self):
+        pool = CronPool(4)
+        pool.queue('db1', jobs(1, 2))
+        pool.queue('db1', jobs(2))
+        self.assertEqual(self.next_jobs(pool), [('db1', 1), ('db1', 2)])
+        # a running job is not queued again until it is done
+        pool.queue('db1', jobs(1))
+        self.assertEqual(self.next_jobs(pool), [])
+        self.assertEqual(pool.stats(), {'db1': (0, 2)})
+        pool._job_done('db1', {'id': 1})
+        pool.queue('db1', jobs(1))
+        self.assertEqual(self.next_jobs(pool), [('db1', 1)])
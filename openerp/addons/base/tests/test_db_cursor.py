@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import threading
+import time
 import unittest
 
 import openerp
@@ -27,3 +29,66 @@ class test_cr_execute(unittest.TestCase):
                 cr.execute("SELECT id FROM res_users WHERE id=%s", 1)
             with self.assertRaises(ValueError):
                 cr.execute("SELECT id FROM res_users WHERE id=%s", '1')
+
+
+class test_connection_pool(unittest.TestCase):
+    """ Borrow and give back connections from a dedicated pool """
+
+    def setUp(self):
+        _, self.info = openerp.sql_db.connection_info_for(common.get_db_name())
+        self.pool = openerp.sql_db.ConnectionPool(maxconn=2, timeout=0.1)
+
+    def tearDown(self):
+        self.pool.close_all()
+
+    def test_reuse(self):
+        cnx = self.pool.borrow(self.info)
+        self.pool.give_back(cnx)
+        self.assertIs(self.pool.borrow(self.info), cnx)
+        stats = self.pool.stats()
+        self.assertEqual((stats['borrowed'], stats['created'], stats['in_use']), (2, 1, 1))
+
+    @mute_logger('openerp.sql_db')
+    def test_full(self):
+        cnx1 = self.pool.borrow(self.info)
+        self.pool.borrow(self.info)
+        with self.assertRaises(openerp.sql_db.PoolError):
+            self.pool.borrow(self.info)
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+
+        # a waiting borrower gets the connection given back meanwhile
+        timer = threading.Timer(0.02, self.pool.give_back, [cnx1])
+        timer.start()
+        self.assertIs(self.pool.borrow(self.info), cnx1)
+        timer.join()
+        self.assertEqual(self.pool.stats()['waited'], 2)
+
+    def test_broken(self):
+        cnx = self.pool.borrow(self.info)
+        self.pool.give_back(cnx)
+        cnx.close()
+        # a closed connection is replaced by a new one
+        cnx2 = self.pool.borrow(self.info)
+        self.assertIsNot(cnx2, cnx)
+        self.assertFalse(cnx2.closed)
+
+    def test_close_unlocked(self):
+        # connections are closed after releasing the lock of the pool
+        locked = []
+        close = self.pool._close
+        def _close(cnx):
+            locked.append(self.pool._lock.locked())
+            close(cnx)
+        self.pool._close = _close
+        self.pool._idle_timeout = 0.01
+
+        cnx1 = self.pool.borrow(self.info)
+        cnx2 = self.pool.borrow(self.info)
+        self.pool.give_back(cnx1)
+        self.pool._next_reap = 0
+        time.sleep(0.02)
+        self.pool.give_back(cnx2, keep_in_pool=False)
+        self.assertTrue(cnx1.closed)
+        self.assertTrue(cnx2.closed)
+        self.assertEqual(self.pool.stats()['reaped'], 1)
+        self.assertEqual(locked, [False, False])
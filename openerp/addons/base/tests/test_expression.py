@@ -540,5 +540,41 @@ class test_expression(common.TransactionCase):
         self.patch_order('res.company', 'parent_id')
         self.env['res.users'].search([('name', '=', 'test')])
 
+
+class TestCompiledDomain(common.TransactionCase):
+    # not in test_expression, whose mock of _where_calc drops active_test
+
+    def test_compiled_domain(self):
+        Partner = self.env['res.partner']
+        cache = self.registry.caches['domains']
+        cache.clear()
+        p1 = Partner.create({'name': 'test_compiled_domain 1', 'ref': 'TCD1'})
+        p2 = Partner.create({'name': 'test_compiled_domain 2', 'ref': 'TCD2', 'active': False})
+
+        # domains of the same shape share their compiled query
+        self.assertEqual(Partner.search([('ref', '=', 'TCD1')]), p1)
+        self.assertEqual(Partner.search([('ref', '=', 'TCD2')]), Partner)
+        self.assertEqual(Partner.with_context(active_test=False).search([('ref', '=', 'TCD2')]), p2)
+        lang = Partner._context.get('lang')
+        shape = ('&', ('active', '=', int), ('ref', '=', ('str', True)))
+        self.assertTrue(cache[('res.partner', 'domain', lang, True, shape)])
+        shape = (('ref', '=', ('str', True)),)
+        self.assertTrue(cache[('res.partner', 'domain', lang, False, shape)])
+
+        # the values that change the query are part of the shape
+        self.assertEqual(Partner.search([('ref', 'in', ['TCD1', 'TCD2', False]), ('name', 'ilike', 'test_compiled')]), p1)
+        self.assertEqual(Partner.search([('ref', 'in', ['TCD1']), ('name', 'ilike', 'test_compiled')]), p1)
+        self.assertEqual(Partner.search([('ref', '=', False), ('name', 'ilike', 'test_compiled')]), Partner)
+
+        # domains that need a sub-search are not compiled
+        domain = [('parent_id', '=', 'test_compiled_domain 1')]
+        self.assertEqual(Partner.search(domain), Partner)
+        self.assertEqual(Partner.search(domain), Partner)
+        self.assertEqual(Partner.search([('child_ids.ref', '=', 'TCD1')]), Partner)
+
+        # the cache is cleared with the record rules
+        self.env['ir.rule'].clear_caches()
+        self.assertFalse([key for key in cache.iterkeys() if key[0] == 'res.partner'])
+
 if __name__ == '__main__':
     unittest.main()
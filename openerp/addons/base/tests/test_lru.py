@@ -0,0 +1,66 @@
+import threading
+import unittest
+
+from openerp.tools.lru import LRU
+
+
+class TestLRU(unittest.TestCase):
+    def test_eviction(self):
+        lru = LRU(3, shards=1)
+        lru['a'] = 1
+        lru['b'] = 2
+        lru['c'] = 3
+        # 'a' becomes the most recently used entry
+        self.assertEqual(lru['a'], 1)
+        lru['d'] = 4
+        self.assertEqual(sorted(lru.keys()), ['a', 'c', 'd'])
+        self.assertEqual(lru.eviction, 1)
+
+        # overwriting an entry does not evict anything
+        lru['a'] = 5
+        self.assertEqual(len(lru), 3)
+        self.assertEqual(lru.eviction, 1)
+
+    def test_counters(self):
+        lru = LRU(1024)
+        lru['a'] = 1
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(lru.get('b'), None)
+        with self.assertRaises(KeyError):
+            lru['b']
+        self.assertEqual((lru.hit, lru.miss), (1, 2))
+        # unhashable keys are rejected
+        with self.assertRaises(TypeError):
+            lru[['a']]
+
+    def test_mapping(self):
+        lru = LRU(1024, [(i, str(i)) for i in xrange(100)])
+        self.assertEqual(len(lru), 100)
+        self.assertIn(42, lru)
+        self.assertEqual(sorted(lru.iterkeys()), range(100))
+        self.assertEqual(sorted(lru.itervalues()), sorted(map(str, range(100))))
+        self.assertEqual(dict(lru.iteritems()), {i: str(i) for i in xrange(100)})
+        self.assertEqual(lru.pop(42), '42')
+        del lru[43]
+        self.assertNotIn(42, lru)
+        self.assertNotIn(43, lru)
+        lru.clear()
+        self.assertEqual(len(lru), 0)
+
+    def test_threads(self):
+        lru = LRU(512)
+
+        def run(offset):
+            for i in xrange(2000):
+                key = (offset + i) % 1000
+                lru[key] = key
+                lru.get((key * 7) % 1000)
+
+        threads = [threading.Thread(target=run, args=(n * 100,)) for n in xrange(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(len(lru), 512)
+        for key, val in lru.iteritems():
+            self.assertEqual(key, val)
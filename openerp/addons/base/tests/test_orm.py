@@ -1,4 +1,6 @@
 from collections import defaultdict
+from openerp import models
+from openerp.exceptions import MissingError
 from openerp.tools import mute_logger
 from openerp.tests import common
 
@@ -187,6 +189,179 @@ class TestORM(common.TransactionCase):
         self.assertTrue(user.share)
 
 
+    def test_bulk_write(self):
+        """ _bulk_write() writes different values on many records at once """
+        Partner = self.env['res.partner']
+        p1, p2 = Partner.browse(self.p1), Partner.browse(self.p2)
+        p3 = Partner.create({'name': 'Z'})
+        Partner._bulk_write({
+            p1.id: {'color': 4, 'ref': 'R1'},
+            p2.id: {'color': 4, 'ref': 'R1'},
+            p3.id: {'color': 5, 'comment': False},
+        })
+        (p1 + p2 + p3).invalidate_cache()
+        self.assertEqual((p1 + p2 + p3).mapped('color'), [4, 4, 5])
+        self.assertEqual([p.ref for p in (p1, p2, p3)], ['R1', 'R1', False])
+
+        Partner._bulk_write({p1.id: {'name': 'W1'}, p3.id: {'name': 'Z1', 'ref': 'R3'}})
+        (p1 + p3).invalidate_cache()
+        self.assertEqual((p1 + p3).mapped('name'), ['W1', 'Z1'])
+        self.assertEqual(p3.ref, 'R3')
+
+        # records without values are left unchanged
+        Partner._bulk_write({p1.id: {'color': 6}, p2.id: {}})
+        (p1 + p2).invalidate_cache()
+        self.assertEqual((p1 + p2).mapped('color'), [6, 4])
+
+        p3.unlink()
+        with self.assertRaises(MissingError):
+            Partner._bulk_write({p1.id: {'color': 1}, p3.id: {'color': 2}})
+
+    def test_create_multi(self):
+        """ create_multi() creates records in order, in a single batch """
+        # the parent store is not maintained while modules are installed
+        init = self.registry._init
+        self.registry._init = False
+        self.addCleanup(setattr, self.registry, '_init', init)
+
+        Category = self.env['res.partner.category']
+        parent = Category.create({'name': 'Parent'})
+        partner = self.env['res.partner'].browse(self.p1)
+
+        categories = Category.create_multi([
+            {'name': 'A', 'parent_id': parent.id},
+            {'name': 'B', 'color': 3},
+            {'name': 'C', 'parent_id': parent.id, 'partner_ids': [(4, self.p1)]},
+        ])
+        self.assertEqual(categories.mapped('name'), ['A', 'B', 'C'])
+        self.assertEqual(categories.mapped('color'), [0, 3, 0])
+        self.assertEqual(categories[0].parent_id, parent)
+        self.assertIn(categories[2], partner.category_id)
+        self.assertTrue(all(categories.mapped('active')))
+
+        # the parent store is maintained
+        categories.invalidate_cache()
+        parent.invalidate_cache()
+        for child in (categories[0], categories[2]):
+            self.assertTrue(parent.parent_left < child.parent_left < child.parent_right < parent.parent_right)
+        self.assertEqual(Category.search([('id', 'child_of', parent.id)]), parent + categories[0] + categories[2])
+
+        # traditional-style calls return ids
+        ids = self.registry('res.partner.category').create_multi(self.cr, self.uid, [{'name': 'D'}, {'name': 'E'}])
+        self.assertEqual(Category.browse(ids).mapped('name'), ['D', 'E'])
+
+
+class TestReadGroupRollup(common.TransactionCase):
+
+    def setUp(self):
+        super(TestReadGroupRollup, self).setUp()
+        self.Partner = self.env['res.partner']
+        self.cls = type(self.Partner)
+        self.cls._rollups = {
+            'test': (['country_id', 'customer', 'active', 'title', 'create_date:day'], ['color']),
+        }
+        self.addCleanup(delattr, self.cls, '_rollups')
+        self.Partner._init_rollups()
+
+    def check(self, domain, fields, groupby, **kwargs):
+        query = self.Partner._where_calc(domain)
+        annotated_groupbys = [self.Partner._read_group_process_groupby(gb, query) for gb in groupby[:1]]
+        self.assertTrue(self.Partner._read_group_rollup(domain, annotated_groupbys, ['color'], query))
+
+        result = self.Partner.read_group(domain, fields, groupby, **kwargs)
+        rollups, self.cls._rollups = self.cls._rollups, {}
+        try:
+            expected = self.Partner.read_group(domain, fields, groupby, **kwargs)
+        finally:
+            self.cls._rollups = rollups
+        self.assertEqual(result, expected)
+
+    def check_all(self):
+        self.check([], ['color', 'country_id'], ['country_id'])
+        self.check([('customer', '=', True)], ['color', 'customer'], ['customer'])
+        self.check([('country_id', '!=', False)], ['color', 'create_date'], ['create_date:year'])
+
+    def test_rollup(self):
+        be, fr = self.env.ref('base.be'), self.env.ref('base.fr')
+        self.check_all()
+
+        p1 = self.Partner.create({'name': 'A', 'country_id': be.id, 'color': 3})
+        p2 = self.Partner.create({'name': 'B', 'country_id': be.id, 'color': 4, 'customer': False})
+        self.check_all()
+
+        p1.write({'country_id': fr.id})
+        p2.write({'color': 7})
+        self.check_all()
+
+        p1.unlink()
+        p2.write({'active': False})
+        self.check_all()
+
+        # refreshing merges the changes into one row per group
+        self.cr.execute("SELECT count(*) FROM res_partner__rollup_test")
+        count, = self.cr.fetchone()
+        self.Partner._refresh_rollups()
+        self.cr.execute("SELECT count(*) FROM res_partner__rollup_test")
+        self.assertLess(self.cr.fetchone()[0], count)
+        self.check_all()
+
+        # groupbys or conditions on other fields are not answered by the rollup
+        query = self.Partner._where_calc([('name', '=', 'B')])
+        self.assertFalse(self.Partner._read_group_rollup([('name', '=', 'B')], [], ['color'], query))
+
+    def test_rollup_ondelete(self):
+        # deleting a title sets it to null on the partners, behind the ORM
+        title = self.env['res.partner.title'].create({'name': 'Rollup'})
+        self.Partner.create({'name': 'A', 'title': title.id, 'color': 3})
+        self.Partner.create({'name': 'B', 'title': title.id, 'color': 4})
+        self.check([], ['color', 'title'], ['title'])
+        title.unlink()
+        self.check([], ['color', 'title'], ['title'])
+
+    def test_rollup_init(self):
+        def table_oid():
+            self.cr.execute("SELECT oid FROM pg_class WHERE relname='res_partner__rollup_test'")
+            return self.cr.fetchone()[0]
+
+        # the table is kept as long as its columns do not change
+        oid = table_oid()
+        self.Partner._init_rollups()
+        self.assertEqual(table_oid(), oid)
+
+        self.cls._rollups = {'test': (['country_id', 'active'], ['color'])}
+        self.Partner._init_rollups()
+        self.assertNotEqual(table_oid(), oid)
+        self.check([], ['color', 'country_id'], ['country_id'])
+
+
+class TestReloadModels(common.TransactionCase):
+
+    def test_reload_models(self):
+        """ Reloading the models keeps their classes, and sets up the custom
+        fields created or deleted by another process.
+        """
+        model_class = type(self.registry['res.partner'])
+        # create a custom field like another process, without setting up models
+        field = models.BaseModel.create(self.env['ir.model.fields'], {
+            'name': 'x_test_reload',
+            'model': 'res.partner',
+            'model_id': self.ref('base.model_res_partner'),
+            'field_description': 'Test Reload',
+            'ttype': 'char',
+            'state': 'manual',
+        })
+        self.assertNotIn('x_test_reload', self.registry['res.partner']._fields)
+
+        self.registry.reload_models(self.cr)
+        self.assertIn('x_test_reload', self.registry['res.partner']._fields)
+        self.assertIs(type(self.registry['res.partner']), model_class)
+
+        models.BaseModel.unlink(field)
+        self.registry.reload_models(self.cr)
+        self.assertNotIn('x_test_reload', self.registry['res.partner']._fields)
+        self.assertIs(type(self.registry['res.partner']), model_class)
+
+
 class TestInherits(common.TransactionCase):
     """ test the behavior of the orm for models that use _inherits;
         specifically: res.users, that inherits from res.partner
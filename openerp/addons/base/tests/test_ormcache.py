@@ -34,3 +34,45 @@ class TestOrmcache(common.TransactionCase):
         self.assertEqual(counter.hit, hit + 2)
         self.assertEqual(counter.miss, miss + 1)
         self.assertIn(key, cache)
+
+    def test_ormcache_group(self):
+        """ Test that clearing a cache group keeps the other groups. """
+        IMD = self.env['ir.model.data']
+        Rule = self.env['ir.rule']
+        Translation = self.env['ir.translation']
+
+        # fill the caches of ir.model.data.xmlid_lookup (group 'default') and
+        # ir.rule._compute_domain (group 'rules')
+        self.env.ref('base.group_no_one')
+        Rule.domain_get('res.partner')
+        cache_default, key_default, _ = get_cache_key_counter(
+            IMD.xmlid_lookup, self.cr, self.uid, 'base.group_no_one')
+        cache_rules, key_rules, _ = get_cache_key_counter(
+            Rule._compute_domain, self.cr, self.uid, 'res.partner', 'read')
+        self.assertIn(key_default, cache_default)
+        self.assertIn(key_rules, cache_rules)
+
+        # clearing the group 'translations' keeps both entries
+        self.registry.reset_any_cache_cleared()
+        Translation.clear_caches()
+        self.assertIn(key_default, cache_default)
+        self.assertIn(key_rules, cache_rules)
+        self.assertIn('translations', self.registry.cache_invalidated)
+        self.assertIn('views', self.registry.cache_invalidated)
+        self.assertNotIn('default', self.registry.cache_invalidated)
+
+        # clearing the group 'rules' drops the rules, and the menus and views
+        # that are filtered by them
+        self.registry.reset_any_cache_cleared()
+        Rule.create({'name': 'test rule', 'model_id': self.env.ref('base.model_res_partner').id})
+        self.assertIn(key_default, cache_default)
+        self.assertNotIn(key_rules, cache_rules)
+        self.assertIn('menus', self.registry.cache_invalidated)
+        self.assertIn('views', self.registry.cache_invalidated)
+        self.assertNotIn('translations', self.registry.cache_invalidated)
+
+        # clearing the group 'default' drops all the groups
+        Rule.domain_get('res.partner')
+        self.assertIn(key_rules, cache_rules)
+        IMD.clear_caches()
+        self.assertNotIn(key_rules, cache_rules)
@@ -133,6 +133,26 @@ class TestQWeb(common.TransactionCase):
                 template
             )
 
+class TestQWebCompile(common.TransactionCase):
+    def test_compiled_template_cache(self):
+        qweb = self.registry('ir.qweb')
+        arch = '<?xml version="1.0"?><templates><t t-name="test"><span t-esc="value"/></t></templates>'
+        compiled = qweb._compile_template('test', arch)
+        self.assertIs(qweb._compile_template('test', arch), compiled)
+        self.assertIsNot(qweb._compile_template('test', arch.replace('span', 'div')), compiled)
+
+    def test_view_change(self):
+        view = self.env['ir.ui.view'].create({
+            'name': 'test_qweb_compile',
+            'type': 'qweb',
+            'arch': '<t t-name="test_qweb_compile"><span t-esc="value"/></t>',
+        })
+        self.assertEqual(view.render({'value': 42}), '<span>42</span>')
+        self.assertEqual(view.render({'value': 43}), '<span>43</span>')
+
+        view.write({'arch': '<t t-name="test_qweb_compile"><div t-esc="value"/></t>'})
+        self.assertEqual(view.render({'value': 42}), '<div>42</div>')
+
 def load_tests(loader, suite, _):
     # can't override TestQWeb.__dir__ because dir() called on *class* not
     # instance
@@ -0,0 +1,70 @@
+import cPickle
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from openerp.http import OpenERPSession
+from openerp.tools.session_store import FilesystemSessionStore
+
+
+class TestFilesystemSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = FilesystemSessionStore(self.path, OpenERPSession)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def filename(self, sid):
+        return os.path.join(self.path, sid[:2], 'werkzeug_%s.sess' % sid)
+
+    def test_save_if_modified(self):
+        # a new session is only written once modified
+        session = self.store.new()
+        self.store.save_if_modified(session)
+        self.assertFalse(os.path.exists(self.filename(session.sid)))
+        session['db'] = 'foo'
+        session.context = {'lang': 'en_US'}
+        self.store.save_if_modified(session)
+        self.assertTrue(os.path.exists(self.filename(session.sid)))
+
+        # an unchanged session is not written again
+        fname = self.filename(session.sid)
+        past = int(time.time()) - 60
+        os.utime(fname, (past, past))
+        session = self.store.get(session.sid)
+        self.assertEqual(session.db, 'foo')
+        self.store.save_if_modified(session)
+        self.assertEqual(os.path.getmtime(fname), past)
+
+        # nested changes are detected
+        session.context['lang'] = 'fr_FR'
+        self.store.save_if_modified(session)
+        self.assertNotEqual(os.path.getmtime(fname), past)
+        self.assertEqual(self.store.get(session.sid).context, {'lang': 'fr_FR'})
+
+        self.store.delete(session)
+        self.assertIsNone(self.store.get(session.sid).db)
+
+    def test_flat_layout(self):
+        sid = self.store.generate_key()
+        with open(os.path.join(self.path, 'werkzeug_%s.sess' % sid), 'wb') as f:
+            cPickle.dump({'db': 'foo'}, f, cPickle.HIGHEST_PROTOCOL)
+        self.assertEqual(self.store.get(sid).db, 'foo')
+
+    def test_gc(self):
+        session = self.store.new()
+        session['db'] = 'foo'
+        self.store.save(session)
+        other = self.store.new()
+        other['db'] = 'bar'
+        self.store.save(other)
+
+        fname = self.filename(session.sid)
+        past = time.time() - self.store.max_age - 60
+        os.utime(fname, (past, past))
+        self.store.gc()
+        self.assertFalse(os.path.exists(fname))
+        self.assertTrue(os.path.exists(self.filename(other.sid)))
@@ -3,6 +3,7 @@
 
 from lxml.etree import XMLSyntaxError
 import unittest
+from openerp.tests import common
 from openerp.tools.translate import quote, unquote, xml_translate, html_translate
 
 class TranslationToolsTestCase(unittest.TestCase):
@@ -167,3 +168,28 @@ class TranslationToolsTestCase(unittest.TestCase):
         self.assertEquals(result, """<i class="fa-check"/>""")
         result = html_translate(lambda term: term, source)
         self.assertEquals(result, source)
+
+
+class TestTranslationCatalog(common.TransactionCase):
+
+    def test_get_source(self):
+        self.registry('res.lang').load_lang(self.cr, self.uid, 'fr_FR')
+        get_source = lambda *args: self.registry('ir.translation')._get_source(self.cr, self.uid, *args)
+        source = u'Translation catalog test'
+        self.assertEqual(get_source(None, ('code', 'sql_constraint'), 'fr_FR', source), source)
+
+        term = self.env['ir.translation'].create({
+            'type': 'code', 'name': 'addons/base/test.py', 'lang': 'fr_FR',
+            'src': source, 'value': u'Test du catalogue',
+        })
+        self.assertEqual(get_source(None, ('code', 'sql_constraint'), 'fr_FR', source), u'Test du catalogue')
+        self.assertEqual(get_source('addons/base/test.py', 'code', 'fr_FR', source), u'Test du catalogue')
+        self.assertEqual(get_source('addons/base/other.py', 'code', 'fr_FR', source), source)
+        self.assertEqual(get_source('addons/base/test.py', 'code', 'fr_FR'), u'Test du catalogue')
+        self.assertEqual(get_source(None, 'code', 'nl_NL', source), source)
+
+        # the catalog is reloaded after changes
+        term.write({'value': u'Essai du catalogue'})
+        self.assertEqual(get_source(None, 'code', 'fr_FR', source), u'Essai du catalogue')
+        term.unlink()
+        self.assertEqual(get_source(None, 'code', 'fr_FR', source), source)
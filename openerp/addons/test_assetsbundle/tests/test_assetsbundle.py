@@ -5,10 +5,12 @@ from openerp.tests import HttpCase
 from openerp.tests.common import TransactionCase
 from openerp.addons.base.ir.ir_qweb import AssetsBundle
 from openerp.modules.module import get_resource_path
+from openerp.tools import static_assets
 
 from mock import patch
 from os import utime
 import time
+import zlib
 
 
 class TestJavascriptAssetsBundle(TransactionCase):
@@ -275,6 +277,32 @@ class TestJavascriptAssetsBundle(TransactionCase):
         self.assertTrue(stylesheets[1].url.endswith('.1.css'))
         self.assertTrue(stylesheets[2].url.endswith('.2.css'))
 
+    def test_14_static_urls(self):
+        """ Checks that the static copies of a bundle are served without database, compressed
+        and cacheable forever.
+        """
+        bundle = AssetsBundle(self.jsbundle_xmlid, cr=self.cr, uid=self.uid, context={}, registry=self.registry)
+        [url] = bundle.static_urls('js')
+        ira = self.registry['ir.attachment'].browse(self.cr, self.uid, self._any_ira_for_bundle('js')[0])
+        self.assertEquals(url, '/web/assets/%s/%s' % (ira.checksum, ira.datas_fname))
+
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': url, 'HTTP_ACCEPT_ENCODING': 'gzip, deflate'}
+        response = static_assets.get_response(environ)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        content = zlib.decompress(''.join(response.response), 16 + zlib.MAX_WBITS)
+        self.assertEquals(content, ira.datas.decode('base64'))
+
+        # conditional requests do not get the content again
+        environ['HTTP_IF_NONE_MATCH'] = '"%s"' % ira.checksum
+        self.assertEquals(static_assets.get_response(environ).status_code, 304)
+
+        # unknown copies are left to the controllers
+        environ['PATH_INFO'] = '/web/assets/%s/%s' % ('0' * 40, ira.datas_fname)
+        self.assertIsNone(static_assets.get_response(environ))
+
+
 
 class TestAssetsBundleInBrowser(HttpCase):
     def test_01_js_interpretation(self):
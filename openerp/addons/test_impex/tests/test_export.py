@@ -585,3 +585,21 @@ class test_function(CreatorCase):
         self.assertEqual(
             self.export(42),
             [[u'3']])
+
+class test_external_ids(common.TransactionCase):
+
+    def test_multiple_records(self):
+        """ Exports the existing or new external ids of several records
+        """
+        Model = self.env['export.integer']
+        records = Model.create({'value': 1}) | Model.create({'value': 2})
+        self.env['ir.model.data'].create({
+            'module': 'test_impex',
+            'name': 'integer_one',
+            'model': Model._name,
+            'res_id': records[0].id,
+        })
+        self.assertEqual(
+            records.export_data(['id', 'value'])['datas'],
+            [[u'test_impex.integer_one', u'1'],
+             [u'__export__.export_integer_%d' % records[1].id, u'2']])
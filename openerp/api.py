@@ -44,16 +44,19 @@ import logging
 import operator
 
 from inspect import currentframe, getargspec
-from collections import defaultdict, MutableMapping
+from collections import defaultdict, deque, MutableMapping
 from contextlib import contextmanager
 from pprint import pformat
 from weakref import WeakSet
 from werkzeug.local import Local, release_local
 
-from openerp.tools import frozendict, classproperty
+from openerp.tools import config, frozendict, classproperty
 
 _logger = logging.getLogger(__name__)
 
+# the number of prefetch groups kept per model
+PREFETCH_GROUPS = 32
+
 # The following attributes are used, and reflected on wrapping methods:
 #  - method._constrains: set by @constrains, specifies constraint dependencies
 #  - method._depends: set by @depends, specifies compute dependencies
@@ -787,6 +790,30 @@ class Environment(object):
         context = self.context if context is None else context
         return Environment(cr, uid, context)
 
+    def prefetch_group(self, model_name, id):
+        """ Return the ids of the most recent group of records of model
+            ``model_name`` that contains the record ``id``, or ``None``. The
+            groups are shared by all the environments of the request, so that
+            the records of a group are also fetched together in other
+            environments (sudo, other context, etc.)
+        """
+        for ids in self.all.prefetch_groups[(self.cr.dbname, model_name)]:
+            if id in ids:
+                return ids
+        return None
+
+    def add_prefetch_group(self, model_name, ids):
+        """ Register the records ``ids`` (a tuple) of model ``model_name`` as
+            reached together: their fields are then fetched together. A group
+            holds at most ``prefetch_batch_size`` records, and only the
+            :data:`PREFETCH_GROUPS` most recent groups of a model are kept.
+        """
+        groups = self.all.prefetch_groups[(self.cr.dbname, model_name)]
+        if groups and groups[0] is ids:
+            return
+        limit = config['prefetch_batch_size']
+        groups.appendleft(ids[:limit] if len(ids) > limit else ids)
+
     def ref(self, xml_id, raise_if_not_found=True):
         """ return the record corresponding to the given ``xml_id`` """
         return self['ir.model.data'].xmlid_to_object(xml_id, raise_if_not_found=raise_if_not_found)
@@ -863,6 +890,7 @@ class Environment(object):
             env.prefetch.clear()
             env.computed.clear()
             env.dirty.clear()
+        self.all.prefetch_groups.clear()
 
     def clear(self):
         """ Clear all record caches, and discard all fields to recompute.
@@ -979,6 +1007,9 @@ class Environments(object):
         self.mode = False               # flag for draft/onchange
         self.recompute = True
         self.recompute_old = []        # list of old api compute fields to recompute
+        # groups of records reached together, most recent first
+        # {(dbname, model_name): deque([ids])}
+        self.prefetch_groups = defaultdict(lambda: deque(maxlen=PREFETCH_GROUPS))
 
     def add(self, env):
         """ Add the environment ``env``. """
@@ -14,7 +14,6 @@ import logging
 import mimetypes
 import os
 import pprint
-import random
 import re
 import sys
 import threading
@@ -46,6 +45,8 @@ import openerp
 from openerp.service.server import memory_info
 from openerp.service import security, model as service_model
 from openerp.tools.func import lazy_property
+from openerp.tools import session_store as sessions
+from openerp.tools import static_assets
 from openerp.tools import ustr, consteq
 
 _logger = logging.getLogger(__name__)
@@ -1080,6 +1081,7 @@ class OpenERPSession(werkzeug.contrib.sessions.Session):
         self.inited = False
         self.modified = False
         self.rotate = False
+        self.stored = None
         super(OpenERPSession, self).__init__(*args, **kwargs)
         self.inited = True
         self._default_values()
@@ -1326,7 +1328,7 @@ class OpenERPSession(werkzeug.contrib.sessions.Session):
         files = werkzeug.datastructures.MultiDict()
         # NOTE we do not store files in the session itself to avoid loading them in memory.
         #      By storing them in the session store, we ensure every worker (even ones on other
-        #      servers) can access them. It also allow stale files to be deleted by `session_gc`.
+        #      servers) can access them. It also allow stale files to be deleted with the expired sessions.
         for f in req.files.values():
             storename = 'werkzeug_%s_%s.file' % (self.sid, uuid.uuid4().hex)
             path = os.path.join(root.session_store.path, storename)
@@ -1360,18 +1362,6 @@ class OpenERPSession(werkzeug.contrib.sessions.Session):
                     pass
 
 
-def session_gc(session_store):
-    if random.random() < 0.001:
-        # we keep session one week
-        last_week = time.time() - 60*60*24*7
-        for fname in os.listdir(session_store.path):
-            path = os.path.join(session_store.path, fname)
-            try:
-                if os.path.getmtime(path) < last_week:
-                    os.unlink(path)
-            except OSError:
-                pass
-
 #----------------------------------------------------------
 # WSGI Layer
 #----------------------------------------------------------
@@ -1474,10 +1464,10 @@ class Root(object):
 
     @lazy_property
     def session_store(self):
-        # Setup http sessions
-        path = openerp.tools.config.session_dir
-        _logger.debug('HTTP sessions stored in: %s', path)
-        return werkzeug.contrib.sessions.FilesystemSessionStore(path, session_class=OpenERPSession)
+        # Setup http sessions, and remove the expired ones in the background
+        store = sessions.make_store(OpenERPSession)
+        sessions.start_gc(store)
+        return store
 
     @lazy_property
     def nodb_routing_map(self):
@@ -1524,8 +1514,6 @@ class Root(object):
 
     def setup_session(self, httprequest):
         # recover or create session
-        session_gc(self.session_store)
-
         sid = httprequest.args.get('session_id')
         explicit_session = True
         if not sid:
@@ -1593,12 +1581,12 @@ class Root(object):
                     'time': time.time(),
                 }
 
-        if httprequest.session.should_save:
-            if httprequest.session.rotate:
-                self.session_store.delete(httprequest.session)
-                httprequest.session.sid = self.session_store.generate_key()
-                httprequest.session.modified = True
-            self.session_store.save(httprequest.session)
+        if httprequest.session.should_save and httprequest.session.rotate:
+            self.session_store.delete(httprequest.session)
+            httprequest.session.sid = self.session_store.generate_key()
+            httprequest.session.modified = True
+        # only write the session if its content changed
+        self.session_store.save_if_modified(httprequest.session)
         # We must not set the cookie if the session id was specified using a http header or a GET parameter.
         # There are two reasons to this:
         # - When using one of those two means we consider that we are overriding the cookie, which means creating a new
@@ -1614,6 +1602,11 @@ class Root(object):
         """
         Performs the actual WSGI dispatching for the application.
         """
+        if environ.get('PATH_INFO', '').startswith(static_assets.URL_PREFIX):
+            # static copies of the asset bundles need neither session nor database
+            response = static_assets.get_response(environ)
+            if response is not None:
+                return response(environ, start_response)
         try:
             httprequest = werkzeug.wrappers.Request(environ)
             httprequest.app = self
@@ -1633,6 +1626,7 @@ class Root(object):
                 result = request.dispatch()
                 return result
 
+            signal_db = None
             with request:
                 db = request.session.db
                 if db:
@@ -1655,11 +1649,14 @@ class Root(object):
                             result = _dispatch_nodb()
                     else:
                         result = ir_http._dispatch()
-                        openerp.modules.registry.RegistryManager.signal_caches_change(db)
+                        signal_db = db
                 else:
                     result = _dispatch_nodb()
 
                 response = self.get_response(httprequest, result, explicit_session)
+            # signal the cleared caches once the transaction is committed
+            if signal_db:
+                openerp.modules.registry.RegistryManager.signal_caches_change(signal_db)
             return response(environ, start_response)
 
         except werkzeug.exceptions.HTTPException, e:
@@ -30,7 +30,7 @@ import operator
 import pytz
 import re
 import time
-from collections import defaultdict, MutableMapping
+from collections import defaultdict, MutableMapping, OrderedDict
 from inspect import getmembers, currentframe
 from operator import itemgetter
 
@@ -50,7 +50,7 @@ from .osv.query import Query
 from .tools import frozendict, lazy_property, ormcache, Collector
 from .tools.config import config
 from .tools.func import frame_codeinfo
-from .tools.misc import CountingStream, DEFAULT_SERVER_DATETIME_FORMAT, DEFAULT_SERVER_DATE_FORMAT, pickle
+from .tools.misc import CountingStream, DEFAULT_SERVER_DATETIME_FORMAT, DEFAULT_SERVER_DATE_FORMAT, OrderedSet, pickle
 from .tools.safe_eval import safe_eval as eval
 from .tools.translate import _
 
@@ -212,6 +212,17 @@ def get_pg_type(f, type_override=None):
     return pg_type
 
 
+# the granularities of date groupbys that can be computed from a rollup
+# grouped by a given granularity
+ROLLUP_GRANULARITIES = {
+    'day': ('day', 'week', 'month', 'quarter', 'year'),
+    'week': ('week',),
+    'month': ('month', 'quarter', 'year'),
+    'quarter': ('quarter', 'year'),
+    'year': ('year',),
+}
+
+
 class MetaModel(api.Meta):
     """ Metaclass for the models.
 
@@ -324,6 +335,19 @@ class BaseModel(object):
     # to include in the _read_group, if grouped on this field
     _group_by_full = {}
 
+    # dict of {name: (groupbys, measures)} declaring materialized aggregates
+    # (rollups) that answer read_group, where groupbys are groupby
+    # specifications of columns of the model's table, like 'partner_id' or
+    # 'date:month', and measures are numeric columns summed by read_group;
+    # the table of a rollup is indexed on its first groupby, unless it is a date
+    _rollups = {}
+
+    # dict of {group: depends} declaring the ormcache groups of the model's
+    # addon (see openerp.tools.cache.CACHE_GROUPS), where depends are the
+    # groups whose clearing also clears the group; all the groups are cleared
+    # with the group 'default'
+    _cache_groups = {}
+
     # Transience
     _transient = False # True in a TransientModel
 
@@ -858,6 +882,26 @@ class BaseModel(object):
             })
             return '__export__.' + name
 
+    @api.multi
+    def __export_xml_ids(self):
+        """ Return a dict that maps the ids of ``self`` to valid xml_ids, with
+        one search for the existing xml_ids of all the records.
+        """
+        if not self._is_an_ordinary_table():
+            return {record.id: record.__export_xml_id() for record in self}
+        ir_model_data = self.sudo().env['ir.model.data']
+        result = {}
+        for sub_ids in self._cr.split_for_in_conditions(set(self.ids)):
+            domain = [('model', '=', self._name), ('res_id', 'in', list(sub_ids))]
+            for data in ir_model_data.search(domain):
+                # keep the first one, like __export_xml_id()
+                if data.res_id not in result:
+                    result[data.res_id] = '%s.%s' % (data.module, data.name) if data.module else data.name
+        for record in self:
+            if record.id not in result:
+                result[record.id] = record.__export_xml_id()
+        return result
+
     @api.multi
     def __export_rows(self, fields):
         """ Export fields of the records in ``self``.
@@ -866,6 +910,8 @@ class BaseModel(object):
             :return: list of lists of corresponding values
         """
         lines = []
+        # retrieve the xml_ids of all the records at once
+        record_xml_ids = self.__export_xml_ids() if ['id'] in fields else {}
         for record in self:
             # main line of record, initially empty
             current = [''] * len(fields)
@@ -886,7 +932,7 @@ class BaseModel(object):
                 if name == '.id':
                     current[i] = str(record.id)
                 elif name == 'id':
-                    current[i] = record.__export_xml_id()
+                    current[i] = record_xml_ids[record.id]
                 else:
                     field = record._fields[name]
                     value = record[name]
@@ -900,8 +946,8 @@ class BaseModel(object):
 
                         # This is a special case, its strange behavior is intended!
                         if field.type == 'many2many' and len(path) > 1 and path[1] == 'id':
-                            xml_ids = [r.__export_xml_id() for r in value]
-                            current[i] = ','.join(xml_ids) or False
+                            value_xml_ids = value.__export_xml_ids()
+                            current[i] = ','.join(value_xml_ids[r.id] for r in value) or False
                             continue
 
                         # recursively export the fields that follow name
@@ -1052,11 +1098,16 @@ class BaseModel(object):
         current_module = ''
         noupdate = False
 
+        # resolve the references of the relational columns once for all rows
+        import_cache = self.pool['ir.fields.converter'].prefetch_references(
+            cr, uid, self, fields, data, context=context)
+        convert_context = dict(context or {}, import_cache=import_cache)
+
         ids = []
         for id, xid, record, info in self._convert_records(cr, uid,
                 self._extract_records(cr, uid, fields, data,
                                       context=context, log=messages.append),
-                context=context, log=messages.append):
+                context=convert_context, log=messages.append):
             try:
                 cr.execute('SAVEPOINT model_load_save')
             except psycopg2.InternalError, e:
@@ -1793,8 +1844,7 @@ class BaseModel(object):
         ``tools.ormcache`` or ``tools.ormcache_multi``.
         """
         try:
-            self.pool.cache.clear()
-            self.pool._any_cache_cleared = True
+            self.pool.clear_cache('default')
         except AttributeError:
             pass
 
@@ -2011,7 +2061,7 @@ class BaseModel(object):
         data['__domain'] = domain_group + domain 
         if len(groupby) - len(annotated_groupbys) >= 1:
             data['__context'] = { 'group_by': groupby[len(annotated_groupbys):]}
-        del data['id']
+        data.pop('id', None)
         return data
 
     def read_group(self, cr, uid, domain, fields, groupby, offset=0, limit=None, context=None, orderby=False, lazy=True):
@@ -2080,12 +2130,16 @@ class BaseModel(object):
             if getattr(self._fields[f].base_field.column, '_classic_write', False)
         ]
 
+        # answer from a rollup if possible, with the same query on its table
+        rollup = self._read_group_rollup(cr, uid, domain, annotated_groupbys, aggregated_fields, query, context=context)
+
         field_formatter = lambda f: (
             self._fields[f].group_operator or 'sum',
             self._inherits_join_calc(cr, uid, self._table, f, query, context=context),
+            '::int8' if rollup and self._fields[f].type == 'integer' else '',
             f,
         )
-        select_terms = ['%s(%s) AS "%s" ' % field_formatter(f) for f in aggregated_fields]
+        select_terms = ['%s(%s)%s AS "%s" ' % field_formatter(f) for f in aggregated_fields]
 
         for gb in annotated_groupbys:
             select_terms.append('%s as "%s" ' % (gb['qualified_field'], gb['groupby']))
@@ -2101,21 +2155,34 @@ class BaseModel(object):
         prefix_terms = lambda prefix, terms: (prefix + " " + ",".join(terms)) if terms else ''
         prefix_term = lambda prefix, term: ('%s %s' % (prefix, term)) if term else ''
 
+        if rollup:
+            count_terms = 'sum("%s"."__count") AS %s' % (self._table, count_field)
+            from_clause = from_clause.replace('"%s"' % self._table, '"%s" AS "%s"' % (rollup, self._table), 1)
+            # skip the groups whose records have all been removed
+            having = 'HAVING sum("%s"."__count") > 0' % self._table if groupby_terms else ''
+        else:
+            count_terms = 'min(%(table)s.id) AS id, count(%(table)s.id) AS %(count_field)s' % {
+                'table': self._table,
+                'count_field': count_field,
+            }
+            having = ''
+
         query = """
-            SELECT min(%(table)s.id) AS id, count(%(table)s.id) AS %(count_field)s %(extra_fields)s
+            SELECT %(count_terms)s %(extra_fields)s
             FROM %(from)s
             %(where)s
             %(groupby)s
+            %(having)s
             %(orderby)s
             %(limit)s
             %(offset)s
         """ % {
-            'table': self._table,
-            'count_field': count_field,
+            'count_terms': count_terms,
             'extra_fields': prefix_terms(',', select_terms),
             'from': from_clause,
             'where': prefix_term('WHERE', where_clause),
             'groupby': prefix_terms('GROUP BY', groupby_terms),
+            'having': having,
             'orderby': prefix_terms('ORDER BY', orderby_terms),
             'limit': prefix_term('LIMIT', int(limit) if limit else None),
             'offset': prefix_term('OFFSET', int(offset) if limit else None),
@@ -2127,7 +2194,16 @@ class BaseModel(object):
             return fetched_data
 
         many2onefields = [gb['field'] for gb in annotated_groupbys if gb['type'] == 'many2one']
-        if many2onefields:
+        if many2onefields and rollup:
+            # no record to read: get the names of the values, like read()
+            for fname in set(many2onefields):
+                comodel = self.pool[self._fields[fname].comodel_name]
+                value_ids = comodel.exists(cr, SUPERUSER_ID, list(set(d[fname] for d in fetched_data if d[fname])))
+                names = dict(comodel.name_get(cr, SUPERUSER_ID, value_ids, context=context))
+                for d in fetched_data:
+                    if d[fname]:
+                        d[fname] = (d[fname], names[d[fname]]) if d[fname] in names else False
+        elif many2onefields:
             data_ids = [r['id'] for r in fetched_data]
             many2onefields = list(set(many2onefields))
             data_dict = {d['id']: d for d in self.read(cr, uid, data_ids, many2onefields, context=context)} 
@@ -2146,6 +2222,175 @@ class BaseModel(object):
                                                        context=context)
         return result
 
+    def _rollup_spec(self, name):
+        """ Return the table, the dimensions and the measures of rollup
+            ``name``; the dimensions are pairs ``(field_name, granularity)``,
+            where granularity is ``None`` for non-date fields.
+        """
+        groupbys, measures = self._rollups[name]
+        dims = []
+        for gb in groupbys:
+            fname, _, granularity = gb.partition(':')
+            column = self._columns.get(fname)
+            if not (column and column._classic_write):
+                raise ValueError("Rollup %s.%s: invalid groupby %r" % (self._name, name, gb))
+            if column._type in ('date', 'datetime'):
+                dims.append((fname, granularity or 'month'))
+            else:
+                dims.append((fname, None))
+        for fname in measures:
+            column = self._columns.get(fname)
+            if not (column and column._classic_write and column._type in ('integer', 'float', 'monetary')
+                    and self._fields[fname].group_operator in (None, 'sum')):
+                raise ValueError("Rollup %s.%s: invalid measure %r" % (self._name, name, fname))
+        return '%s__rollup_%s' % (self._table, name), dims, list(measures)
+
+    def _rollup_select(self, name, sign=None):
+        """ Return the SELECT query that aggregates the table of the model
+            into the rows of rollup ``name``, multiplied by ``sign``. """
+        table, dims, measures = self._rollup_spec(name)
+        terms = [
+            "date_trunc('%s', \"%s\")" % (granularity, fname) if granularity else '"%s"' % fname
+            for fname, granularity in dims
+        ]
+        factor = '%d * ' % sign if sign else ''
+        aggregates = ['%scount(*)' % factor] + ['%ssum("%s")' % (factor, fname) for fname in measures]
+        return 'SELECT %s FROM "%s"' % (', '.join(terms + aggregates), self._table), \
+               'GROUP BY %s' % ', '.join(terms) if terms else ''
+
+    def _rollup_columns(self, name):
+        table, dims, measures = self._rollup_spec(name)
+        return ', '.join(['"%s"' % fname for fname, _ in dims] + ['"__count"'] +
+                         ['"%s"' % fname for fname in measures])
+
+    def _init_rollups(self, cr):
+        """ Create the tables of the rollups of the model that are missing or
+            whose columns have changed, and fill them. The definition of the
+            columns of a table is kept as its comment.
+        """
+        names = []
+        for name in self._rollups:
+            table, dims, measures = self._rollup_spec(name)
+            columns = []
+            for fname, granularity in dims:
+                pg_type = 'timestamp' if granularity else get_pg_type(self._columns[fname])[1]
+                columns.append('"%s" %s' % (fname, pg_type))
+            columns.append('"__count" integer NOT NULL')
+            for fname in measures:
+                pg_type = 'bigint' if self._columns[fname]._type == 'integer' else \
+                          get_pg_type(self._columns[fname])[1]
+                columns.append('"%s" %s' % (fname, pg_type))
+            definition = ', '.join(columns)
+            cr.execute("SELECT obj_description(c.oid, 'pg_class') FROM pg_class c "
+                       "WHERE c.relname=%s AND c.relkind='r'", (table,))
+            row = cr.fetchone()
+            if row and row[0] == definition:
+                continue
+            cr.execute('DROP TABLE IF EXISTS "%s"' % table)
+            cr.execute('CREATE TABLE "%s" (%s)' % (table, definition))
+            cr.execute('COMMENT ON TABLE "%s" IS %%s' % table, (definition,))
+            if dims and not dims[0][1]:
+                cr.execute('CREATE INDEX "%s_%s_index" ON "%s" ("%s")' % (table, dims[0][0], table, dims[0][0]))
+            _schema.debug("Table '%s': created", table)
+            names.append(name)
+        if names:
+            self._refresh_rollups(cr, names)
+
+    def _refresh_rollups(self, cr, names=None):
+        """ Recompute the rows of the rollups ``names`` of the model (by
+            default all of them). This merges their changes into one row per
+            group, and repairs them after changes made behind the ORM (direct
+            queries, cascading deletions through several tables, ...).
+        """
+        for name in (self._rollups if names is None else names):
+            table = self._rollup_spec(name)[0]
+            select, groupby = self._rollup_select(name)
+            # the changes committed after the start of the transaction are
+            # neither deleted nor recomputed, which keeps the rollup exact
+            cr.execute('DELETE FROM "%s"' % table)
+            cr.execute('INSERT INTO "%s" (%s) %s %s' % (table, self._rollup_columns(name), select, groupby))
+
+    def _update_rollups(self, cr, ids, fnames=None, sign=1):
+        """ Add (``sign=1``) or remove (``sign=-1``) the contributions of
+            records ``ids`` to the rollups that depend on ``fnames``. The
+            changes are inserted as extra rows, merged by read_group and by
+            :meth:`~._refresh_rollups`.
+        """
+        if not self._rollups or not ids:
+            return
+        for name in self._rollups:
+            table, dims, measures = self._rollup_spec(name)
+            if fnames is not None and not set(fnames).intersection(
+                    [fname for fname, _ in dims] + measures):
+                continue
+            select, groupby = self._rollup_select(name, sign)
+            query = 'INSERT INTO "%s" (%s) %s WHERE id IN %%s %s' % (
+                table, self._rollup_columns(name), select, groupby)
+            for sub_ids in cr.split_for_in_conditions(set(ids)):
+                cr.execute(query, (sub_ids,))
+
+    def _rollup_references(self):
+        """ Return the pairs ``(model, field_name)`` of the many2one fields
+            that refer to the model, are dimensions of rollups, and are set to
+            null or deleted by the database when the records of the model are
+            deleted (``ondelete`` other than ``'restrict'``).
+        """
+        result = []
+        for model in self.pool.itervalues():
+            if not model._rollups:
+                continue
+            fnames = set(fname for name in model._rollups for fname, _ in model._rollup_spec(name)[1])
+            for fname in sorted(fnames):
+                column = model._columns[fname]
+                if column._type == 'many2one' and column._obj == self._name and \
+                        (column.ondelete or '').lower() in ('set null', 'cascade', 'set default'):
+                    result.append((model, fname))
+        return result
+
+    def _read_group_rollup(self, cr, uid, domain, annotated_groupbys, aggregated_fields, query, context=None):
+        """ Return the table of a rollup that can answer read_group with the
+            given parameters, or ``None``. The rollup is queried with the
+            conditions of ``query`` on the table of the model, so the domain
+            and the access rules may only refer to the non-date dimensions of
+            the rollup.
+        """
+        if not self._rollups or query.tables != ['"%s"' % self._table]:
+            return None
+        context = context or {}
+
+        # the fields in the conditions of the query
+        used = set()
+        rule_domain = self.pool['ir.rule']._compute_domain(cr, uid, self._name, 'read') or []
+        for leaf in list(domain or []) + list(rule_domain):
+            if not expression.is_leaf(leaf) or tuple(leaf) in (expression.TRUE_LEAF, expression.FALSE_LEAF):
+                continue
+            field = self._fields.get(leaf[0])
+            if field is None:
+                return None
+            if leaf[1] in ('child_of', 'parent_of') and field.comodel_name == self._name:
+                return None
+            used.add(leaf[0])
+        if 'active' in self._fields and context.get('active_test', True):
+            used.add('active')
+
+        for name in sorted(self._rollups):
+            table, dims, measures = self._rollup_spec(name)
+            dims = dict(dims)
+            if not all(fname in dims and dims[fname] is None for fname in used):
+                continue
+            if not set(aggregated_fields) <= set(measures):
+                continue
+            for gb in annotated_groupbys:
+                if gb['field'] not in dims:
+                    break
+                granularity = dims[gb['field']]
+                if granularity and (gb['tz_convert'] or
+                        (gb['groupby'].partition(':')[2] or 'month') not in ROLLUP_GRANULARITIES[granularity]):
+                    break
+            else:
+                return table
+        return None
+
     def _inherits_join_add(self, current_model, parent_model_name, query):
         """
         Add missing table SELECT and JOIN clause to ``query`` for reaching the parent table (no duplicates)
@@ -2705,10 +2950,12 @@ class BaseModel(object):
         return todo_end
 
     def _auto_end(self, cr, context=None):
-        """ Create the foreign keys recorded by _auto_init. """
+        """ Create the foreign keys recorded by _auto_init, and the rollups. """
         for t, k, r, d in self._foreign_keys:
             cr.execute('ALTER TABLE "%s" ADD FOREIGN KEY ("%s") REFERENCES "%s" ON DELETE %s' % (t, k, r, d))
             self._save_constraint(cr, "%s_%s_fkey" % (t, k), 'f', False)
+        if self._rollups:
+            self._init_rollups(cr)
         cr.commit()
         del self._foreign_keys
 
@@ -3248,8 +3495,10 @@ class BaseModel(object):
         """ Read from the database in order to fetch ``field`` (:class:`Field`
             instance) for ``self`` in cache.
         """
-        # fetch the records of this model without field_name in their cache
-        records = self._in_cache_without(field)
+        # fetch the records of this model without field_name in their cache,
+        # at most prefetch_batch_size records, starting with self
+        limit = config.get('prefetch_batch_size') or PREFETCH_MAX
+        records = self._in_cache_without(field, limit)
 
         # determine which fields can be prefetched
         fs = {field}
@@ -3287,10 +3536,6 @@ class BaseModel(object):
                 else:
                     records &= self._in_cache_without(f)
 
-        # prefetch at most PREFETCH_MAX records
-        if len(records) > PREFETCH_MAX:
-            records = records[:PREFETCH_MAX] | self
-
         # fetch records with read()
         assert self in records and field in fs
         result = []
@@ -3434,6 +3679,21 @@ class BaseModel(object):
             record = self.browse(vals.pop('id'))
             record._cache.update(record._convert_to_cache(vals, validate=False))
 
+        # the records reached through a relational field are fetched together
+        for name in field_names + inherited_field_names:
+            field = self._fields[name]
+            if field.relational and fetched:
+                cache = env.cache[field]
+                ids = OrderedSet()
+                for record_id in fetched._ids:
+                    value = cache.get(record_id)
+                    if isinstance(value, BaseModel):
+                        for id in value._ids:
+                            ids.add(id)
+                ids.pop(False, None)
+                if len(ids) > 1:
+                    env.add_prefetch_group(field.comodel_name, tuple(ids))
+
         # store failed values in cache for the records that could not be read
         missing = self - fetched
         if missing:
@@ -3575,15 +3835,27 @@ class BaseModel(object):
             if len(uids) != 1 or uids[0] != uid:
                 raise AccessError(_('For this kind of document, you may only access records you created yourself.\n\n(Document type: %s)') % (self._description,))
         else:
-            where_clause, where_params, tables = self.pool.get('ir.rule').domain_get(cr, uid, self._name, operation, context=context)
-            if where_clause:
-                where_clause = ' and ' + ' and '.join(where_clause)
-                for sub_ids in cr.split_for_in_conditions(ids):
-                    cr.execute('SELECT ' + self._table + '.id FROM ' + ','.join(tables) +
-                               ' WHERE ' + self._table + '.id IN %s' + where_clause,
-                               [sub_ids] + where_params)
-                    returned_ids = [x['id'] for x in cr.dictfetchall()]
-                    self._check_record_rules_result_count(cr, uid, sub_ids, returned_ids, operation, context=context)
+            allowed_ids = self._filter_access_rules(cr, uid, ids, operation, context=context)
+            if allowed_ids is not None:
+                self._check_record_rules_result_count(cr, uid, ids, allowed_ids, operation, context=context)
+
+    def _filter_access_rules(self, cr, uid, ids, operation, context=None):
+        """ Return the ids among ``ids`` of the existing records that the
+            record rules allow for ``operation``, or ``None`` if no rule
+            applies. The records are checked by batches, with one query per
+            batch.
+        """
+        where_clause, where_params, tables = self.pool.get('ir.rule').domain_get(cr, uid, self._name, operation, context=context)
+        if not where_clause:
+            return None
+        where_clause = ' and ' + ' and '.join(where_clause)
+        allowed_ids = []
+        for sub_ids in cr.split_for_in_conditions(set(ids)):
+            cr.execute('SELECT ' + self._table + '.id FROM ' + ','.join(tables) +
+                       ' WHERE ' + self._table + '.id IN %s' + where_clause,
+                       [sub_ids] + where_params)
+            allowed_ids.extend(row[0] for row in cr.fetchall())
+        return allowed_ids
 
     def create_workflow(self, cr, uid, ids, context=None):
         """Create a workflow instance for each given record IDs."""
@@ -3672,9 +3944,22 @@ class BaseModel(object):
         pool_model_data = self.pool.get('ir.model.data')
         ir_values_obj = self.pool.get('ir.values')
         ir_attachment_obj = self.pool.get('ir.attachment')
+        rollup_references = self._rollup_references()
         for sub_ids in cr.split_for_in_conditions(ids):
+            self._update_rollups(cr, sub_ids, sign=-1)
+            # the rows that refer to the records are modified or deleted by
+            # the database: remove their contributions to the rollups, and
+            # add them back once the records are deleted
+            referring = []
+            for model, fname in rollup_references:
+                cr.execute('SELECT id FROM "%s" WHERE "%s" IN %%s' % (model._table, fname), (sub_ids,))
+                referring_ids = [row[0] for row in cr.fetchall()]
+                model._update_rollups(cr, referring_ids, sign=-1)
+                referring.append((model, referring_ids))
             cr.execute('delete from ' + self._table + ' ' \
                        'where id IN %s', (sub_ids,))
+            for model, referring_ids in referring:
+                model._update_rollups(cr, referring_ids)
 
             # Removing the ir_model_data reference if the record being deleted is a record created by xml/csv file,
             # as these are not connected with real database foreign keys, and would be dangling references.
@@ -3946,9 +4231,11 @@ class BaseModel(object):
             )
             params = tuple(u[2] for u in updates if len(u) > 2)
             for sub_ids in cr.split_for_in_conditions(set(ids)):
+                self._update_rollups(cr, sub_ids, direct, sign=-1)
                 cr.execute(query, params + (sub_ids,))
                 if cr.rowcount != len(sub_ids):
                     raise MissingError(_('One of the records you are trying to modify has already been deleted (Document type: %s).') % self._description)
+                self._update_rollups(cr, sub_ids, direct)
 
             # TODO: optimize
             for f in direct:
@@ -4100,6 +4387,97 @@ class BaseModel(object):
         self.step_workflow(cr, user, ids, context=context)
         return True
 
+    def _bulk_write(self, cr, uid, values, context=None):
+        """ Write different values on many records at once.
+
+        :param values: dict ``{id: vals}``, where each ``vals`` is a
+            dictionary in the format of :meth:`~.write`
+
+        When all the fields are plain columns of the table, the records are
+        updated with a few grouped queries (see :meth:`~._update_rows`), and
+        the triggers, constraints and recomputations are processed once for
+        all records. Otherwise, or when the model overrides :meth:`~._write`
+        (like action rules do), records are written with :meth:`~._write`,
+        one group of records receiving identical values at a time.
+        """
+        # the records without values are left unchanged
+        values = dict((id, vals) for id, vals in values.iteritems() if vals)
+        if not values:
+            return True
+        if not context:
+            context = {}
+
+        names = set(name for vals in values.itervalues() for name in vals)
+        for name in names:
+            column = self._columns.get(name)
+            if column is None or not column._classic_write or hasattr(column, '_fnct_inv') \
+                    or column.write or column.translate \
+                    or (self._parent_store and name == self._parent_name):
+                break
+        else:
+            column = None
+        if column is not None or type(self)._write.im_func is not BaseModel._write.im_func:
+            groups = defaultdict(list)
+            for id, vals in values.iteritems():
+                groups[frozendict(vals)].append(id)
+            for vals, ids in groups.iteritems():
+                self._write(cr, uid, ids, dict(vals), context=context)
+            return True
+
+        ids = list(values)
+        names = list(names)
+        self._check_concurrency(cr, ids, context)
+        self.check_field_access_rights(cr, uid, 'write', names)
+        for name in names:
+            column = self._columns[name]
+            if hasattr(column, 'selection'):
+                for value in set(vals[name] for vals in values.itervalues() if vals.get(name)):
+                    self._check_selection_field_value(cr, uid, name, value, context=context)
+
+        result = self._store_get_values(cr, uid, ids, names, context) or []
+
+        # for recomputing new-style fields
+        recs = self.browse(cr, uid, ids, context)
+        modified_fields = list(names)
+        extra_updates = []
+        if self._log_access:
+            modified_fields += ['write_date', 'write_uid']
+            extra_updates.append(('write_uid', '%s', uid))
+            extra_updates.append(('write_date', "(now() at time zone 'UTC')"))
+        recs.modified(modified_fields)
+
+        self.check_access_rule(cr, uid, ids, 'write', context=context)
+        if self._update_rows(cr, values, extra_updates) != len(ids):
+            raise MissingError(_('One of the records you are trying to modify has already been deleted (Document type: %s).') % self._description)
+        recs.modified(modified_fields)
+
+        # check Python constraints
+        recs._validate_fields(names)
+
+        result += self._store_get_values(cr, uid, ids, names, context)
+
+        done = {}
+        recs.env.recompute_old.extend(result)
+        while recs.env.recompute_old:
+            sorted_recompute_old = sorted(recs.env.recompute_old)
+            recs.env.clear_recompute_old()
+            for __, model_name, ids_to_update, fields_to_recompute in \
+                    sorted_recompute_old:
+                key = (model_name, tuple(fields_to_recompute))
+                done.setdefault(key, {})
+                # avoid to do several times the same computation
+                todo = [id for id in ids_to_update if id not in done[key]]
+                done[key].update(dict.fromkeys(todo, True))
+                self.pool[model_name]._store_set_values(
+                    cr, uid, todo, fields_to_recompute, context)
+
+        # recompute new-style fields
+        if recs.env.recompute and context.get('recompute', True):
+            recs.recompute()
+
+        self.step_workflow(cr, uid, ids, context=context)
+        return True
+
     #
     # TODO: Should set perm to user.xxx
     #
@@ -4157,6 +4535,65 @@ class BaseModel(object):
 
         return record
 
+    @api.model
+    @api.returns('self', lambda value: value.ids)
+    def create_multi(self, vals_list):
+        """ create_multi(vals_list) -> records
+
+        Creates new records for the model, one for each dictionary in
+        ``vals_list``, and returns them in the same order.
+
+        The records are inserted with multi-row ``INSERT`` queries, and the
+        constraints, stored function fields, recomputations, access rules
+        and workflows are processed once for the whole batch. Models that
+        override :meth:`~.create` get their records created one by one, so
+        that their own logic is applied to every record.
+
+        :param list vals_list: list of values for the model's fields, see
+            :meth:`~.create` for details
+        :return: the new records
+        """
+        if type(self).create.im_func is not BaseModel.create.im_func:
+            return self.browse([self.create(vals).id for vals in vals_list])
+
+        self.check_access_rights('create')
+
+        old_vals_list, new_vals_list = [], []
+        unknown = set()
+        for vals in vals_list:
+            # add missing defaults, and drop fields that may not be set by user
+            vals = self._add_missing_default_values(vals)
+            for field in itertools.chain(MAGIC_COLUMNS, ('parent_left', 'parent_right')):
+                vals.pop(field, None)
+
+            # split up fields into old-style and pure new-style ones
+            old_vals, new_vals = {}, {}
+            for key, val in vals.iteritems():
+                field = self._fields.get(key)
+                if field:
+                    if field.column or field.inherited:
+                        old_vals[key] = val
+                    if field.inverse and not field.inherited:
+                        new_vals[key] = val
+                else:
+                    unknown.add(key)
+            old_vals_list.append(old_vals)
+            new_vals_list.append(new_vals)
+
+        if unknown:
+            _logger.warning("%s.create_multi() includes unknown fields: %s", self._name, ', '.join(sorted(unknown)))
+
+        # create records with old-style fields
+        records = self.browse(self._create_multi(old_vals_list))
+
+        # put the values of pure new-style fields into cache, and inverse them
+        for record, new_vals in itertools.izip(records, new_vals_list):
+            record._cache.update(record._convert_to_cache(new_vals))
+            for key in new_vals:
+                self._fields[key].determine_inverse(record)
+
+        return records
+
     def _create(self, cr, user, vals, context=None):
         # low-level implementation of create()
         if not context:
@@ -4165,6 +4602,73 @@ class BaseModel(object):
         if self.is_transient():
             self._transient_vacuum(cr, user)
 
+        updates, upd_todo = self._create_prepare(cr, user, vals, context)
+
+        # the list of tuples used in this formatting corresponds to
+        # tuple(field_name, format, value)
+        # In some case, for example (id, create_date, write_date) we does not
+        # need to read the third value of the tuple, because the real value is
+        # encoded in the second value (the format).
+        cr.execute(
+            """INSERT INTO "%s" (%s) VALUES(%s) RETURNING id""" % (
+                self._table,
+                ', '.join('"%s"' % u[0] for u in updates),
+                ', '.join(u[1] for u in updates)
+            ),
+            tuple([u[2] for u in updates if len(u) > 2])
+        )
+
+        id_new, = cr.fetchone()
+        self._create_post(cr, user, [id_new], [vals], [upd_todo], context)
+        return id_new
+
+    def _create_multi(self, cr, user, vals_list, context=None):
+        """ Low-level implementation of :meth:`~.create_multi`: insert the
+        records with one ``INSERT`` query per set of columns and per chunk of
+        ``cr.IN_MAX`` records, and return the list of their ids.
+        """
+        if not context:
+            context = {}
+
+        if self.is_transient():
+            self._transient_vacuum(cr, user)
+
+        # group the records by INSERT statement, i.e., by list of columns
+        # and formats; the values are the positions of the records in vals_list
+        groups = OrderedDict()
+        prepared = []
+        for index, vals in enumerate(vals_list):
+            updates, upd_todo = self._create_prepare(cr, user, vals, context)
+            prepared.append(upd_todo)
+            key = tuple((u[0], u[1]) for u in updates)
+            groups.setdefault(key, []).append((index, [u[2] for u in updates if len(u) > 2]))
+
+        ids = [None] * len(vals_list)
+        for key, rows in groups.iteritems():
+            columns = ', '.join('"%s"' % column for column, _format in key)
+            row_format = '(%s)' % ', '.join(format for _column, format in key)
+            for chunk in cr.split_for_in_conditions(rows):
+                cr.execute(
+                    """INSERT INTO "%s" (%s) VALUES %s RETURNING id""" % (
+                        self._table, columns, ', '.join([row_format] * len(chunk)),
+                    ),
+                    tuple(param for _index, params in chunk for param in params)
+                )
+                # rows are returned in the order of the VALUES clause
+                for (index, _params), (id_new,) in itertools.izip(chunk, cr.fetchall()):
+                    ids[index] = id_new
+
+        self._create_post(cr, user, ids, vals_list, prepared, context)
+        return ids
+
+    def _create_prepare(self, cr, user, vals, context):
+        """ Prepare the insertion of a record with ``vals``: create or update
+        its parent records (``_inherits``), and filter ``vals`` in place.
+
+        :return: a pair ``(updates, upd_todo)``, where ``updates`` is the list
+            of column assignments for the INSERT query, and ``upd_todo`` is the
+            list of fields that must be set once the record exists
+        """
         tocreate = {}
         for v in self._inherits:
             if self._inherits[v] not in vals:
@@ -4177,7 +4681,7 @@ class BaseModel(object):
             #   (column_name, format_string, column_value)
             #   (column_name, sql_formula)
             # Those tuples will be used by the string formatting for the INSERT
-            # statement below.
+            # statement.
             ('id', "nextval('%s')" % self._sequence),
         ]
 
@@ -4275,46 +4779,26 @@ class BaseModel(object):
             updates.append(('create_date', "(now() at time zone 'UTC')"))
             updates.append(('write_date', "(now() at time zone 'UTC')"))
 
-        # the list of tuples used in this formatting corresponds to
-        # tuple(field_name, format, value)
-        # In some case, for example (id, create_date, write_date) we does not
-        # need to read the third value of the tuple, because the real value is
-        # encoded in the second value (the format).
-        cr.execute(
-            """INSERT INTO "%s" (%s) VALUES(%s) RETURNING id""" % (
-                self._table,
-                ', '.join('"%s"' % u[0] for u in updates),
-                ', '.join(u[1] for u in updates)
-            ),
-            tuple([u[2] for u in updates if len(u) > 2])
-        )
+        # the 'set' method of fields which are not classic_write is called by
+        # priority order
+        upd_todo.sort(lambda x, y: self._columns[x].priority-self._columns[y].priority)
+        return updates, upd_todo
 
-        id_new, = cr.fetchone()
-        recs = self.browse(cr, user, id_new, context)
+    def _create_post(self, cr, user, ids, vals_list, upd_todo_list, context):
+        """ Complete the creation of the records ``ids``, which have just been
+        inserted with the corresponding values in ``vals_list``: parent store,
+        non-classic fields (``upd_todo_list``), constraints, recomputations,
+        access rules and workflows. The batch-wide steps are done once.
+        """
+        recs = self.browse(cr, user, ids, context)
+        self._update_rollups(cr, ids)
 
         if self._parent_store and not context.get('defer_parent_store_computation'):
             if self.pool._init:
                 self.pool._init_parent[self._name] = True
             else:
-                parent = vals.get(self._parent_name, False)
-                if parent:
-                    cr.execute('select parent_right from '+self._table+' where '+self._parent_name+'=%s order by '+(self._parent_order or self._order), (parent,))
-                    pleft_old = None
-                    result_p = cr.fetchall()
-                    for (pleft,) in result_p:
-                        if not pleft:
-                            break
-                        pleft_old = pleft
-                    if not pleft_old:
-                        cr.execute('select parent_left from '+self._table+' where id=%s', (parent,))
-                        pleft_old = cr.fetchone()[0]
-                    pleft = pleft_old
-                else:
-                    cr.execute('select max(parent_right) from '+self._table)
-                    pleft = cr.fetchone()[0] or 0
-                cr.execute('update '+self._table+' set parent_left=parent_left+2 where parent_left>%s', (pleft,))
-                cr.execute('update '+self._table+' set parent_right=parent_right+2 where parent_right>%s', (pleft,))
-                cr.execute('update '+self._table+' set parent_left=%s,parent_right=%s where id=%s', (pleft+1, pleft+2, id_new))
+                for id_new, vals in itertools.izip(ids, vals_list):
+                    self._parent_store_create(cr, id_new, vals)
                 recs.invalidate_cache(['parent_left', 'parent_right'])
 
         # invalidate and mark new-style fields to recompute; do this before
@@ -4322,9 +4806,6 @@ class BaseModel(object):
         # fields, e.g., a one2many checking constraints on records
         recs.modified(self._fields)
 
-        # call the 'set' method of fields which are not classic_write
-        upd_todo.sort(lambda x, y: self._columns[x].priority-self._columns[y].priority)
-
         # default element in context must be remove when call a one2many or many2many
         rel_context = context.copy()
         for c in context.items():
@@ -4332,18 +4813,21 @@ class BaseModel(object):
                 del rel_context[c[0]]
 
         result = []
-        for field in upd_todo:
-            result += self._columns[field].set(cr, self, id_new, field, vals[field], user, rel_context) or []
+        upd_fields = set()
+        vals_fields = set(self._inherits.values())
+        for id_new, vals, upd_todo in itertools.izip(ids, vals_list, upd_todo_list):
+            for field in upd_todo:
+                result += self._columns[field].set(cr, self, id_new, field, vals[field], user, rel_context) or []
+            upd_fields.update(upd_todo)
+            vals_fields.update(vals)
 
         # for recomputing new-style fields
-        recs.modified(upd_todo)
+        recs.modified(list(upd_fields))
 
         # check Python constraints
-        recs._validate_fields(vals)
+        recs._validate_fields(vals_fields)
 
-        result += self._store_get_values(cr, user, [id_new],
-                list(set(vals.keys() + self._inherits.values())),
-                context)
+        result += self._store_get_values(cr, user, ids, list(vals_fields), context)
         recs.env.recompute_old.extend(result)
 
         if recs.env.recompute and context.get('recompute', True):
@@ -4351,18 +4835,39 @@ class BaseModel(object):
             while recs.env.recompute_old:
                 sorted_recompute_old = sorted(recs.env.recompute_old)
                 recs.env.clear_recompute_old()
-                for __, model_name, ids, fields2 in sorted_recompute_old:
-                    if not (model_name, ids, fields2) in done:
+                for __, model_name, ids2, fields2 in sorted_recompute_old:
+                    if not (model_name, ids2, fields2) in done:
                         self.pool[model_name]._store_set_values(
-                            cr, user, ids, fields2, context)
-                        done.append((model_name, ids, fields2))
+                            cr, user, ids2, fields2, context)
+                        done.append((model_name, ids2, fields2))
 
             # recompute new-style fields
             recs.recompute()
 
-        self.check_access_rule(cr, user, [id_new], 'create', context=context)
-        self.create_workflow(cr, user, [id_new], context=context)
-        return id_new
+        self.check_access_rule(cr, user, ids, 'create', context=context)
+        self.create_workflow(cr, user, ids, context=context)
+
+    def _parent_store_create(self, cr, id_new, vals):
+        """ Insert the new record ``id_new`` in the parent store. """
+        parent = vals.get(self._parent_name, False)
+        if parent:
+            cr.execute('select parent_right from '+self._table+' where '+self._parent_name+'=%s order by '+(self._parent_order or self._order), (parent,))
+            pleft_old = None
+            result_p = cr.fetchall()
+            for (pleft,) in result_p:
+                if not pleft:
+                    break
+                pleft_old = pleft
+            if not pleft_old:
+                cr.execute('select parent_left from '+self._table+' where id=%s', (parent,))
+                pleft_old = cr.fetchone()[0]
+            pleft = pleft_old
+        else:
+            cr.execute('select max(parent_right) from '+self._table)
+            pleft = cr.fetchone()[0] or 0
+        cr.execute('update '+self._table+' set parent_left=parent_left+2 where parent_left>%s', (pleft,))
+        cr.execute('update '+self._table+' set parent_right=parent_right+2 where parent_right>%s', (pleft,))
+        cr.execute('update '+self._table+' set parent_left=%s,parent_right=%s where id=%s', (pleft+1, pleft+2, id_new))
 
     def _store_get_values(self, cr, uid, ids, fields, context):
         """Returns an ordered list of fields.function to call due to
@@ -4453,6 +4958,7 @@ class BaseModel(object):
                 keys.append(self._columns[f]._multi)
             todo.setdefault(self._columns[f]._multi, [])
             todo[self._columns[f]._multi].append(f)
+        values = defaultdict(dict)      # {id: {field: value}}
         for key in keys:
             val = todo[key]
             if key:
@@ -4463,7 +4969,6 @@ class BaseModel(object):
                         for f in value.keys():
                             if f in field_dict[id]:
                                 value.pop(f)
-                    updates = []        # list of (column, pattern, value)
                     for v in value:
                         if v not in val:
                             continue
@@ -4473,13 +4978,7 @@ class BaseModel(object):
                                 value[v] = value[v][0]
                             except:
                                 pass
-                        updates.append((v, column._symbol_set[0], column._symbol_set[1](value[v])))
-                    if updates:
-                        query = 'UPDATE "%s" SET %s WHERE id = %%s' % (
-                            self._table, ','.join('"%s"=%s' % u[:2] for u in updates),
-                        )
-                        params = tuple(u[2] for u in updates)
-                        cr.execute(query, params + (id,))
+                        values[id][v] = value[v]
 
             else:
                 for f in val:
@@ -4497,16 +4996,96 @@ class BaseModel(object):
                                 value = value[0]
                             except:
                                 pass
-                        query = 'UPDATE "%s" SET "%s"=%s WHERE id = %%s' % (
-                            self._table, f, column._symbol_set[0],
-                        )
-                        cr.execute(query, (column._symbol_set[1](value), id))
+                        values[id][f] = value
+
+        self._update_rows(cr, values)
 
         # invalidate and mark new-style fields to recompute
         self.browse(cr, uid, ids, context).modified(fields)
 
         return True
 
+    def _update_rows(self, cr, values, extra_updates=()):
+        """ Update the columns of many rows of the table at once, without any
+        side effect. Rows receiving identical values are updated together with
+        ``UPDATE ... WHERE id IN``, and the other ones are grouped by set of
+        columns, and updated with ``UPDATE ... FROM (VALUES ...)``.
+
+        :param values: dict ``{id: {field_name: value}}``, where the fields
+            are classic-write columns, and the values are in the format of
+            :meth:`~.write`
+        :param extra_updates: column assignments common to all rows, given as
+            ``(column, sql_formula)`` or ``(column, format, value)``
+        :return: the number of updated rows
+        """
+        extra_set = ''.join(', "%s"=%s' % u[:2] for u in extra_updates)
+        extra_params = tuple(u[2] for u in extra_updates if len(u) > 2)
+        rowcount = 0
+
+        if self._rollups:
+            rollup_ids = [id for id, vals in values.iteritems() if vals]
+            rollup_fnames = set(name for vals in values.itervalues() for name in vals)
+            rollup_fnames.update(u[0] for u in extra_updates)
+            self._update_rollups(cr, rollup_ids, rollup_fnames, sign=-1)
+
+        # group ids by identical values, and the remaining rows by set of
+        # columns (rows with unhashable values are considered distinct)
+        identical = defaultdict(list)
+        distinct = defaultdict(list)
+        for id, vals in values.iteritems():
+            if not vals:
+                continue
+            try:
+                identical[frozendict(vals)].append(id)
+            except TypeError:
+                distinct[tuple(sorted(vals))].append(id)
+
+        for vals, ids in identical.iteritems():
+            if len(ids) == 1:
+                distinct[tuple(sorted(vals))].append(ids[0])
+                continue
+            updates = [
+                (name, self._columns[name]._symbol_set[0], self._columns[name]._symbol_set[1](vals[name]))
+                for name in vals
+            ]
+            query = 'UPDATE "%s" SET %s%s WHERE id IN %%s' % (
+                self._table, ','.join('"%s"=%s' % u[:2] for u in updates), extra_set,
+            )
+            params = tuple(u[2] for u in updates) + extra_params
+            for sub_ids in cr.split_for_in_conditions(ids):
+                cr.execute(query, params + (sub_ids,))
+                rowcount += cr.rowcount
+
+        for names, ids in distinct.iteritems():
+            columns = [self._columns[name] for name in names]
+            assignments = []
+            for name, column in itertools.izip(names, columns):
+                # the values are not typed in the VALUES clause, cast them
+                pg_type = get_pg_type(column)
+                cast = '::%s' % pg_type[0] if pg_type else ''
+                assignments.append('"%s"=v."%s"%s' % (name, name, cast))
+            row_format = '(%%s, %s)' % ', '.join(column._symbol_set[0] for column in columns)
+            for sub_ids in cr.split_for_in_conditions(ids):
+                query = 'UPDATE "%s" SET %s%s FROM (VALUES %s) AS v(id, %s) WHERE "%s".id = v.id' % (
+                    self._table, ','.join(assignments), extra_set,
+                    ', '.join([row_format] * len(sub_ids)),
+                    ', '.join('"%s"' % name for name in names), self._table,
+                )
+                params = list(extra_params)
+                for id in sub_ids:
+                    params.append(id)
+                    params.extend(
+                        column._symbol_set[1](values[id][name])
+                        for name, column in itertools.izip(names, columns)
+                    )
+                cr.execute(query, params)
+                rowcount += cr.rowcount
+
+        if self._rollups:
+            self._update_rollups(cr, rollup_ids, rollup_fnames)
+
+        return rowcount
+
     # TODO: ameliorer avec NULL
     def _where_calc(self, cr, user, domain, active_test=True, context=None):
         """Computes the WHERE clause needed to implement an OpenERP domain.
@@ -4532,9 +5111,7 @@ class BaseModel(object):
                 domain = [('active', '=', 1)]
 
         if domain:
-            e = expression.expression(cr, user, domain, self, context)
-            tables = e.get_tables()
-            where_clause, where_params = e.to_sql()
+            tables, where_clause, where_params = expression.domain_to_sql(cr, user, domain, self, context)
             where_clause = where_clause and [where_clause] or []
         else:
             where_clause, where_params, tables = [], [], ['"%s"' % self._table]
@@ -5353,6 +5930,8 @@ class BaseModel(object):
         records.env = env
         records._ids = ids
         env.prefetch[cls._name].update(ids)
+        if len(ids) > 1:
+            env.add_prefetch_group(cls._name, ids)
         return records
 
     @api.v7
@@ -5758,16 +6337,27 @@ class BaseModel(object):
         return RecordCache(self)
 
     @api.model
-    def _in_cache_without(self, field):
+    def _in_cache_without(self, field, limit=None):
         """ Make sure ``self`` is present in cache (for prefetching), and return
             the records of model ``self`` in cache that have no value for ``field``
-            (:class:`Field` instance).
+            (:class:`Field` instance). Those are taken from the prefetch group
+            of ``self`` if it has one (see :meth:`~openerp.api.Environment.prefetch_group`),
+            and from all the records of the environment otherwise. If ``limit``
+            is given, at most ``limit`` records are returned, starting with
+            the records of ``self``.
         """
         env = self.env
         prefetch_ids = env.prefetch[self._name]
         prefetch_ids.update(self._ids)
-        ids = filter(None, prefetch_ids - set(env.cache[field]))
-        return self.browse(ids)
+        group = env.prefetch_group(self._name, self._ids[0]) if self._ids else None
+        cache = env.cache[field]
+        ids = OrderedSet(id for id in self._ids if id and id not in cache)
+        for id in (prefetch_ids if group is None else group):
+            if limit is not None and len(ids) >= limit:
+                break
+            if id and id not in cache:
+                ids[id] = None
+        return self.browse(list(ids))
 
     @api.model
     def refresh(self):
@@ -5847,15 +6437,12 @@ class BaseModel(object):
             # determine the fields to recompute
             fs = self.env[field.model_name]._field_computed[field]
             ns = [f.name for f in fs if f.store]
-            # evaluate fields, and group record ids by update
-            updates = defaultdict(set)
+            # evaluate fields, and update records in batch
+            values = {}
             for rec in recs.exists():
-                vals = rec._convert_to_write({n: rec[n] for n in ns})
-                updates[frozendict(vals)].add(rec.id)
-            # update records in batch when possible
+                values[rec.id] = rec._convert_to_write({n: rec[n] for n in ns})
             with recs.env.norecompute():
-                for vals, ids in updates.iteritems():
-                    recs.browse(ids)._write(dict(vals))
+                recs._bulk_write(values)
             # mark computed fields as done
             map(recs._recompute_done, fs)
 
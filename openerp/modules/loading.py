@@ -28,6 +28,35 @@ from module import runs_post_install
 _logger = logging.getLogger(__name__)
 _test_logger = logging.getLogger('openerp.tests')
 
+# the number of threads that parse XML data files ahead of their loading, and
+# the number of modules whose files are parsed ahead
+PARSE_WORKERS = 4
+PARSE_LOOKAHEAD = 8
+
+
+def _planned_files(package):
+    """ Return the data files that :func:`load_module_graph` is expected to
+    load for ``package``.
+    """
+    if not (hasattr(package, 'init') or hasattr(package, 'update') or package.state in ('to install', 'to upgrade')):
+        return []
+    kinds = ['init_xml', 'update_xml', 'data']
+    if hasattr(package, 'demo') or (package.dbdemo and package.state != 'installed'):
+        kinds += ['demo_xml', 'demo']
+    return [filename for kind in kinds for filename in package.data.get(kind, [])]
+
+
+def _log_timings(title, timings, limit=10):
+    """ Log the ``limit`` slowest items of ``timings``, which is a list of
+    triples ``(name, duration, queries)``.
+    """
+    if timings and _logger.isEnabledFor(logging.INFO):
+        slowest = sorted(timings, key=lambda item: item[1], reverse=True)[:limit]
+        _logger.info("%s:\n%s", title, "\n".join(
+            "  %8.2fs %8d queries  %s" % (duration, queries, name)
+            for name, duration, queries in slowest
+        ))
+
 
 def load_module_graph(cr, graph, status=None, perform_checks=True, skip_modules=None, report=None):
     """Migrates+Updates or Installs all module nodes from ``graph``
@@ -95,7 +124,11 @@ def load_module_graph(cr, graph, status=None, perform_checks=True, skip_modules=
                 noupdate = False
                 if kind in ('demo', 'demo_xml') or (filename.endswith('.csv') and kind in ('init', 'init_xml')):
                     noupdate = True
-                tools.convert_file(cr, module_name, filename, idref, mode, noupdate, kind, report)
+                t1 = time.time()
+                t1_sql = openerp.sql_db.sql_counter
+                tools.convert_file(cr, module_name, filename, idref, mode, noupdate, kind, report, parser=parser)
+                file_timings.append(('%s/%s' % (module_name, filename),
+                                     time.time() - t1, openerp.sql_db.sql_counter - t1_sql))
         finally:
             if kind in ('demo', 'test'):
                 threading.currentThread().testing = False
@@ -112,96 +145,124 @@ def load_module_graph(cr, graph, status=None, perform_checks=True, skip_modules=
     t0 = time.time()
     t0_sql = openerp.sql_db.sql_counter
 
-    for index, package in enumerate(graph):
-        module_name = package.name
-        module_id = package.id
-
-        if skip_modules and module_name in skip_modules:
-            continue
-
-        migrations.migrate_module(package, 'pre')
-        load_openerp_module(package.name)
-
-        new_install = package.state == 'to install'
-        if new_install:
-            py_module = sys.modules['openerp.addons.%s' % (module_name,)]
-            pre_init = package.info.get('pre_init_hook')
-            if pre_init:
-                getattr(py_module, pre_init)(cr)
-
-        models = registry.load(cr, package)
+    # the load plan: the data files of every module, parsed ahead by a pool
+    # of threads while the previous modules are loaded
+    plan = [
+        (package.name, [] if skip_modules and package.name in skip_modules else _planned_files(package))
+        for package in graph
+    ]
+    parser = tools.convert.DataFileParser(PARSE_WORKERS) if any(files for _name, files in plan) else None
+    module_timings = []
+    file_timings = []
 
-        loaded_modules.append(package.name)
-        if hasattr(package, 'init') or hasattr(package, 'update') or package.state in ('to install', 'to upgrade'):
-            registry.setup_models(cr, partial=True)
-            init_module_models(cr, package.name, models)
-
-        idref = {}
-
-        mode = 'update'
-        if hasattr(package, 'init') or package.state == 'to install':
-            mode = 'init'
-
-        if hasattr(package, 'init') or hasattr(package, 'update') or package.state in ('to install', 'to upgrade'):
-            # Can't put this line out of the loop: ir.module.module will be
-            # registered by init_module_models() above.
-            modobj = registry['ir.module.module']
+    try:
+        for index, package in enumerate(graph):
+            module_name = package.name
+            module_id = package.id
 
-            if perform_checks:
-                modobj.check(cr, SUPERUSER_ID, [module_id])
+            if skip_modules and module_name in skip_modules:
+                continue
 
-            if package.state=='to upgrade':
-                # upgrading the module information
-                modobj.write(cr, SUPERUSER_ID, [module_id], modobj.get_values_from_terp(package.data))
-            _load_data(cr, module_name, idref, mode, kind='data')
-            has_demo = hasattr(package, 'demo') or (package.dbdemo and package.state != 'installed')
-            if has_demo:
-                _load_data(cr, module_name, idref, mode, kind='demo')
-                cr.execute('update ir_module_module set demo=%s where id=%s', (True, module_id))
-                modobj.invalidate_cache(cr, SUPERUSER_ID, ['demo'], [module_id])
+            if parser:
+                for name, files in plan[index:index + PARSE_LOOKAHEAD]:
+                    for filename in files:
+                        parser.submit(name, filename)
+            t1 = time.time()
+            t1_sql = openerp.sql_db.sql_counter
 
-            migrations.migrate_module(package, 'post')
+            migrations.migrate_module(package, 'pre')
+            load_openerp_module(package.name)
 
-            # Update translations for all installed languages
-            modobj.update_translations(cr, SUPERUSER_ID, [module_id], None, {'overwrite': openerp.tools.config["overwrite_existing_translations"]})
+            new_install = package.state == 'to install'
+            if new_install:
+                py_module = sys.modules['openerp.addons.%s' % (module_name,)]
+                pre_init = package.info.get('pre_init_hook')
+                if pre_init:
+                    getattr(py_module, pre_init)(cr)
+
+            models = registry.load(cr, package)
+
+            loaded_modules.append(package.name)
+            if hasattr(package, 'init') or hasattr(package, 'update') or package.state in ('to install', 'to upgrade'):
+                registry.setup_models(cr, partial=True)
+                init_module_models(cr, package.name, models)
+
+            idref = {}
+
+            mode = 'update'
+            if hasattr(package, 'init') or package.state == 'to install':
+                mode = 'init'
+
+            if hasattr(package, 'init') or hasattr(package, 'update') or package.state in ('to install', 'to upgrade'):
+                # Can't put this line out of the loop: ir.module.module will be
+                # registered by init_module_models() above.
+                modobj = registry['ir.module.module']
+
+                if perform_checks:
+                    modobj.check(cr, SUPERUSER_ID, [module_id])
+
+                if package.state=='to upgrade':
+                    # upgrading the module information
+                    modobj.write(cr, SUPERUSER_ID, [module_id], modobj.get_values_from_terp(package.data))
+                _load_data(cr, module_name, idref, mode, kind='data')
+                has_demo = hasattr(package, 'demo') or (package.dbdemo and package.state != 'installed')
+                if has_demo:
+                    _load_data(cr, module_name, idref, mode, kind='demo')
+                    cr.execute('update ir_module_module set demo=%s where id=%s', (True, module_id))
+                    modobj.invalidate_cache(cr, SUPERUSER_ID, ['demo'], [module_id])
+
+                migrations.migrate_module(package, 'post')
+
+                # Update translations for all installed languages
+                modobj.update_translations(cr, SUPERUSER_ID, [module_id], None, {'overwrite': openerp.tools.config["overwrite_existing_translations"]})
+
+                registry._init_modules.add(package.name)
+
+                if new_install:
+                    post_init = package.info.get('post_init_hook')
+                    if post_init:
+                        getattr(py_module, post_init)(cr, registry)
+
+                # validate all the views at a whole
+                registry['ir.ui.view']._validate_module_views(cr, SUPERUSER_ID, module_name)
+
+                if has_demo:
+                    # launch tests only in demo mode, allowing tests to use demo data.
+                    if tools.config.options['test_enable']:
+                        # Yamel test
+                        report.record_result(load_test(module_name, idref, mode))
+                        # Python tests
+                        ir_http = registry['ir.http']
+                        if hasattr(ir_http, '_routing_map'):
+                            # Force routing map to be rebuilt between each module test suite
+                            del(ir_http._routing_map)
+                        report.record_result(openerp.modules.module.run_unit_tests(module_name, cr.dbname))
+
+                processed_modules.append(package.name)
+
+                ver = adapt_version(package.data['version'])
+                # Set new modules and dependencies
+                modobj.write(cr, SUPERUSER_ID, [module_id], {'state': 'installed', 'latest_version': ver})
+
+                package.state = 'installed'
+                for kind in ('init', 'demo', 'update'):
+                    if hasattr(package, kind):
+                        delattr(package, kind)
 
             registry._init_modules.add(package.name)
+            cr.commit()
 
-            if new_install:
-                post_init = package.info.get('post_init_hook')
-                if post_init:
-                    getattr(py_module, post_init)(cr, registry)
-
-            # validate all the views at a whole
-            registry['ir.ui.view']._validate_module_views(cr, SUPERUSER_ID, module_name)
-
-            if has_demo:
-                # launch tests only in demo mode, allowing tests to use demo data.
-                if tools.config.options['test_enable']:
-                    # Yamel test
-                    report.record_result(load_test(module_name, idref, mode))
-                    # Python tests
-                    ir_http = registry['ir.http']
-                    if hasattr(ir_http, '_routing_map'):
-                        # Force routing map to be rebuilt between each module test suite
-                        del(ir_http._routing_map)
-                    report.record_result(openerp.modules.module.run_unit_tests(module_name, cr.dbname))
-
-            processed_modules.append(package.name)
-
-            ver = adapt_version(package.data['version'])
-            # Set new modules and dependencies
-            modobj.write(cr, SUPERUSER_ID, [module_id], {'state': 'installed', 'latest_version': ver})
-
-            package.state = 'installed'
-            for kind in ('init', 'demo', 'update'):
-                if hasattr(package, kind):
-                    delattr(package, kind)
-
-        registry._init_modules.add(package.name)
-        cr.commit()
+            if package.name in processed_modules:
+                duration, queries = time.time() - t1, openerp.sql_db.sql_counter - t1_sql
+                module_timings.append((package.name, duration, queries))
+                _logger.debug("module %s loaded in %.2fs, %s queries", package.name, duration, queries)
+    finally:
+        if parser:
+            parser.close()
 
     _logger.log(25, "%s modules loaded in %.2fs, %s queries", len(graph), time.time() - t0, openerp.sql_db.sql_counter - t0_sql)
+    _log_timings("slowest modules", module_timings)
+    _log_timings("slowest data files", file_timings)
 
     registry.clear_manual_fields()
 
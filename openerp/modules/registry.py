@@ -5,17 +5,29 @@
 
 """
 from collections import Mapping, defaultdict
+from contextlib import contextmanager, nested
 import logging
 import os
 import threading
+import time
 
 import openerp
 from .. import SUPERUSER_ID
 from openerp.tools import assertion_report, lazy_property, classproperty, config, topological_sort
+from openerp.tools.cache import CACHE_GROUPS, cache_groups_closure
+from openerp.tools.cache_store import make_store
 from openerp.tools.lru import LRU
 
 _logger = logging.getLogger(__name__)
 
+
+def cache_sequence(group):
+    """ Return the name of the signaling sequence of the given cache group. """
+    if group == 'default':
+        return 'base_cache_signaling'
+    return 'base_cache_signaling_%s' % group
+
+
 class Registry(Mapping):
     """ Model registry for a particular database.
 
@@ -47,18 +59,27 @@ class Registry(Mapping):
         # Indicates that the registry is 
         self.ready = False
 
+        # The installed modules and their version when the registry was built
+        # (see installed_modules); None means unknown.
+        self.module_versions = None
+
         # Inter-process signaling (used only when openerp.multi_process is True):
         # The `base_registry_signaling` sequence indicates the whole registry
         # must be reloaded.
         # The `base_cache_signaling sequence` indicates all caches must be
-        # invalidated (i.e. cleared).
+        # invalidated (i.e. cleared); the other cache groups have their own
+        # sequence `base_cache_signaling_<group>`.
         self.base_registry_signaling_sequence = None
-        self.base_cache_signaling_sequence = None
-
-        self.cache = LRU(8192)
-        # Flag indicating if at least one model cache has been cleared.
+        self.base_cache_signaling_sequences = {}
+
+        # one cache per group, see openerp.tools.cache.CACHE_GROUPS; the
+        # groups declared by models are added by setup_cache_groups()
+        self.cache_groups = dict(CACHE_GROUPS)
+        self.caches = {group: make_store(db_name, group) for group in CACHE_GROUPS}
+        self.cache = self.caches['default']
+        # The cache groups that have been cleared.
         # Useful only in a multi-process context.
-        self._any_cache_cleared = False
+        self.cache_invalidated = set()
 
         cr = self.cursor()
         has_unaccent = openerp.modules.db.has_unaccent(cr)
@@ -180,12 +201,14 @@ class Registry(Mapping):
             :param partial: ``True`` if all models have not been loaded yet.
         """
         lazy_property.reset_all(self)
+        t0 = time.time()
 
         # load custom models
         ir_model = self['ir.model']
         cr.execute('select model, transient from ir_model where state=%s', ('manual',))
         for (model_name, transient) in cr.fetchall():
             ir_model.instanciate(cr, SUPERUSER_ID, model_name, transient, {})
+        t1 = time.time()
 
         # prepare the setup on all models
         for model in self.models.itervalues():
@@ -195,57 +218,155 @@ class Registry(Mapping):
         self._m2m = {}
         for model in self.models.itervalues():
             model._setup_base(cr, SUPERUSER_ID, partial)
+        t2 = time.time()
 
         for model in self.models.itervalues():
             model._setup_fields(cr, SUPERUSER_ID, partial)
+        t3 = time.time()
 
         for model in self.models.itervalues():
             model._setup_complete(cr, SUPERUSER_ID)
+        t4 = time.time()
+
+        self.setup_cache_groups(cr)
+
+        # the compiled domains depend on the fields of models
+        self.clear_cache('domains')
+
+        _logger.log(logging.DEBUG if partial else logging.INFO,
+                    "%d models set up in %.3fs (custom models: %.3fs, base: %.3fs, fields: %.3fs, complete: %.3fs)",
+                    len(self.models), t4 - t0, t1 - t0, t2 - t1, t3 - t2, t4 - t3)
+
+    def setup_cache_groups(self, cr):
+        """ Add the cache groups declared by the models (see
+        :attr:`~openerp.models.BaseModel._cache_groups`) to the groups of
+        :data:`openerp.tools.cache.CACHE_GROUPS`, with their caches and their
+        signaling sequences.
+        """
+        dependents = dict((group, list(groups)) for group, groups in CACHE_GROUPS.iteritems())
+        for model in self.models.itervalues():
+            for group, depends in model._cache_groups.iteritems():
+                dependents.setdefault(group, [])
+                for depend in ('default',) + tuple(depends):
+                    if group not in dependents.setdefault(depend, []):
+                        dependents[depend].append(group)
+        self.cache_groups = dict((group, tuple(groups)) for group, groups in dependents.iteritems())
+
+        new_groups = sorted(group for group in self.cache_groups if group not in self.caches)
+        for group in new_groups:
+            self.caches[group] = make_store(self.db_name, group)
+        if new_groups:
+            _, sequences = self.setup_multi_process_signaling(cr, new_groups)
+            self.base_cache_signaling_sequences.update(sequences)
+
+    def installed_modules(self, cr):
+        """ Return the installed modules and their version, as a frozenset of
+        pairs ``(name, version)``.
+        """
+        cr.execute("SELECT name, latest_version FROM ir_module_module WHERE state='installed'")
+        return frozenset(cr.fetchall())
+
+    def reload_models(self, cr):
+        """ Set up the models again, after another process changed the custom
+        models or fields. The classes of the models of modules are kept, which
+        is much faster than building a new registry. This is only valid if the
+        installed modules have not changed.
+        """
+        t0 = time.time()
+        self.clear_manual_fields()
+        # remove the custom models that have been deleted
+        cr.execute('select model from ir_model where state=%s', ('manual',))
+        custom_models = set(name for (name,) in cr.fetchall())
+        for name, model in self.models.items():
+            if model._custom and name not in custom_models:
+                del self.models[name]
+        self.setup_models(cr)
+        # the other process has cleared the shared caches already
+        with self.local_only():
+            self.clear_caches()
+        self.reset_any_cache_cleared()
+        _logger.info("Registry %s reloaded in %.3fs", self.db_name, time.time() - t0)
 
     def clear_caches(self):
         """ Clear the caches
         This clears the caches associated to methods decorated with
         ``tools.ormcache`` or ``tools.ormcache_multi`` for all the models.
         """
-        self.cache.clear()
-        for model in self.models.itervalues():
-            model.clear_caches()
+        self.clear_cache('default')
+        with self.local_only():
+            for model in self.models.itervalues():
+                model.clear_caches()
+
+    def clear_cache(self, *groups):
+        """ Clear the caches of the given groups, and of the groups that depend
+        on them (see :meth:`setup_cache_groups`).
+        """
+        groups = cache_groups_closure(groups, self.cache_groups)
+        for group in groups:
+            self.caches[group].clear()
+        self.cache_invalidated.update(groups)
+
+    @contextmanager
+    def local_only(self):
+        """ Within this context, clearing caches does not clear the entries
+        shared with other processes.
+        """
+        with nested(*[cache.local_only() for cache in self.caches.itervalues()]):
+            yield
 
     # Useful only in a multi-process context.
     def reset_any_cache_cleared(self):
-        self._any_cache_cleared = False
+        self.cache_invalidated.clear()
 
     # Useful only in a multi-process context.
     def any_cache_cleared(self):
-        return self._any_cache_cleared
+        return bool(self.cache_invalidated)
 
     @classmethod
-    def setup_multi_process_signaling(cls, cr):
+    def setup_multi_process_signaling(cls, cr, groups=CACHE_GROUPS):
+        """ Create the signaling sequences of the registry and of the cache
+        ``groups`` if they do not exist, and return their values like
+        :meth:`fetch_multi_process_signaling`.
+        """
         if not openerp.multi_process:
-            return None, None
+            return None, {}
 
         # Inter-process signaling:
         # The `base_registry_signaling` sequence indicates the whole registry
         # must be reloaded.
         # The `base_cache_signaling sequence` indicates all caches must be
-        # invalidated (i.e. cleared).
-        cr.execute("""SELECT sequence_name FROM information_schema.sequences WHERE sequence_name='base_registry_signaling'""")
-        if not cr.fetchall():
-            cr.execute("""CREATE SEQUENCE base_registry_signaling INCREMENT BY 1 START WITH 1""")
-            cr.execute("""SELECT nextval('base_registry_signaling')""")
-            cr.execute("""CREATE SEQUENCE base_cache_signaling INCREMENT BY 1 START WITH 1""")
-            cr.execute("""SELECT nextval('base_cache_signaling')""")
-        
-        cr.execute("""
-                    SELECT base_registry_signaling.last_value,
-                           base_cache_signaling.last_value
-                    FROM base_registry_signaling, base_cache_signaling""")
-        r, c = cr.fetchone()
+        # invalidated (i.e. cleared), and the `base_cache_signaling_<group>`
+        # sequences indicate the caches of a given group must be invalidated.
+        sequences = ['base_registry_signaling'] + map(cache_sequence, groups)
+        cr.execute("""SELECT sequence_name FROM information_schema.sequences WHERE sequence_name IN %s""",
+                   (tuple(sequences),))
+        existing = set(row[0] for row in cr.fetchall())
+        for sequence in sequences:
+            if sequence not in existing:
+                cr.execute("""CREATE SEQUENCE %s INCREMENT BY 1 START WITH 1""" % sequence)
+                cr.execute("""SELECT nextval(%s)""", (sequence,))
+
+        r, c = cls.fetch_multi_process_signaling(cr, groups)
         _logger.debug("Multiprocess load registry signaling: [Registry: # %s] "\
                     "[Cache: # %s]",
                     r, c)
         return r, c
 
+    @classmethod
+    def fetch_multi_process_signaling(cls, cr, groups=CACHE_GROUPS):
+        """ Return the value of the registry signaling sequence, and a dict
+        mapping each cache group in ``groups`` to the value of its signaling
+        sequence.
+        """
+        groups = sorted(groups)
+        sequences = ['base_registry_signaling'] + map(cache_sequence, groups)
+        cr.execute("SELECT %s FROM %s" % (
+            ", ".join("%s.last_value" % sequence for sequence in sequences),
+            ", ".join(sequences),
+        ))
+        row = cr.fetchone()
+        return row[0], dict(zip(groups, row[1:]))
+
     def in_test_mode(self):
         """ Test whether the registry is in 'test' mode. """
         return self.test_cr is not None
@@ -379,9 +500,9 @@ class RegistryManager(object):
                 cls.registries[db_name] = registry
                 try:
                     with registry.cursor() as cr:
-                        seq_registry, seq_cache = Registry.setup_multi_process_signaling(cr)
+                        seq_registry, seq_caches = Registry.setup_multi_process_signaling(cr)
                         registry.base_registry_signaling_sequence = seq_registry
-                        registry.base_cache_signaling_sequence = seq_cache
+                        registry.base_cache_signaling_sequences = seq_caches
                     # This should be a method on Registry
                     openerp.modules.load_modules(registry._db, force_demo, status, update_module)
                 except Exception:
@@ -399,6 +520,7 @@ class RegistryManager(object):
                 cr = registry.cursor()
                 try:
                     registry.do_parent_store(cr)
+                    registry.module_versions = registry.installed_modules(cr)
                     cr.commit()
                 finally:
                     cr.close()
@@ -454,31 +576,43 @@ class RegistryManager(object):
             registry = cls.get(db_name)
             cr = registry.cursor()
             try:
-                cr.execute("""
-                    SELECT base_registry_signaling.last_value,
-                           base_cache_signaling.last_value
-                    FROM base_registry_signaling, base_cache_signaling""")
-                r, c = cr.fetchone()
+                r, c = Registry.fetch_multi_process_signaling(cr, registry.cache_groups)
                 _logger.debug("Multiprocess signaling check: [Registry - old# %s new# %s] "\
                     "[Cache - old# %s new# %s]",
                     registry.base_registry_signaling_sequence, r,
-                    registry.base_cache_signaling_sequence, c)
+                    registry.base_cache_signaling_sequences, c)
                 # Check if the model registry must be reloaded (e.g. after the
                 # database has been updated by another process).
                 if registry.base_registry_signaling_sequence is not None and registry.base_registry_signaling_sequence != r:
                     changed = True
-                    _logger.info("Reloading the model registry after database signaling.")
-                    registry = cls.new(db_name)
+                    if registry.module_versions is not None and \
+                            registry.module_versions == registry.installed_modules(cr):
+                        # only custom models or fields may have changed
+                        _logger.info("Reloading the models after database signaling.")
+                        with cls.lock(), openerp.api.Environment.manage():
+                            registry.reload_models(cr)
+                    else:
+                        _logger.info("Reloading the model registry after database signaling.")
+                        registry = cls.new(db_name)
                 # Check if the model caches must be invalidated (e.g. after a write
                 # occured on another process). Don't clear right after a registry
                 # has been reload.
-                elif registry.base_cache_signaling_sequence is not None and registry.base_cache_signaling_sequence != c:
-                    changed = True
-                    _logger.info("Invalidating all model caches after database signaling.")
-                    registry.clear_caches()
-                    registry.reset_any_cache_cleared()
+                else:
+                    old = registry.base_cache_signaling_sequences
+                    groups = [group for group in c if old.get(group) is not None and old[group] != c[group]]
+                    if groups:
+                        changed = True
+                        _logger.info("Invalidating model caches %s after database signaling.", sorted(groups))
+                        # shared cache entries have been cleared by the process
+                        # that signaled the change
+                        with registry.local_only():
+                            if 'default' in groups:
+                                registry.clear_caches()
+                            else:
+                                registry.clear_cache(*groups)
+                        registry.reset_any_cache_cleared()
                 registry.base_registry_signaling_sequence = r
-                registry.base_cache_signaling_sequence = c
+                registry.base_cache_signaling_sequences.update(c)
             finally:
                 cr.close()
         return changed
@@ -490,15 +624,22 @@ class RegistryManager(object):
             # through the database to other processes.
             registry = cls.get(db_name)
             if registry.any_cache_cleared():
-                _logger.info("At least one model cache has been cleared, signaling through the database.")
+                groups = sorted(registry.cache_invalidated)
+                _logger.info("Model caches %s have been cleared, signaling through the database.", groups)
+                # The caches were cleared before the transaction committed;
+                # meanwhile, another process may have stored in the shared
+                # entries values computed from the former data. Clear them
+                # again now that the change is visible, since the processes
+                # receiving the signal only clear their local entries.
+                for group in groups:
+                    registry.caches[group].clear()
                 cr = registry.cursor()
-                r = 1
                 try:
-                    cr.execute("select nextval('base_cache_signaling')")
-                    r = cr.fetchone()[0]
+                    for group in groups:
+                        cr.execute("select nextval(%s)", (cache_sequence(group),))
+                        registry.base_cache_signaling_sequences[group] = cr.fetchone()[0]
                 finally:
                     cr.close()
-                registry.base_cache_signaling_sequence = r
                 registry.reset_any_cache_cleared()
 
     @classmethod
@@ -618,12 +618,15 @@ class expression(object):
         For more info: http://christophe-simonis-at-tiny.blogspot.com/2008/08/new-new-domain-notation.html
     """
 
-    def __init__(self, cr, uid, exp, table, context):
+    def __init__(self, cr, uid, exp, table, context, parse=True):
         """ Initialize expression object and automatically parse the expression
             right after initialization.
 
             :param exp: expression (using domain ('foo', '=', 'bar' format))
             :param table: root model
+            :param parse: whether to parse the expression; an expression that
+                is not parsed can only give the parameters of its leaves (see
+                :meth:`get_params`)
 
             :attr list result: list that will hold the result of the parsing
                 as a list of ExtendedLeaf
@@ -641,7 +644,8 @@ class expression(object):
         self.expression = distribute_not(normalize_domain(exp))
 
         # parse the domain expression
-        self.parse(cr, uid, context=context)
+        if parse:
+            self.parse(cr, uid, context=context)
 
     # ----------------------------------------
     # Leafs management
@@ -1296,6 +1300,33 @@ class expression(object):
             params = [params]
         return query, params
 
+    def is_compilable(self):
+        """ Return whether the parsing left the expression unchanged, i.e.,
+            its SQL query is made of one condition per term of the expression,
+            without joins. Must be called before :meth:`to_sql`.
+        """
+        if self.joins or len(self.result) != len(self.expression):
+            return False
+        for eleaf, element in zip(self.result, self.expression):
+            if eleaf.join_context:
+                return False
+            if is_operator(element):
+                if eleaf.leaf != element:
+                    return False
+            elif not is_leaf(eleaf.leaf) or eleaf.leaf[0] != element[0] or eleaf.leaf[2] is not element[2]:
+                return False
+        return True
+
+    def get_params(self):
+        """ Return the parameters of the SQL query of an expression that is
+            compilable (see :meth:`is_compilable`), without parsing it.
+        """
+        params = []
+        for element in self.expression:
+            if not is_operator(element):
+                params.append(self.__leaf_to_sql(ExtendedLeaf(element, self.root_model))[1])
+        return tools.flatten(params)
+
     def to_sql(self):
         stack = []
         params = []
@@ -1321,3 +1352,88 @@ class expression(object):
             query = '(%s) AND %s' % (joins, query)
 
         return query, tools.flatten(params)
+
+
+# --------------------------------------------------
+# Compiled domains
+# --------------------------------------------------
+
+def _value_shape(value):
+    """ Return the part of a term's value that determines its SQL query. """
+    if value is None or value is True or value is False:
+        return value
+    if isinstance(value, (list, tuple)):
+        # the false values of a list are turned into a IS NULL condition
+        return ('list', len(value), sum(1 for item in value if item == False))
+    if isinstance(value, basestring):
+        return ('str', bool(value))
+    return type(value)
+
+
+def term_shape(model, element):
+    """ Return the shape of the domain term ``element``, which determines its
+        SQL query up to its parameters, or ``None`` if the term requires more
+        processing than a condition on a column of the model (joins,
+        sub-searches, translations, etc.)
+    """
+    if is_operator(element):
+        return element
+    if not is_leaf(element):
+        return None
+    left, operator, right = element
+    if tuple(element) in (TRUE_LEAF, FALSE_LEAF):
+        return tuple(element)
+    if '.' in left or operator in ('child_of', 'parent_of'):
+        return None
+    column = model._columns.get(left)
+    if column is None:
+        if left not in MAGIC_COLUMNS:
+            return None
+    elif column._type in ('one2many', 'many2many') or \
+            (isinstance(column, fields.function) and not column.store) or \
+            (column._type == 'binary' and column.attachment) or \
+            (column.translate and right):
+        return None
+    elif column._type == 'many2one' and (isinstance(right, basestring) or \
+            isinstance(right, (list, tuple)) and any(isinstance(item, basestring) for item in right)):
+        # name_search on the comodel
+        return None
+    elif column._type == 'datetime' and isinstance(right, (basestring, list, tuple)) and len(right) == 10:
+        # the time part is added to the value
+        return None
+    return (left, operator, _value_shape(right))
+
+
+def domain_to_sql(cr, uid, domain, model, context=None):
+    """ Return the tables, the where clause and its parameters of the SQL
+        query that selects the records of ``model`` matching ``domain``.
+
+        The queries of the domains made of conditions on the columns of
+        ``model`` only are compiled once per domain shape: the terms' values
+        are abstracted, except for what determines the query (see
+        :func:`_value_shape`). The compiled queries are kept in the cache
+        group ``'domains'`` of the registry, which is cleared when the models
+        are set up and when record rules change.
+    """
+    context = context or {}
+    exp = distribute_not(normalize_domain(domain))
+    shapes = [term_shape(model, element) for element in exp]
+    if None in shapes:
+        key = None
+    else:
+        key = (model._name, 'domain', context.get('lang'), context.get('active_test', True), tuple(shapes))
+        cache = model.pool.caches['domains']
+        compiled = cache.get(key, False)
+        if compiled:
+            tables, where_clause = compiled
+            e = expression(cr, uid, exp, model, context, parse=False)
+            return list(tables), where_clause, e.get_params()
+
+    e = expression(cr, uid, exp, model, context)
+    tables = e.get_tables()
+    compilable = key is not None and e.is_compilable()
+    where_clause, where_params = e.to_sql()
+    if key is not None:
+        # None marks the shapes that cannot be compiled
+        cache[key] = (tuple(tables), where_clause) if compilable else None
+    return tables, where_clause, where_params
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+""" Cron job scheduling.
+
+The due jobs of the loaded databases are dispatched to a bounded pool of
+threads by a :class:`CronPool`:
+
+* the databases are served in turn, so that the jobs of a database cannot
+  starve the ones of another database, and a database never gets more than
+  ``cron_max_threads_per_db`` threads at once;
+
+* a job is never dispatched to two threads at once, and the lock on its row
+  prevents other processes from running it concurrently;
+
+* the pool wakes up when an ``ir.cron`` record is created or rescheduled
+  (see :meth:`~openerp.addons.base.ir.ir_cron.ir_cron._notify_scheduler`), and
+  otherwise polls the databases every minute.
+"""
+import collections
+import logging
+import select
+import threading
+import time
+
+import openerp
+from openerp.tools import config
+
+_logger = logging.getLogger(__name__)
+
+SLEEP_INTERVAL = 60     # 1 min
+
+
+def _ir_cron():
+    from openerp.addons.base.ir.ir_cron import ir_cron
+    return ir_cron
+
+
+class CronListener(object):
+    """ Wait for the notifications sent to the cron schedulers. """
+
+    def __init__(self):
+        self._cr = None
+
+    def _connect(self):
+        from openerp.addons.base.ir.ir_cron import CRON_CHANNEL
+        cr = openerp.sql_db.db_connect('postgres').cursor()
+        try:
+            cr.execute("LISTEN %s" % CRON_CHANNEL)
+            cr.commit()
+        except Exception:
+            cr.close()
+            raise
+        self._cr = cr
+
+    def close(self):
+        if self._cr is not None:
+            try:
+                self._cr.close()
+            except Exception:
+                pass
+            self._cr = None
+
+    def wait(self, timeout):
+        """ Wait at most ``timeout`` seconds for notifications, and return
+        the set of the database names that were notified.
+        """
+        try:
+            if self._cr is None:
+                self._connect()
+            conn = self._cr._cnx
+            if select.select([conn], [], [], timeout) == ([], [], []):
+                return set()
+            conn.poll()
+            db_names = set()
+            while conn.notifies:
+                db_names.add(conn.notifies.pop().payload)
+            return db_names
+        except Exception:
+            _logger.warning("Cannot listen to the cron notifications, polling instead", exc_info=True)
+            self.close()
+            time.sleep(timeout)
+            return set()
+
+
+class CronPool(object):
+    """ Pool of threads running the due cron jobs of the loaded databases. """
+
+    def __init__(self, max_threads, max_threads_per_db=0, interval=SLEEP_INTERVAL):
+        self.max_threads = max(max_threads, 1)
+        self.max_threads_per_db = max_threads_per_db
+        self.interval = interval
+        self._cond = threading.Condition()
+        # the jobs to run {db_name: deque(job)}, in the order of service
+        self._queues = collections.OrderedDict()
+        # the ids of the jobs queued or running {db_name: set(job_id)}
+        self._jobs = collections.defaultdict(set)
+        # the number of running jobs {db_name: count}
+        self._running = collections.defaultdict(int)
+        self._wakeup = threading.Event()
+
+    def start(self):
+        """ Start the threads of the pool, as daemon threads. """
+        targets = [('scheduler', self._schedule_loop), ('listener', self._listen_loop)]
+        targets += [('cron%d' % i, self._run_loop) for i in xrange(self.max_threads)]
+        for name, target in targets:
+            thread = threading.Thread(target=target, name="openerp.service.cron.%s" % name)
+            thread.setDaemon(True)
+            thread.start()
+            _logger.debug("%s started!", name)
+
+    def wakeup(self):
+        """ Make the pool look for due jobs now. """
+        self._wakeup.set()
+
+    def schedule(self, db_name):
+        """ Queue the due jobs of ``db_name``. """
+        self.queue(db_name, _ir_cron()._get_due_jobs(db_name))
+
+    def queue(self, db_name, jobs):
+        """ Queue the jobs of ``db_name`` that are not queued or running. """
+        with self._cond:
+            for job in jobs:
+                if job['id'] not in self._jobs[db_name]:
+                    self._jobs[db_name].add(job['id'])
+                    self._queues.setdefault(db_name, collections.deque()).append(job)
+            self._cond.notify_all()
+
+    def _next_job(self):
+        """ Return the next job to run as a pair ``(db_name, job)``, or
+        ``None``. The caller must hold the lock of the pool.
+        """
+        for db_name, queue in self._queues.items():
+            if self.max_threads_per_db and self._running[db_name] >= self.max_threads_per_db:
+                continue
+            job = queue.popleft()
+            # serve the other databases before this one again
+            del self._queues[db_name]
+            if queue:
+                self._queues[db_name] = queue
+            self._running[db_name] += 1
+            return db_name, job
+        return None
+
+    def _job_done(self, db_name, job):
+        with self._cond:
+            self._running[db_name] -= 1
+            self._jobs[db_name].discard(job['id'])
+            self._cond.notify_all()
+
+    def stats(self):
+        """ Return ``{db_name: (queued, running)}``. """
+        with self._cond:
+            return {
+                db_name: (len(self._queues.get(db_name, ())), self._running[db_name])
+                for db_name in self._jobs
+                if self._jobs[db_name]
+            }
+
+    def _schedule_loop(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            registries = openerp.modules.registry.RegistryManager.registries
+            _logger.debug('cron polling for jobs')
+            for db_name, registry in registries.iteritems():
+                if registry.ready:
+                    try:
+                        self.schedule(db_name)
+                    except Exception:
+                        _logger.exception('Cannot poll the cron jobs of database %s', db_name)
+
+    def _listen_loop(self):
+        listener = CronListener()
+        while True:
+            if listener.wait(self.interval):
+                self.wakeup()
+
+    def _run_loop(self):
+        while True:
+            with self._cond:
+                item = self._next_job()
+                while item is None:
+                    self._cond.wait()
+                    item = self._next_job()
+            db_name, job = item
+            try:
+                _ir_cron()._run_job(db_name, job)
+            except Exception:
+                _logger.exception('Unexpected exception while running cron job %r', job)
+            finally:
+                self._job_done(db_name, job)
+
+
+def start_pool():
+    """ Start a :class:`CronPool` as configured, and return it. """
+    pool = CronPool(config['max_cron_threads'], config.get('cron_max_threads_per_db') or 0)
+    pool.start()
+    return pool
@@ -13,6 +13,7 @@ import signal
 import socket
 import subprocess
 import sys
+import tempfile
 import threading
 import time
 import unittest
@@ -39,7 +40,9 @@ import openerp
 from openerp.modules.registry import RegistryManager
 from openerp.release import nt_service_name
 import openerp.tools.config as config
+from openerp.service import cron
 from openerp.tools import stripped_sys_argv, dumpstacks, log_ormcache_stats
+from openerp.tools import cache_store
 
 _logger = logging.getLogger(__name__)
 
@@ -50,7 +53,7 @@ try:
 except ImportError:
     watchdog = None
 
-SLEEP_INTERVAL = 60     # 1 min
+SLEEP_INTERVAL = cron.SLEEP_INTERVAL
 
 def memory_info(process):
     """ psutil < 2.0 does not have memory_info, >= 3.0 does not have
@@ -58,6 +61,11 @@ def memory_info(process):
     pmem = (getattr(process, 'memory_info', None) or process.get_memory_info)()
     return (pmem.rss, pmem.vms)
 
+def log_stats(sig=None, frame=None):
+    """ Log the statistics of ormcache and of the connection pool. """
+    log_ormcache_stats()
+    openerp.sql_db.log_pool_stats()
+
 #----------------------------------------------------------
 # Werkzeug WSGI servers patched
 #----------------------------------------------------------
@@ -196,6 +204,7 @@ class ThreadedServer(CommonServer):
 
         #self.socket = None
         self.httpd = None
+        self.cron_pool = None
 
     def signal_handler(self, sig, frame):
         if sig in [signal.SIGINT, signal.SIGTERM]:
@@ -210,36 +219,20 @@ class ThreadedServer(CommonServer):
             openerp.phoenix = True
             self.quit_signals_received += 1
 
-    def cron_thread(self, number):
-        while True:
-            time.sleep(SLEEP_INTERVAL + number)     # Steve Reich timing style
-            registries = openerp.modules.registry.RegistryManager.registries
-            _logger.debug('cron%d polling for jobs', number)
-            for db_name, registry in registries.iteritems():
-                while registry.ready:
-                    acquired = openerp.addons.base.ir.ir_cron.ir_cron._acquire_job(db_name)
-                    if not acquired:
-                        break
-
     def cron_spawn(self):
-        """ Start the above runner function in a daemon thread.
+        """ Start the pool of cron threads (see :mod:`openerp.service.cron`).
 
-        The thread is a typical daemon thread: it will never quit and must be
-        terminated when the main process exits - with no consequence (the processing
-        threads it spawns are not marked daemon).
+        The threads are typical daemon threads: they will never quit and must
+        be terminated when the main process exits - with no consequence (the
+        processing threads they spawn are not marked daemon).
 
         """
-        # Force call to strptime just before starting the cron thread
+        # Force call to strptime just before starting the cron threads
         # to prevent time.strptime AttributeError within the thread.
         # See: http://bugs.python.org/issue7980
         datetime.datetime.strptime('2012-01-01', '%Y-%m-%d')
-        for i in range(openerp.tools.config['max_cron_threads']):
-            def target():
-                self.cron_thread(i)
-            t = threading.Thread(target=target, name="openerp.service.cron.cron%d" % i)
-            t.setDaemon(True)
-            t.start()
-            _logger.debug("cron%d started!" % i)
+        if openerp.tools.config['max_cron_threads']:
+            self.cron_pool = cron.start_pool()
 
     def http_thread(self):
         def app(e, s):
@@ -261,7 +254,7 @@ class ThreadedServer(CommonServer):
             signal.signal(signal.SIGCHLD, self.signal_handler)
             signal.signal(signal.SIGHUP, self.signal_handler)
             signal.signal(signal.SIGQUIT, dumpstacks)
-            signal.signal(signal.SIGUSR1, log_ormcache_stats)
+            signal.signal(signal.SIGUSR1, log_stats)
         elif os.name == 'nt':
             import win32api
             win32api.SetConsoleCtrlHandler(lambda sig: self.signal_handler(sig, None), 1)
@@ -355,7 +348,7 @@ class GeventServer(CommonServer):
 
         if os.name == 'posix':
             signal.signal(signal.SIGQUIT, dumpstacks)
-            signal.signal(signal.SIGUSR1, log_ormcache_stats)
+            signal.signal(signal.SIGUSR1, log_stats)
 
         gevent.spawn(self.watch_parent)
         self.httpd = WSGIServer((self.interface, self.port), self.app)
@@ -399,6 +392,7 @@ class PreforkServer(CommonServer):
         self.generation = 0
         self.queue = []
         self.long_polling_pid = None
+        self.cache_store_pid = None
 
     def pipe_new(self):
         pipe = os.pipe()
@@ -446,9 +440,25 @@ class PreforkServer(CommonServer):
         popen = subprocess.Popen([sys.executable] + nargs)
         self.long_polling_pid = popen.pid
 
+    def cache_store_spawn(self):
+        pid = os.fork()
+        if pid != 0:
+            self.cache_store_pid = pid
+            return
+        setproctitle('openerp: ormcache store')
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGCHLD,
+                    signal.SIGTTIN, signal.SIGTTOU, signal.SIGUSR1):
+            signal.signal(sig, signal.SIG_DFL)
+        if self.socket:
+            self.socket.close()
+        cache_store.serve(config['ormcache_socket'])
+        sys.exit(0)
+
     def worker_pop(self, pid):
         if pid == self.long_polling_pid:
             self.long_polling_pid = None
+        if pid == self.cache_store_pid:
+            self.cache_store_pid = None
         if pid in self.workers:
             _logger.debug("Worker (%s) unregistered", pid)
             try:
@@ -479,8 +489,8 @@ class PreforkServer(CommonServer):
                 # dump stacks on kill -3
                 self.dumpstacks()
             elif sig == signal.SIGUSR1:
-                # log ormcache stats on kill -SIGUSR1
-                log_ormcache_stats()
+                # log ormcache and connection pool stats on kill -SIGUSR1
+                log_stats()
             elif sig == signal.SIGTTIN:
                 # increase number of workers
                 self.population += 1
@@ -514,6 +524,8 @@ class PreforkServer(CommonServer):
                 self.worker_kill(pid, signal.SIGKILL)
 
     def process_spawn(self):
+        if config['ormcache_store'] == 'socket' and not self.cache_store_pid:
+            self.cache_store_spawn()
         if config['xmlrpc']:
             while len(self.workers_http) < self.population:
                 self.worker_spawn(WorkerHTTP, self.workers_http)
@@ -557,7 +569,14 @@ class PreforkServer(CommonServer):
         signal.signal(signal.SIGTTIN, self.signal_handler)
         signal.signal(signal.SIGTTOU, self.signal_handler)
         signal.signal(signal.SIGQUIT, dumpstacks)
-        signal.signal(signal.SIGUSR1, log_ormcache_stats)
+        signal.signal(signal.SIGUSR1, log_stats)
+
+        if config['ormcache_store'] == 'socket':
+            # the store must be running before registries are preloaded
+            if not config['ormcache_socket']:
+                config['ormcache_socket'] = os.path.join(
+                    tempfile.gettempdir(), 'odoo-ormcache-%s.sock' % self.pid)
+            self.cache_store_spawn()
 
         if self.address:
             # listen to socket
@@ -589,6 +608,11 @@ class PreforkServer(CommonServer):
             _logger.info("Stopping forcefully")
         for pid in self.workers.keys():
             self.worker_kill(pid, signal.SIGTERM)
+        if self.cache_store_pid is not None:
+            self.worker_kill(self.cache_store_pid, signal.SIGTERM)
+            self.cache_store_pid = None
+            if os.path.exists(config['ormcache_socket']):
+                os.unlink(config['ormcache_socket'])
         if self.socket:
             self.socket.close()
 
@@ -760,16 +784,22 @@ class WorkerCron(Worker):
 
     def __init__(self, multi):
         super(WorkerCron, self).__init__(multi)
-        # process_work() below process a single database per call.
-        # The variable db_index is keeping track of the next database to
-        # process.
+        # process_work() below process a single job of a single database per
+        # call. The variable db_index is keeping track of the next database
+        # to process, and idle tells whether no job was processed since the
+        # first database.
         self.db_index = 0
+        self.idle = True
+        self.listener = None
 
     def sleep(self):
-        # Really sleep once all the databases have been processed.
+        # Really sleep once all the databases have been processed without
+        # finding a job to run, until a job is created or rescheduled.
         if self.db_index == 0:
-            interval = SLEEP_INTERVAL + self.pid % 10   # chorus effect
-            time.sleep(interval)
+            if self.idle:
+                interval = SLEEP_INTERVAL + self.pid % 10   # chorus effect
+                self.listener.wait(interval)
+            self.idle = True
 
     def _db_list(self):
         if config['db_name']:
@@ -791,8 +821,13 @@ class WorkerCron(Worker):
                 start_time = time.time()
                 start_rss, start_vms = memory_info(psutil.Process(os.getpid()))
 
+            # run one job only, to be fair with the other databases
             import openerp.addons.base as base
-            base.ir.ir_cron.ir_cron._acquire_job(db_name)
+            ir_cron = base.ir.ir_cron.ir_cron
+            for job in ir_cron._get_due_jobs(db_name):
+                if ir_cron._run_job(db_name, job):
+                    self.idle = False
+                    break
             openerp.modules.registry.RegistryManager.delete(db_name)
 
             # dont keep cursors in multi database mode
@@ -819,6 +854,7 @@ class WorkerCron(Worker):
         Worker.start(self)
         if self.multi.socket:
             self.multi.socket.close()
+        self.listener = cron.CronListener()
 
 #----------------------------------------------------------
 # start/stop public api
@@ -50,6 +50,7 @@ from tools.func import frame_codeinfo
 from datetime import datetime as mdt
 from datetime import timedelta
 import threading
+import time
 from inspect import currentframe
 
 import re
@@ -501,120 +502,286 @@ class ConnectionPool(object):
         Keep a set of connections to pg databases open, and reuse them
         to open cursors for all transactions.
 
-        The connections are *not* automatically closed. Only a close_db()
-        can trigger that.
+        Connections are kept in one sub-pool per connection info (i.e., per
+        database). When all connections are used, :meth:`borrow` waits for
+        one to be given back, up to ``timeout`` seconds. Connections idle for
+        more than ``idle_timeout`` seconds are closed, and connections idle
+        for more than ``ping_delay`` seconds are checked before being reused.
     """
+    ping_delay = 30
 
-    def locked(fun):
-        @wraps(fun)
-        def _locked(self, *args, **kwargs):
-            self._lock.acquire()
-            try:
-                return fun(self, *args, **kwargs)
-            finally:
-                self._lock.release()
-        return _locked
-
-    def __init__(self, maxconn=64):
-        self._connections = []
+    def __init__(self, maxconn=64, maxconn_per_db=0, timeout=0, idle_timeout=0):
         self._maxconn = max(maxconn, 1)
+        self._maxconn_per_db = min(maxconn_per_db or self._maxconn, self._maxconn)
+        self._timeout = timeout
+        self._idle_timeout = idle_timeout
         self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._pools = {}                # {key: SubPool}
+        self._waiters = 0
+        self._next_reap = time.time() + (idle_timeout or 0)
+        self._stats = dict.fromkeys([
+            'borrowed', 'created', 'waited', 'timeouts', 'reaped', 'broken',
+            'borrow_time', 'borrow_time_max',
+        ], 0)
 
     def __repr__(self):
-        used = len([1 for c, u in self._connections[:] if u])
-        count = len(self._connections)
+        used = sum(len(pool.used) for pool in self._pools.values())
+        count = self._count()
         return "ConnectionPool(used=%d/count=%d/max=%d)" % (used, count, self._maxconn)
 
     def _debug(self, msg, *args):
         _logger.debug(('%r ' + msg), self, *args)
 
-    @locked
-    def borrow(self, connection_info):
+    @staticmethod
+    def _key(connection_info):
+        return tuple(sorted(connection_info.iteritems()))
+
+    def _count(self):
+        return sum(pool.count() for pool in self._pools.values())
+
+    def _close(self, cnx):
+        # psycopg2 2.4.4 and earlier do not allow closing a closed connection
+        if not cnx.closed:
+            cnx.close()
+
+    def _free_leaked(self):
+        """ Free dead and leaked connections; must be called with the lock. """
+        for pool in self._pools.itervalues():
+            for cnx in list(pool.used):
+                if cnx.closed:
+                    pool.used.discard(cnx)
+                    self._debug('Removing closed connection: %r', cnx.dsn)
+                elif getattr(cnx, 'leaked', False):
+                    delattr(cnx, 'leaked')
+                    pool.used.discard(cnx)
+                    pool.idle.append((cnx, time.time()))
+                    _logger.info('%r: Free leaked connection to %r', self, cnx.dsn)
+
+    def _reap(self, now):
+        """ Remove the connections idle for too long from the pool, and return
+            them; must be called with the lock. The connections must then be
+            closed by the caller, once the lock is released.
         """
-        :param dict connection_info: dict of psql connection keywords
-        :rtype: PsycoConnection
+        if not self._idle_timeout or now < self._next_reap:
+            return []
+        self._next_reap = now + min(self._idle_timeout, 60)
+        limit = now - self._idle_timeout
+        reaped = []
+        for key, pool in self._pools.items():
+            # idle connections are sorted by the time they were given back
+            index = 0
+            while index < len(pool.idle) and pool.idle[index][1] < limit:
+                index += 1
+            reaped.extend(cnx for cnx, _ in pool.idle[:index])
+            del pool.idle[:index]
+            if not pool.count():
+                del self._pools[key]
+        self._stats['reaped'] += len(reaped)
+        return reaped
+
+    def _pop_oldest_idle(self):
+        """ Remove the oldest idle connection from the pool and return it, or
+            return ``None`` if there is none; must be called with the lock.
+            The connection must then be closed by the caller.
         """
-        # free dead and leaked connections
-        for i, (cnx, _) in tools.reverse_enumerate(self._connections):
-            if cnx.closed:
-                self._connections.pop(i)
-                self._debug('Removing closed connection at index %d: %r', i, cnx.dsn)
-                continue
-            if getattr(cnx, 'leaked', False):
-                delattr(cnx, 'leaked')
-                self._connections.pop(i)
-                self._connections.append((cnx, False))
-                _logger.info('%r: Free leaked connection to %r', self, cnx.dsn)
-
-        for i, (cnx, used) in enumerate(self._connections):
-            if not used and cnx._original_dsn == connection_info:
+        oldest = None
+        for pool in self._pools.itervalues():
+            if pool.idle and (oldest is None or pool.idle[0][1] < oldest.idle[0][1]):
+                oldest = pool
+        if oldest is None:
+            return None
+        return oldest.idle.pop(0)[0]
+
+    def _acquire(self, key, deadline):
+        """ Return an idle connection of the sub-pool ``key`` with the time
+            it was given back, or ``(None, None)`` after reserving a slot for
+            a new connection. Wait until ``deadline`` for a connection to be
+            given back if necessary.
+        """
+        # connections are closed once the lock is released
+        closing = []
+        try:
+            return self._acquire_locked(key, deadline, closing)
+        finally:
+            for cnx in closing:
+                self._close(cnx)
+
+    def _acquire_locked(self, key, deadline, closing):
+        """ Implementation of :meth:`_acquire`; the connections to close are
+            added to the list ``closing``.
+        """
+        with self._lock:
+            waited = False
+            while True:
+                self._free_leaked()
+                closing.extend(self._reap(time.time()))
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = self._pools[key] = SubPool()
+                if pool.idle:
+                    # reuse the most recently used connection
+                    cnx, since = pool.idle.pop()
+                    pool.used.add(cnx)
+                    return cnx, since
+                if pool.count() < self._maxconn_per_db:
+                    if self._count() < self._maxconn:
+                        pool.pending += 1
+                        return None, None
+                    # make room by closing the oldest idle connection
+                    oldest = self._pop_oldest_idle()
+                    if oldest is not None:
+                        pool.pending += 1
+                        self._debug('Removing old connection: %r', oldest.dsn)
+                        closing.append(oldest)
+                        return None, None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    _logger.warning('%r: no connection available after %.3fs, %d waiting',
+                                    self, self._timeout, self._waiters)
+                    raise PoolError('The Connection Pool Is Full')
+                if not waited:
+                    waited = True
+                    self._stats['waited'] += 1
+                self._waiters += 1
                 try:
-                    cnx.reset()
-                except psycopg2.OperationalError:
-                    self._debug('Cannot reset connection at index %d: %r', i, cnx.dsn)
-                    # psycopg2 2.4.4 and earlier do not allow closing a closed connection
-                    if not cnx.closed:
-                        cnx.close()
-                    continue
-                self._connections.pop(i)
-                self._connections.append((cnx, True))
-                self._debug('Borrow existing connection to %r at index %d', cnx.dsn, i)
-
-                return cnx
-
-        if len(self._connections) >= self._maxconn:
-            # try to remove the oldest connection not used
-            for i, (cnx, used) in enumerate(self._connections):
-                if not used:
-                    self._connections.pop(i)
-                    if not cnx.closed:
-                        cnx.close()
-                    self._debug('Removing old connection at index %d: %r', i, cnx.dsn)
-                    break
-            else:
-                # note: this code is called only if the for loop has completed (no break)
-                raise PoolError('The Connection Pool Is Full')
+                    # wake up regularly to free leaked connections
+                    self._available.wait(min(remaining, 1.0))
+                finally:
+                    self._waiters -= 1
 
+    def _check(self, cnx, since):
+        """ Prepare an idle connection for reuse, and return whether it works. """
         try:
-            result = psycopg2.connect(
-                connection_factory=PsycoConnection,
-                **connection_info)
+            cnx.reset()
+            if time.time() - since > self.ping_delay:
+                cr = cnx.cursor()
+                try:
+                    cr.execute("SELECT 1")
+                finally:
+                    cr.close()
+                cnx.rollback()
+            return True
         except psycopg2.Error:
-            _logger.info('Connection to the database failed')
-            raise
-        result._original_dsn = connection_info
-        self._connections.append((result, True))
-        self._debug('Create new connection')
-        return result
+            self._debug('Cannot reuse connection: %r', cnx.dsn)
+            return False
+
+    def _discard(self, key, cnx=None):
+        """ Forget a connection, or a reserved slot if ``cnx`` is ``None``. """
+        with self._lock:
+            pool = self._pools.get(key)
+            if cnx is None:
+                pool.pending -= 1
+            elif pool is not None:
+                pool.used.discard(cnx)
+            self._available.notify_all()
+        if cnx is not None:
+            self._close(cnx)
+
+    def borrow(self, connection_info):
+        """
+        :param dict connection_info: dict of psql connection keywords
+        :rtype: PsycoConnection
+        """
+        start = time.time()
+        key = self._key(connection_info)
+        while True:
+            cnx, since = self._acquire(key, start + self._timeout)
+            if cnx is None:
+                try:
+                    cnx = psycopg2.connect(
+                        connection_factory=PsycoConnection,
+                        **connection_info)
+                except psycopg2.Error:
+                    _logger.info('Connection to the database failed')
+                    self._discard(key)
+                    raise
+                cnx._original_dsn = connection_info
+                with self._lock:
+                    pool = self._pools[key]
+                    pool.pending -= 1
+                    pool.used.add(cnx)
+                    self._stats['created'] += 1
+                self._debug('Create new connection')
+                break
+            if self._check(cnx, since):
+                self._debug('Borrow existing connection to %r', cnx.dsn)
+                break
+            with self._lock:
+                self._stats['broken'] += 1
+            self._discard(key, cnx)
+
+        duration = time.time() - start
+        with self._lock:
+            stats = self._stats
+            stats['borrowed'] += 1
+            stats['borrow_time'] += duration
+            stats['borrow_time_max'] = max(stats['borrow_time_max'], duration)
+        return cnx
 
-    @locked
     def give_back(self, connection, keep_in_pool=True):
         self._debug('Give back connection to %r', connection.dsn)
-        for i, (cnx, used) in enumerate(self._connections):
-            if cnx is connection:
-                self._connections.pop(i)
-                if keep_in_pool:
-                    self._connections.append((cnx, False))
-                    self._debug('Put connection to %r in pool', cnx.dsn)
-                else:
-                    self._debug('Forgot connection to %r', cnx.dsn)
-                    cnx.close()
-                break
-        else:
-            raise PoolError('This connection does not below to the pool')
+        closing = []
+        with self._lock:
+            pool = self._pools.get(self._key(connection._original_dsn))
+            if pool is None or connection not in pool.used:
+                raise PoolError('This connection does not below to the pool')
+            pool.used.discard(connection)
+            if keep_in_pool and not connection.closed:
+                pool.idle.append((connection, time.time()))
+                self._debug('Put connection to %r in pool', connection.dsn)
+            else:
+                self._debug('Forgot connection to %r', connection.dsn)
+                closing.append(connection)
+            closing.extend(self._reap(time.time()))
+            self._available.notify_all()
+        for cnx in closing:
+            self._close(cnx)
 
-    @locked
     def close_all(self, dsn=None):
-        count = 0
-        last = None
-        for i, (cnx, used) in tools.reverse_enumerate(self._connections):
-            if dsn is None or cnx._original_dsn == dsn:
-                cnx.close()
-                last = self._connections.pop(i)[0]
-                count += 1
-        _logger.info('%r: Closed %d connections %s', self, count,
+        closing = []
+        with self._lock:
+            for key, pool in self._pools.items():
+                if dsn is None or key == self._key(dsn):
+                    closing.extend(pool.connections())
+                    pool.idle = []
+                    pool.used = set()
+                    if not pool.pending:
+                        del self._pools[key]
+            self._available.notify_all()
+        for cnx in closing:
+            self._close(cnx)
+        last = closing[-1] if closing else None
+        _logger.info('%r: Closed %d connections %s', self, len(closing),
                     (dsn and last and 'to %r' % last.dsn) or '')
 
+    def stats(self):
+        """ Return a dict with the current state and counters of the pool. """
+        with self._lock:
+            result = dict(self._stats)
+            result['in_use'] = sum(len(pool.used) for pool in self._pools.itervalues())
+            result['idle'] = sum(len(pool.idle) for pool in self._pools.itervalues())
+            result['waiters'] = self._waiters
+        result['borrow_time_avg'] = result['borrow_time'] / (result['borrowed'] or 1)
+        return result
+
+
+class SubPool(object):
+    """ The connections of a :class:`ConnectionPool` to a given database. """
+    __slots__ = ['idle', 'used', 'pending']
+
+    def __init__(self):
+        self.idle = []          # [(connection, time given back)], oldest first
+        self.used = set()       # borrowed connections
+        self.pending = 0        # number of connections being opened
+
+    def count(self):
+        return len(self.idle) + len(self.used) + self.pending
+
+    def connections(self):
+        return [cnx for cnx, _ in self.idle] + list(self.used)
+
 
 class Connection(object):
     """ A lightweight instance of a connection to postgres
@@ -682,7 +849,12 @@ _Pool = None
 def db_connect(to, allow_uri=False):
     global _Pool
     if _Pool is None:
-        _Pool = ConnectionPool(int(tools.config['db_maxconn']))
+        _Pool = ConnectionPool(
+            int(tools.config['db_maxconn']),
+            int(tools.config.get('db_maxconn_per_db') or 0),
+            float(tools.config.get('db_pool_timeout') or 0),
+            int(tools.config.get('db_idle_timeout') or 0),
+        )
 
     db, info = connection_info_for(to)
     if not allow_uri and db != to:
@@ -699,3 +871,14 @@ def close_all():
     global _Pool
     if _Pool:
         _Pool.close_all()
+
+def log_pool_stats():
+    """ Log the statistics of the connection pool. """
+    if _Pool:
+        stats = _Pool.stats()
+        _logger.info("%r: %d in use, %d idle, %d waiting; %d borrowed (%.1fms avg, %.1fms max), "
+                     "%d created, %d waited, %d timeouts, %d reaped, %d broken",
+                     _Pool, stats['in_use'], stats['idle'], stats['waiters'], stats['borrowed'],
+                     stats['borrow_time_avg'] * 1000, stats['borrow_time_max'] * 1000,
+                     stats['created'], stats['waited'], stats['timeouts'], stats['reaped'],
+                     stats['broken'])
@@ -27,6 +27,39 @@ class ormcache_counter(object):
 # statistic counters dictionary, maps (dbname, modelname, method) to counter
 STAT = defaultdict(ormcache_counter)
 
+# The caches of a registry are split in groups that are cleared and signaled
+# to other processes separately: 'access' (users, groups and access rights),
+# 'rules' (record rules), 'translations', 'views' (views and templates),
+# 'menus' (menus and bound actions) and 'domains' (compiled domains, see
+# openerp.osv.expression.domain_to_sql). This maps each group to the groups
+# that depend on it, and are cleared with it. The group 'default' holds the
+# entries whose dependencies are unknown; clearing it clears all the groups.
+# Addons declare their own groups on their models (see
+# openerp.models.BaseModel._cache_groups).
+CACHE_GROUPS = {
+    'default': ('access', 'rules', 'translations', 'views', 'menus', 'domains'),
+    'access': ('rules', 'views', 'menus'),
+    'rules': ('domains', 'views', 'menus'),
+    'domains': (),
+    'translations': ('views', 'menus'),
+    'views': (),
+    'menus': (),
+}
+
+
+def cache_groups_closure(groups, dependents=CACHE_GROUPS):
+    """ Return the set of ``groups`` with the groups that depend on them,
+    given the mapping ``dependents`` of each group to its dependent groups.
+    """
+    result = set()
+    todo = list(groups)
+    while todo:
+        group = todo.pop()
+        if group not in result:
+            result.add(group)
+            todo.extend(dependents[group])
+    return result
+
 
 class ormcache(object):
     """ LRU cache decorator for model methods.
@@ -43,10 +76,19 @@ class ormcache(object):
         @ormcache(skiparg=3)
         def _compute_domain(self, cr, uid, model_name, mode="read"):
             ...
+
+    The named parameter `group` gives the cache group of the entries (see
+    :data:`CACHE_GROUPS`, and the groups declared by the models of addons),
+    which is ``'default'`` if not specified::
+
+        @ormcache('uid', 'model_name', 'mode', group='rules')
+        def _compute_domain(self, cr, uid, model_name, mode="read"):
+            ...
     """
     def __init__(self, *args, **kwargs):
         self.args = args
         self.skiparg = kwargs.get('skiparg')
+        self.group = kwargs.get('group', 'default')
 
     def __call__(self, method):
         self.method = method
@@ -71,7 +113,7 @@ class ormcache(object):
 
     def lru(self, model):
         counter = STAT[(model.pool.db_name, model._name, self.method)]
-        return model.pool.cache, (model._name, self.method), counter
+        return model.pool.caches[self.group], (model._name, self.method), counter
 
     def lookup(self, method, *args, **kwargs):
         d, key0, counter = self.lru(args[0])
@@ -89,10 +131,8 @@ class ormcache(object):
             return self.method(*args, **kwargs)
 
     def clear(self, model, *args):
-        """ Clear the registry cache """
-        d, key0, _ = self.lru(model)
-        d.clear()
-        model.pool._any_cache_cleared = True
+        """ Clear the registry cache of the group of the method """
+        model.pool.clear_cache(self.group)
 
 
 class ormcache_context(ormcache):
@@ -193,7 +233,9 @@ class dummy_cache(object):
 
 
 def log_ormcache_stats(sig=None, frame=None):
-    """ Log statistics of ormcache usage by database, model, and method. """
+    """ Log statistics of ormcache usage by database, model, and method, and
+    of the cache groups of every database.
+    """
     from openerp.modules.registry import RegistryManager
     import threading
 
@@ -201,14 +243,22 @@ def log_ormcache_stats(sig=None, frame=None):
     me_dbname = me.dbname
     entries = defaultdict(int)
     for dbname, reg in RegistryManager.registries.iteritems():
-        for key in reg.cache.iterkeys():
-            entries[(dbname,) + key[:2]] += 1
+        for cache in reg.caches.itervalues():
+            for key in cache.iterkeys():
+                entries[(dbname,) + key[:2]] += 1
     for key, count in sorted(entries.items()):
         dbname, model_name, method = key
         me.dbname = dbname
         stat = STAT[key]
         _logger.info("%6d entries, %6d hit, %6d miss, %6d err, %4.1f%% ratio, for %s.%s",
-                     count, stat.hit, stat.miss, stat.err, stat.ratio, model_name, method.__name__)
+                     count, stat.hit, stat.miss, stat.err, stat.ratio, model_name,
+                     getattr(method, '__name__', method))
+    for dbname, reg in sorted(RegistryManager.registries.iteritems()):
+        me.dbname = dbname
+        for group, cache in sorted(reg.caches.iteritems()):
+            size, hit, miss, eviction = cache.stats()
+            _logger.info("%6d entries, %6d hit, %6d miss, %6d evictions, for cache group %s",
+                         size, hit, miss, eviction, group)
 
     me.dbname = me_dbname
 
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+""" Storage backends for the ``ormcache`` decorators.
+
+A registry keeps its cached values in a store, which is a mapping whose keys
+are tuples like ``(model_name, method, *args)``. The first element of a key is
+the *namespace* of the entry, and a store can be cleared for a given
+namespace only.
+
+Two stores are available, selected by the option ``ormcache_store``:
+
+* ``local`` (default): a :class:`LocalStore` per registry in every process;
+
+* ``socket``: a :class:`SharedStore`, which keeps the entries of the
+  namespaces given by the option ``ormcache_shared_models`` in a
+  :class:`StoreServer` process reached on the Unix socket ``ormcache_socket``,
+  and the other ones locally. The server is shared by all the workers of a
+  prefork server, so that those caches are filled once for all workers, and
+  their invalidation is immediately seen by all of them.
+"""
+import contextlib
+import cPickle
+import errno
+import logging
+import os
+import socket
+import SocketServer
+import struct
+import threading
+import types
+
+from .config import config
+from .lru import LRU
+
+_logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('!I')
+
+
+class StoreUnavailable(Exception):
+    """ The shared store cannot be reached. """
+
+
+def _send(sock, obj):
+    data = cPickle.dumps(obj, cPickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return ''.join(chunks)
+
+
+def _recv(sock):
+    size, = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return cPickle.loads(_recv_exactly(sock, size))
+
+
+class LocalStore(object):
+    """ In-process store, an LRU with support for namespaces. """
+
+    def __init__(self, count=8192):
+        self.lru = LRU(count)
+
+    def __contains__(self, key):
+        return key in self.lru
+
+    def __getitem__(self, key):
+        return self.lru[key]
+
+    def __setitem__(self, key, value):
+        self.lru[key] = value
+
+    def __delitem__(self, key):
+        del self.lru[key]
+
+    def __len__(self):
+        return len(self.lru)
+
+    def get(self, key, default=None):
+        return self.lru.get(key, default)
+
+    def iterkeys(self):
+        return self.lru.iterkeys()
+
+    def stats(self):
+        """ Return the number of entries, hits, misses and evictions. """
+        lru = self.lru
+        return len(lru), lru.hit, lru.miss, lru.eviction
+
+    def clear(self, namespace=None):
+        """ Remove all the entries, or the entries of ``namespace`` only. """
+        if namespace is None:
+            self.lru.clear()
+        else:
+            _remove(self.lru, [key for key in self.lru.keys() if key[0] == namespace])
+
+    @contextlib.contextmanager
+    def local_only(self):
+        """ Compatibility with :meth:`SharedStore.local_only`. """
+        yield
+
+
+def _remove(lru, keys):
+    """ Remove ``keys`` from ``lru``, ignoring the keys that are missing. """
+    for key in keys:
+        try:
+            del lru[key]
+        except KeyError:
+            pass
+
+
+#
+# Shared store: server side
+#
+
+class StoreRequestHandler(SocketServer.BaseRequestHandler):
+    """ Process the requests of one client connection; a request is a tuple
+    ``(operation, args...)``, and each request gets a response. Keys are
+    tuples made of a prefix (a tuple that identifies the client store), the
+    namespace, and other elements. Values are pickled by the clients and
+    never unpickled by the server.
+    """
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                request = _recv(self.request)
+            except EOFError:
+                return
+            try:
+                response = self.process(store, request[0], request[1:])
+            except Exception:
+                _logger.exception("ormcache store: cannot process %r", request[0])
+                response = None
+            _send(self.request, response)
+
+    def process(self, store, operation, args):
+        """ Return the response to the request ``(operation, args...)``. """
+        if operation == 'get':
+            return store.get(args[0])
+        elif operation == 'set':
+            store[args[0]] = args[1]
+            return True
+        elif operation == 'del':
+            try:
+                del store[args[0]]
+                return True
+            except KeyError:
+                return False
+        elif operation == 'clear':
+            prefix, namespace = args
+            size = len(prefix)
+            _remove(store.lru, [
+                key for key in store.lru.keys()
+                if key[:size] == prefix and (namespace is None or key[size] == namespace)
+            ])
+            return True
+        elif operation == 'keys':
+            prefix = args[0]
+            return [key for key in store.lru.keys() if key[:len(prefix)] == prefix]
+        return None
+
+
+class StoreServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """ Shared store server, listening on a Unix socket. """
+    daemon_threads = True
+
+    def __init__(self, path, count=65536):
+        self.store = LocalStore(count)
+        if os.path.exists(path):
+            os.unlink(path)
+        SocketServer.UnixStreamServer.__init__(self, path, StoreRequestHandler)
+        os.chmod(path, 0600)
+
+
+def serve(path, count=65536):
+    """ Run a shared store server on the Unix socket ``path`` until the
+    process is terminated.
+    """
+    server = StoreServer(path, count)
+    _logger.info("ormcache store listening on %s", path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+#
+# Shared store: client side
+#
+
+class StoreClient(object):
+    """ Connection to a :class:`StoreServer`, one socket per thread. """
+
+    def __init__(self, path, timeout=1.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _socket(self):
+        sock = getattr(self._local, 'socket', None)
+        if sock is not None and self._local.pid != os.getpid():
+            # the socket was inherited from the parent process
+            self._close()
+            sock = None
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.socket = sock
+            self._local.pid = os.getpid()
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'socket', None)
+        self._local.socket = None
+        if sock is not None:
+            sock.close()
+
+    def call(self, *request):
+        """ Send ``request`` to the server, and return its response. A broken
+        connection is reopened once before giving up.
+        """
+        for attempt in (1, 2):
+            try:
+                sock = self._socket()
+                _send(sock, request)
+                return _recv(sock)
+            except (socket.error, EOFError), e:
+                self._close()
+                if attempt == 2 or getattr(e, 'errno', None) in (errno.ENOENT, errno.ECONNREFUSED):
+                    raise StoreUnavailable(str(e))
+
+
+class SharedStore(object):
+    """ Store whose entries in ``namespaces`` are kept by a shared server, and
+    the other ones in a :class:`LocalStore`. Entries that cannot be pickled,
+    and all entries while the server is unavailable, are kept locally.
+    """
+
+    def __init__(self, db_name, client, namespaces, count=8192, group='default'):
+        self.prefix = (db_name, group)
+        self.client = client
+        self.namespaces = frozenset(namespaces)
+        self.local = LocalStore(count)
+        # map the names of the methods used in keys back to the methods
+        self._methods = {}
+        self._flags = threading.local()
+
+    def _key(self, key):
+        """ Return the key of ``key`` in the shared server, or ``None`` if
+        ``key`` is kept locally.
+        """
+        hash(key)                       # unhashable keys are not cached
+        if key[0] not in self.namespaces:
+            return None
+        items = list(self.prefix)
+        for item in key:
+            if isinstance(item, types.FunctionType):
+                name = '%s.%s' % (item.__module__, item.__name__)
+                self._methods[name] = item
+                item = name
+            items.append(item)
+        return tuple(items)
+
+    def _unkey(self, key):
+        return tuple(self._methods.get(item, item) if isinstance(item, basestring) else item
+                     for item in key[len(self.prefix):])
+
+    def _call(self, *request):
+        """ Return the response of the server to ``request``, or ``None`` if
+        the server is unavailable or the request cannot be pickled.
+        """
+        try:
+            return self.client.call(*request)
+        except StoreUnavailable, e:
+            _logger.warning("ormcache store unavailable, using local cache: %s", e)
+        except (cPickle.PicklingError, TypeError):
+            _logger.debug("ormcache key cannot be shared: %r", request[1], exc_info=True)
+        return None
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def __getitem__(self, key):
+        skey = self._key(key)
+        if skey is not None:
+            data = self._call('get', skey)
+            if data is not None:
+                return cPickle.loads(data)
+        return self.local[key]
+
+    def __setitem__(self, key, value):
+        skey = self._key(key)
+        if skey is not None:
+            try:
+                data = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+            except (cPickle.PicklingError, TypeError):
+                data = None
+            if data is not None and self._call('set', skey, data):
+                return
+        self.local[key] = value
+
+    def __delitem__(self, key):
+        skey = self._key(key)
+        found = bool(skey is not None and self._call('del', skey))
+        try:
+            del self.local[key]
+        except KeyError:
+            if not found:
+                raise
+
+    def __len__(self):
+        return len(self.local) + len(self._call('keys', self.prefix) or ())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def iterkeys(self):
+        for key in self.local.iterkeys():
+            yield key
+        for key in self._call('keys', self.prefix) or ():
+            yield self._unkey(key)
+
+    def stats(self):
+        """ Return the number of entries, hits, misses and evictions of the
+        local entries.
+        """
+        return self.local.stats()
+
+    @contextlib.contextmanager
+    def local_only(self):
+        """ Within this context, :meth:`clear` only clears the local entries.
+        This is used when the shared entries have been invalidated by the
+        process that signaled the invalidation.
+        """
+        self._flags.local_only = True
+        try:
+            yield
+        finally:
+            self._flags.local_only = False
+
+    def clear(self, namespace=None):
+        """ Remove all the entries, or the entries of ``namespace`` only. """
+        self.local.clear(namespace)
+        if getattr(self._flags, 'local_only', False):
+            return
+        if namespace is None or namespace in self.namespaces:
+            self._call('clear', self.prefix, namespace)
+
+
+# one client per socket, shared by the stores of all registries
+_clients = {}
+
+
+def make_store(db_name, group='default'):
+    """ Return a new store for the cache ``group`` of the registry of
+    ``db_name``, as configured.
+    """
+    if config.get('ormcache_store') == 'socket' and config.get('ormcache_socket'):
+        namespaces = filter(None, (name.strip() for name in
+                                   (config.get('ormcache_shared_models') or '').split(',')))
+        path = config['ormcache_socket']
+        client = _clients.get(path) or _clients.setdefault(path, StoreClient(path))
+        return SharedStore(db_name, client, namespaces, group=group)
+    return LocalStore()
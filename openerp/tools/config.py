@@ -135,6 +135,12 @@ class configmanager(object):
         group = optparse.OptionGroup(parser, "Web interface Configuration")
         group.add_option("--db-filter", dest="dbfilter", my_default='.*',
                          help="Filter listed database", metavar="REGEXP")
+        group.add_option("--session-store", dest="session_store", my_default='filesystem',
+                         type="choice", choices=['filesystem', 'postgresql'],
+                         help="Where to keep the HTTP sessions: 'filesystem' (in the data directory, "
+                              "default) or 'postgresql' (in the database given by --session-db).")
+        group.add_option("--session-db", dest="session_db", my_default=False,
+                         help="Database of the HTTP sessions, required with --session-store=postgresql.")
         parser.add_option_group(group)
 
         # Testing Group
@@ -203,6 +209,15 @@ class configmanager(object):
                          help="specify the database port", type="int")
         group.add_option("--db_maxconn", dest="db_maxconn", type='int', my_default=64,
                          help="specify the the maximum number of physical connections to posgresql")
+        group.add_option("--db_maxconn_per_db", dest="db_maxconn_per_db", type='int', my_default=0,
+                         help="specify the maximum number of physical connections to a single database "
+                              "(0 means db_maxconn)")
+        group.add_option("--db_pool_timeout", dest="db_pool_timeout", type='float', my_default=5.0,
+                         help="specify how many seconds a request waits for a free connection when the "
+                              "connection pool is full (default 5)")
+        group.add_option("--db_idle_timeout", dest="db_idle_timeout", type='int', my_default=600,
+                         help="specify after how many seconds an idle connection is closed "
+                              "(0 to keep them open, default 600)")
         group.add_option("--db-template", dest="db_template", my_default="template1",
                          help="specify a custom database template to create a new database")
         parser.add_option_group(group)
@@ -249,6 +264,14 @@ class configmanager(object):
         group.add_option("--max-cron-threads", dest="max_cron_threads", my_default=2,
                          help="Maximum number of threads processing concurrently cron jobs (default 2).",
                          type="int")
+        group.add_option("--cron-max-threads-per-db", dest="cron_max_threads_per_db", my_default=0,
+                         help="Maximum number of cron threads processing concurrently the jobs of "
+                              "one database. The default is 0, which means no limit.",
+                         type="int")
+        group.add_option("--prefetch-batch-size", dest="prefetch_batch_size", my_default=1000,
+                         help="Maximum number of records whose fields are read together when "
+                              "one of them is accessed (default 1000).",
+                         type="int")
         group.add_option("--unaccent", dest="unaccent", my_default=False, action="store_true",
                          help="Use the unaccent function provided by the database when available.")
         group.add_option("--geoip-db", dest="geoip_database", my_default='/usr/share/GeoIP/GeoLiteCity.dat',
@@ -276,6 +299,17 @@ class configmanager(object):
             group.add_option("--limit-request", dest="limit_request", my_default=8192,
                              help="Maximum number of request to be processed per worker (default 8192).",
                              type="int")
+            group.add_option("--ormcache-store", dest="ormcache_store", my_default='local',
+                             type="choice", choices=['local', 'socket'],
+                             help="Where to keep the ormcache entries: 'local' (per process, default) "
+                                  "or 'socket' (shared by the workers through a cache store process).")
+            group.add_option("--ormcache-socket", dest="ormcache_socket", my_default='',
+                             help="Unix socket of the shared ormcache store (default: a socket in the "
+                                  "temporary directory, created by the prefork server).")
+            group.add_option("--ormcache-shared-models", dest="ormcache_shared_models",
+                             my_default='ir.model.access,ir.rule,ir.translation,ir.ui.view',
+                             help="Comma-separated list of models whose ormcache entries are kept "
+                                  "in the shared ormcache store.")
             parser.add_option_group(group)
 
         # Copy all optparse options (i.e. MyOption) into self.options.
@@ -362,10 +396,12 @@ class configmanager(object):
                 'db_name', 'db_user', 'db_password', 'db_host',
                 'db_port', 'db_template', 'logfile', 'pidfile', 'smtp_port',
                 'email_from', 'smtp_server', 'smtp_user', 'smtp_password',
-                'db_maxconn', 'import_partial', 'addons_path',
+                'db_maxconn', 'db_maxconn_per_db', 'db_pool_timeout', 'db_idle_timeout',
+                'import_partial', 'addons_path',
                 'xmlrpc', 'syslog', 'without_demo',
                 'dbfilter', 'log_level', 'log_db',
-                'log_db_level', 'geoip_database',
+                'log_db_level', 'geoip_database', 'prefetch_batch_size',
+                'session_store', 'session_db',
         ]
 
         for arg in keys:
@@ -377,6 +413,9 @@ class configmanager(object):
             elif isinstance(self.options[arg], basestring) and self.casts[arg].type in optparse.Option.TYPE_CHECKER:
                 self.options[arg] = optparse.Option.TYPE_CHECKER[self.casts[arg].type](self.casts[arg], arg, self.options[arg])
 
+        die(self.options['session_store'] == 'postgresql' and not self.options['session_db'],
+            "the postgresql session store cannot be used without the session-db option")
+
         if isinstance(self.options['log_handler'], basestring):
             self.options['log_handler'] = self.options['log_handler'].split(',')
         self.options['log_handler'].extend(opt.log_handler)
@@ -389,13 +428,14 @@ class configmanager(object):
             'list_db', 'proxy_mode',
             'test_file', 'test_enable', 'test_commit', 'test_report_directory',
             'osv_memory_count_limit', 'osv_memory_age_limit', 'max_cron_threads', 'unaccent',
-            'data_dir',
+            'data_dir', 'cron_max_threads_per_db',
         ]
 
         posix_keys = [
             'workers',
             'limit_memory_hard', 'limit_memory_soft',
             'limit_time_cpu', 'limit_time_real', 'limit_request',
+            'ormcache_store', 'ormcache_socket', 'ormcache_shared_models',
         ]
 
         if os.name == 'posix':
@@ -3,14 +3,17 @@
 
 import cStringIO
 import csv
+import itertools
 import logging
 import os.path
 import re
 import sys
+import threading
 import time
 
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from multiprocessing.pool import ThreadPool
 
 import pytz
 from lxml import etree, builder
@@ -202,6 +205,19 @@ def _eval_xml(self, node, pool, cr, uid, idref, context=None):
     elif node.tag == "test":
         return node.text
 
+# The tags that declare records, and the model of their records; the tags
+# <delete>, <function>, etc. may modify any record in the database.
+DECLARATIVE_TAGS = {
+    'record': None,
+    'template': 'ir.ui.view',
+    'menuitem': 'ir.ui.menu',
+    'act_window': 'ir.actions.act_window',
+    'report': 'ir.actions.report.xml',
+}
+
+# the xml ids referred to by ref() in the expressions of <field eval="...">
+EVAL_REF_RE = re.compile(r"""\bref\(\s*['"]([\w.-]+)['"]\s*\)""")
+
 class xml_import(object):
 
     @staticmethod
@@ -792,11 +808,54 @@ form: module.record_id""" % (xml_id,)
             cr, self.uid, id_str,
             raise_if_not_found=raise_if_not_found)
 
+    def _full_xmlid(self, xmlid):
+        return xmlid if '.' in xmlid else '%s.%s' % (self.module, xmlid)
+
+    def _prefetch(self, cr, nodes):
+        """ Prefetch the xml ids declared and referred to by ``nodes``, which
+        must only contain tags of :data:`DECLARATIVE_TAGS`.
+        """
+        records = []
+        xmlids = set()
+        for node in nodes:
+            xmlid = node.get('id') or (node.tag == 'template' and node.get('t-name'))
+            if xmlid:
+                xmlid = self._full_xmlid(xmlid)
+                records.append((DECLARATIVE_TAGS[node.tag] or node.get('model'), xmlid))
+                xmlids.add(xmlid)
+            for attr in ('parent', 'action', 'inherit_id', 'groups'):
+                for ref in node.get(attr, '').split(','):
+                    if ref.strip('- '):
+                        xmlids.add(self._full_xmlid(ref.strip('- ')))
+            for field in node.iter('field'):
+                if field.get('ref'):
+                    xmlids.add(self._full_xmlid(field.get('ref')))
+                for ref in EVAL_REF_RE.findall(field.get('eval', '')):
+                    xmlids.add(self._full_xmlid(ref))
+        model_data = self.pool['ir.model.data']
+        model_data._prefetch_update(cr, self.uid, records)
+        model_data._prefetch_xmlids(cr, self.uid, xmlids)
+
     def parse(self, de, mode=None):
         roots = ['openerp','data','odoo']
         if de.tag not in roots:
             raise Exception("Root xml tag must be <openerp>, <odoo> or <data>.")
-        for rec in de:
+        # Consecutive declarative tags are prefetched together; the other tags
+        # discard the prefetched data, as they may modify any record.
+        is_barrier = lambda node: node.tag in roots or \
+            (node.tag in self._tags and node.tag not in DECLARATIVE_TAGS)
+        prefetched = False
+        # <template> moves its element: iterate on a copy of the children
+        children = list(de)
+        for index, rec in enumerate(children):
+            if is_barrier(rec):
+                self.pool['ir.model.data']._prefetched(self.cr).clear()
+                prefetched = False
+            elif rec.tag in DECLARATIVE_TAGS and not prefetched:
+                self._prefetch(self.cr, [node for node in itertools.takewhile(
+                    lambda node: not is_barrier(node), children[index:]
+                ) if node.tag in DECLARATIVE_TAGS])
+                prefetched = True
             if rec.tag in roots:
                 self.parse(rec, mode)
             elif rec.tag in self._tags:
@@ -834,7 +893,10 @@ form: module.record_id""" % (xml_id,)
             'assert': self._tag_assert,
         }
 
-def convert_file(cr, module, filename, idref, mode='update', noupdate=False, kind=None, report=None, pathname=None):
+def convert_file(cr, module, filename, idref, mode='update', noupdate=False, kind=None, report=None, pathname=None, parser=None):
+    """ Load the data file ``filename`` of ``module``. The XML documents are
+    given by ``parser`` if provided (see :class:`DataFileParser`).
+    """
     if pathname is None:
         pathname = os.path.join(module, filename)
     fp = misc.file_open(pathname)
@@ -848,7 +910,8 @@ def convert_file(cr, module, filename, idref, mode='update', noupdate=False, kin
         elif ext == '.yml':
             convert_yaml_import(cr, module, fp, kind, idref, mode, noupdate, report)
         elif ext == '.xml':
-            convert_xml_import(cr, module, fp, idref, mode, noupdate, report)
+            doc = parser.parse(module, filename) if parser else None
+            convert_xml_import(cr, module, fp, idref, mode, noupdate, report, doc=doc)
         elif ext == '.js':
             pass # .js files are valid but ignored here.
         else:
@@ -917,16 +980,67 @@ def convert_csv_import(cr, module, fname, csvcontent, idref=None, mode='init',
         pickle.dump(data, file(config.get('import_partial'),'wb'))
         cr.commit()
 
-def convert_xml_import(cr, module, xmlfile, idref=None, mode='init', noupdate=False, report=None):
+_relaxng = threading.local()
+
+def _relaxng_validator():
+    """ Return the validator of XML data files of the current thread; the
+    validators of lxml cannot be used by several threads at once.
+    """
+    validator = getattr(_relaxng, 'validator', None)
+    if validator is None:
+        validator = _relaxng.validator = etree.RelaxNG(
+            etree.parse(os.path.join(config['root_path'], 'import_xml.rng')))
+    return validator
+
+def parse_xml_data(xmlfile):
+    """ Parse the XML data file ``xmlfile`` (a path or a file object), and
+    validate it against ``import_xml.rng``; return the parsed document.
+    """
     doc = etree.parse(xmlfile)
-    relaxng = etree.RelaxNG(
-        etree.parse(os.path.join(config['root_path'],'import_xml.rng' )))
+    relaxng = _relaxng_validator()
     try:
         relaxng.assert_(doc)
     except Exception:
         _logger.info('The XML file does not fit the required schema !', exc_info=True)
         _logger.info(misc.ustr(relaxng.error_log.last_error))
         raise
+    return doc
+
+class DataFileParser(object):
+    """ Parse and validate XML data files in a pool of threads, ahead of
+    their loading. lxml releases the GIL while it parses and validates files,
+    so the threads actually run in parallel with the loading of data.
+
+    :param workers: the number of threads of the pool
+    """
+    def __init__(self, workers):
+        self.pool = ThreadPool(workers)
+        self.results = {}
+
+    def submit(self, module, filename):
+        """ Start parsing the XML data file ``filename`` of ``module``. """
+        if filename.lower().endswith('.xml') and (module, filename) not in self.results:
+            pathname = openerp.modules.get_module_resource(module, *filename.split('/'))
+            if pathname:
+                self.results[(module, filename)] = self.pool.apply_async(parse_xml_data, (pathname,))
+
+    def parse(self, module, filename):
+        """ Return the parsed document of the XML data file ``filename`` of
+        ``module``, or ``None`` if it was not submitted.
+        """
+        result = self.results.pop((module, filename), None)
+        return result.get() if result is not None else None
+
+    def close(self):
+        self.results.clear()
+        self.pool.terminate()
+
+def convert_xml_import(cr, module, xmlfile, idref=None, mode='init', noupdate=False, report=None, doc=None):
+    """ Load the XML data file ``xmlfile``; ``doc`` is its parsed and
+    validated document, if already available.
+    """
+    if doc is None:
+        doc = parse_xml_data(xmlfile)
 
     if idref is None:
         idref={}
@@ -935,5 +1049,8 @@ def convert_xml_import(cr, module, xmlfile, idref=None, mode='init', noupdate=Fa
     else:
         xml_filename = xmlfile
     obj = xml_import(cr, module, idref, mode, report=report, noupdate=noupdate, xml_filename=xml_filename)
-    obj.parse(doc.getroot(), mode=mode)
+    try:
+        obj.parse(doc.getroot(), mode=mode)
+    finally:
+        obj.pool['ir.model.data']._prefetched(cr).clear()
     return True
@@ -1,36 +1,48 @@
 # -*- coding: utf-8 -*-
-# taken from http://code.activestate.com/recipes/252524-length-limited-o1-lru-cache-implementation/
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
 import threading
-from func import synchronized
+from collections import OrderedDict
 
 __all__ = ['LRU']
 
-class LRUNode(object):
-    __slots__ = ['prev', 'next', 'me']
-    def __init__(self, prev, me):
-        self.prev = prev
-        self.me = me
-        self.next = None
+
+class LRUShard(object):
+    """ A length-limited LRU mapping protected by its own lock. """
+    __slots__ = ['lock', 'count', 'd', 'hit', 'miss', 'eviction']
+
+    def __init__(self, count):
+        self.lock = threading.Lock()
+        self.count = count
+        self.d = OrderedDict()
+        self.hit = 0
+        self.miss = 0
+        self.eviction = 0
+
 
 class LRU(object):
+    """ Length-limited LRU mapping.
+
+    The entries are split in shards by the hash of their key, and every shard
+    is an :class:`~collections.OrderedDict` with its own lock, so that
+    concurrent threads rarely wait for each other. Each shard holds at most
+    ``count / shards`` entries, and evicts its least recently used entry when
+    it is full. The numbers of hits, misses and evictions are counted.
     """
-    Implementation of a length-limited O(1) LRU queue.
-    Built for and used by PyPE:
-    http://pype.sourceforge.net
-    Copyright 2003 Josiah Carlson.
-    """
-    def __init__(self, count, pairs=[]):
-        self._lock = threading.RLock()
+    def __init__(self, count, pairs=[], shards=None):
         self.count = max(count, 1)
-        self.d = {}
-        self.first = None
-        self.last = None
+        if shards is None:
+            # shards of at least 256 entries, at most 16 shards
+            shards = min(max(self.count // 256, 1), 16)
+        size = -(-self.count // shards)         # ceil(count / shards)
+        self._shards = [LRUShard(size) for _ in xrange(shards)]
         for key, value in pairs:
             self[key] = value
 
-    @synchronized()
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
     def __contains__(self, obj):
-        return obj in self.d
+        return obj in self._shard(obj).d
 
     def get(self, obj, val=None):
         try:
@@ -38,89 +50,78 @@ class LRU(object):
         except KeyError:
             return val
 
-    @synchronized()
     def __getitem__(self, obj):
-        a = self.d[obj].me
-        self[a[0]] = a[1]
-        return a[1]
+        shard = self._shard(obj)
+        with shard.lock:
+            try:
+                val = shard.d.pop(obj)
+            except KeyError:
+                shard.miss += 1
+                raise
+            shard.d[obj] = val
+            shard.hit += 1
+            return val
 
-    @synchronized()
     def __setitem__(self, obj, val):
-        if obj in self.d:
-            del self[obj]
-        nobj = LRUNode(self.last, (obj, val))
-        if self.first is None:
-            self.first = nobj
-        if self.last:
-            self.last.next = nobj
-        self.last = nobj
-        self.d[obj] = nobj
-        if len(self.d) > self.count:
-            if self.first == self.last:
-                self.first = None
-                self.last = None
-                return
-            a = self.first
-            a.next.prev = None
-            self.first = a.next
-            a.next = None
-            del self.d[a.me[0]]
-            del a
-
-    @synchronized()
+        shard = self._shard(obj)
+        with shard.lock:
+            d = shard.d
+            d.pop(obj, None)
+            d[obj] = val
+            if len(d) > shard.count:
+                d.popitem(last=False)
+                shard.eviction += 1
+
     def __delitem__(self, obj):
-        nobj = self.d[obj]
-        if nobj.prev:
-            nobj.prev.next = nobj.next
-        else:
-            self.first = nobj.next
-        if nobj.next:
-            nobj.next.prev = nobj.prev
-        else:
-            self.last = nobj.prev
-        del self.d[obj]
-
-    @synchronized()
+        shard = self._shard(obj)
+        with shard.lock:
+            del shard.d[obj]
+
     def __iter__(self):
-        cur = self.first
-        while cur is not None:
-            cur2 = cur.next
-            yield cur.me[1]
-            cur = cur2
+        return self.itervalues()
 
-    @synchronized()
     def __len__(self):
-        return len(self.d)
+        return sum(len(shard.d) for shard in self._shards)
 
-    @synchronized()
     def iteritems(self):
-        cur = self.first
-        while cur is not None:
-            cur2 = cur.next
-            yield cur.me
-            cur = cur2
+        for shard in self._shards:
+            with shard.lock:
+                items = shard.d.items()
+            for item in items:
+                yield item
 
-    @synchronized()
     def iterkeys(self):
-        return iter(self.d)
+        return iter(self.keys())
 
-    @synchronized()
     def itervalues(self):
-        for i,j in self.iteritems():
-            yield j
+        for key, val in self.iteritems():
+            yield val
 
-    @synchronized()
     def keys(self):
-        return self.d.keys()
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend(shard.d)
+        return result
 
-    @synchronized()
-    def pop(self,key):
-        v=self[key]
-        del self[key]
-        return v
+    def pop(self, key):
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.d.pop(key)
 
-    @synchronized()
     def clear(self):
-        self.d = {}
-        self.first = None
-        self.last = None
+        for shard in self._shards:
+            with shard.lock:
+                shard.d.clear()
+
+    @property
+    def hit(self):
+        return sum(shard.hit for shard in self._shards)
+
+    @property
+    def miss(self):
+        return sum(shard.miss for shard in self._shards)
+
+    @property
+    def eviction(self):
+        return sum(shard.eviction for shard in self._shards)
@@ -20,6 +20,7 @@ from psycopg2 import OperationalError
 from types import CodeType
 import logging
 
+from .lru import LRU
 from .misc import ustr
 
 import openerp
@@ -161,6 +162,23 @@ def test_expr(expr, allowed_codes, mode="eval"):
     return code_obj
 
 
+# code objects of the expressions evaluated by safe_eval(); it is bounded, as
+# expressions often embed ids and literal values
+_safe_code_cache = LRU(8192)
+
+def safe_compile(expr, mode="eval"):
+    """safe_compile(expression[, mode]) -> code_object
+
+    Same as ``test_expr(expr, _SAFE_OPCODES, mode)``, with the resulting code
+    object memoized, so that an expression is compiled and checked only once.
+    """
+    key = (expr, mode)
+    try:
+        return _safe_code_cache[key]
+    except KeyError:
+        code_obj = _safe_code_cache[key] = test_expr(expr, _SAFE_OPCODES, mode=mode)
+        return code_obj
+
 def const_eval(expr):
     """const_eval(expression) -> value
 
@@ -293,7 +311,7 @@ def safe_eval(expr, globals_dict=None, locals_dict=None, mode="eval", nocopy=Fal
         if locals_dict is None:
             locals_dict = {}
         locals_dict.update(_BUILTINS)
-    c = test_expr(expr, _SAFE_OPCODES, mode=mode)
+    c = safe_compile(expr, mode=mode)
     try:
         return eval(c, globals_dict, locals_dict)
     except openerp.exceptions.except_orm:
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+""" Storage of the HTTP sessions.
+
+The store is selected by the option ``session_store``:
+
+* ``filesystem`` (default): a :class:`FilesystemSessionStore`, which keeps
+  every session in a file of ``session_dir``, in a subdirectory named after
+  the first characters of the session id, so that no directory gets huge;
+
+* ``postgresql``: a :class:`PostgreSQLSessionStore`, which keeps the sessions
+  in a table of the database ``session_db`` (mandatory); that store can be
+  shared by several servers.
+
+A session is only written when its content changed since it was loaded, or
+when it has not been written for :data:`SESSION_REFRESH` seconds, which keeps
+active sessions alive. The sessions that have not been written for
+:data:`SESSION_MAX_AGE` seconds are removed by a background thread (see
+:func:`start_gc`) instead of the requests.
+"""
+import cPickle
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+import psycopg2
+import werkzeug.contrib.sessions
+
+from .config import config
+
+_logger = logging.getLogger(__name__)
+
+SESSION_MAX_AGE = 60 * 60 * 24 * 7      # 1 week
+SESSION_REFRESH = 60 * 60               # 1 hour
+SESSION_GC_INTERVAL = 60 * 60           # 1 hour
+GC_BATCH_SIZE = 1000
+
+
+class SessionStore(werkzeug.contrib.sessions.SessionStore):
+    """ Base class of the session stores. The sessions returned by a store
+    have an attribute ``stored``, which is ``(sid, data, timestamp)`` for
+    the last version of the session read or written by the store, and
+    ``None`` for new sessions. The backends implement :meth:`_read`,
+    :meth:`_write` and :meth:`_delete`.
+
+    :param path: the directory where the files attached to the sessions are
+        kept (see :meth:`~openerp.http.OpenERPSession.save_request_data`)
+    """
+    def __init__(self, path, session_class=None, max_age=SESSION_MAX_AGE):
+        super(SessionStore, self).__init__(session_class)
+        self.path = path
+        self.max_age = max_age
+
+    def _read(self, sid):
+        """ Return the pair ``(data, timestamp)`` of session ``sid``, or
+        ``(None, None)`` if there is no such session.
+        """
+        raise NotImplementedError()
+
+    def _write(self, sid, data):
+        """ Store ``data`` as the content of session ``sid``. """
+        raise NotImplementedError()
+
+    def _delete(self, sid):
+        """ Remove session ``sid``, if it exists. """
+        raise NotImplementedError()
+
+    def get(self, sid):
+        if not self.is_valid_key(sid):
+            return self.new()
+        data, timestamp = self._read(sid)
+        if data is None:
+            return self.session_class({}, sid, False)
+        try:
+            values = cPickle.loads(data)
+        except Exception:
+            values = {}
+        session = self.session_class(values, sid, False)
+        session.stored = (sid, data, timestamp)
+        return session
+
+    def save(self, session):
+        data = cPickle.dumps(dict(session), cPickle.HIGHEST_PROTOCOL)
+        self._write(session.sid, data)
+        session.stored = (session.sid, data, time.time())
+
+    def save_if_modified(self, session):
+        """ Save ``session`` if it is new and modified, if its content or id
+        changed since it was loaded, or if it must be written again to remain
+        alive.
+        """
+        if session.stored is None:
+            if session.should_save:
+                self.save(session)
+            return
+        sid, data, timestamp = session.stored
+        if sid != session.sid or timestamp + SESSION_REFRESH < time.time():
+            self.save(session)
+        elif cPickle.dumps(dict(session), cPickle.HIGHEST_PROTOCOL) != data:
+            # the pickles of equal dicts may differ by the order of their keys
+            if cPickle.loads(data) != dict(session):
+                self.save(session)
+
+    def delete(self, session):
+        self._delete(session.sid)
+        session.stored = None
+
+    def gc(self):
+        """ Remove the expired sessions. """
+        _unlink_older(self.path, time.time() - self.max_age)
+
+
+def _unlink_older(path, deadline):
+    """ Remove the files of directory ``path`` modified before ``deadline``. """
+    for fname in os.listdir(path):
+        fpath = os.path.join(path, fname)
+        try:
+            if os.path.isfile(fpath) and os.path.getmtime(fpath) < deadline:
+                os.unlink(fpath)
+        except OSError:
+            pass
+
+
+class FilesystemSessionStore(SessionStore):
+    """ Store the sessions in files, in subdirectories of ``path`` named
+    after the first two characters of the session ids. The files of the
+    former flat layout are still read, and expire like the others.
+    """
+    filename_template = 'werkzeug_%s.sess'
+
+    def _filenames(self, sid):
+        fname = self.filename_template % sid
+        return os.path.join(self.path, sid[:2], fname), os.path.join(self.path, fname)
+
+    def _read(self, sid):
+        for fname in self._filenames(sid):
+            try:
+                with open(fname, 'rb') as f:
+                    return f.read(), os.fstat(f.fileno()).st_mtime
+            except IOError:
+                pass
+        return None, None
+
+    def _write(self, sid, data):
+        fname = self._filenames(sid)[0]
+        dirname = os.path.dirname(fname)
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname, 0700)
+            except OSError:
+                if not os.path.isdir(dirname):
+                    raise
+        # write atomically, so that a session is never read half-written
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=dirname)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmp, fname)
+
+    def _delete(self, sid):
+        for fname in self._filenames(sid):
+            try:
+                os.unlink(fname)
+            except OSError:
+                pass
+
+    def gc(self):
+        # several processes share the directory: sweep it once per interval
+        marker = os.path.join(self.path, '.gc')
+        try:
+            if time.time() < os.path.getmtime(marker) + SESSION_GC_INTERVAL:
+                return
+        except OSError:
+            pass
+        open(marker, 'a').close()
+        os.utime(marker, None)
+
+        deadline = time.time() - self.max_age
+        _unlink_older(self.path, deadline)
+        for name in os.listdir(self.path):
+            shard = os.path.join(self.path, name)
+            if len(name) == 2 and os.path.isdir(shard):
+                _unlink_older(shard, deadline)
+
+
+class PostgreSQLSessionStore(SessionStore):
+    """ Store the sessions in the table ``http_session`` of database
+    ``db_name``, which is created if necessary.
+    """
+    def __init__(self, path, db_name, session_class=None, max_age=SESSION_MAX_AGE):
+        super(PostgreSQLSessionStore, self).__init__(path, session_class, max_age)
+        self.db_name = db_name
+        self._table_checked = False
+
+    def _cursor(self):
+        import openerp.sql_db
+        cr = openerp.sql_db.db_connect(self.db_name).cursor()
+        if not self._table_checked:
+            self._create_table(cr)
+            self._table_checked = True
+        return cr
+
+    def _create_table(self, cr):
+        cr.execute("SELECT 1 FROM pg_class WHERE relname='http_session' AND relkind='r'")
+        if cr.fetchone():
+            return
+        try:
+            cr.execute("""CREATE TABLE http_session (
+                              sid varchar PRIMARY KEY,
+                              data bytea NOT NULL,
+                              write_date timestamp NOT NULL)""", log_exceptions=False)
+            cr.execute("CREATE INDEX http_session_write_date_index ON http_session (write_date)")
+            cr.commit()
+        except psycopg2.ProgrammingError:
+            # created meanwhile by another process
+            cr.rollback()
+
+    def _read(self, sid):
+        with self._cursor() as cr:
+            cr.execute("""SELECT data, extract(epoch FROM write_date)
+                          FROM http_session WHERE sid=%s""", (sid,))
+            row = cr.fetchone()
+        return (str(row[0]), row[1]) if row else (None, None)
+
+    def _write(self, sid, data):
+        with self._cursor() as cr:
+            cr.execute("""UPDATE http_session
+                          SET data=%s, write_date=(now() at time zone 'UTC')
+                          WHERE sid=%s""", (psycopg2.Binary(data), sid))
+            if not cr.rowcount:
+                try:
+                    with cr.savepoint():
+                        cr.execute("""INSERT INTO http_session (sid, data, write_date)
+                                      VALUES (%s, %s, (now() at time zone 'UTC'))""",
+                                   (sid, psycopg2.Binary(data)), log_exceptions=False)
+                except psycopg2.IntegrityError:
+                    # inserted meanwhile by a concurrent request, which wins
+                    pass
+
+    def _delete(self, sid):
+        with self._cursor() as cr:
+            cr.execute("DELETE FROM http_session WHERE sid=%s", (sid,))
+
+    def gc(self):
+        super(PostgreSQLSessionStore, self).gc()
+        # delete in small transactions, to keep the locks short
+        while True:
+            with self._cursor() as cr:
+                cr.execute("""DELETE FROM http_session WHERE sid IN (
+                                  SELECT sid FROM http_session
+                                  WHERE write_date < (now() at time zone 'UTC') - %s * interval '1 second'
+                                  LIMIT %s)""", (self.max_age, GC_BATCH_SIZE))
+                count = cr.rowcount
+            if count < GC_BATCH_SIZE:
+                break
+
+
+def make_store(session_class=None):
+    """ Return a new session store, as configured. """
+    path = config.session_dir
+    if config.get('session_store') == 'postgresql':
+        db_name = config.get('session_db')
+        if not db_name:
+            raise ValueError("The PostgreSQL session store requires a database (--session-db)")
+        _logger.debug('HTTP sessions stored in database: %s', db_name)
+        return PostgreSQLSessionStore(path, db_name, session_class)
+    _logger.debug('HTTP sessions stored in: %s', path)
+    return FilesystemSessionStore(path, session_class)
+
+
+def start_gc(store, interval=SESSION_GC_INTERVAL):
+    """ Start a daemon thread that removes the expired sessions of ``store``
+    about every ``interval`` seconds.
+    """
+    def loop():
+        while True:
+            # spread the sweeps of the processes of the server
+            time.sleep(random.uniform(0.5, 1.5) * interval)
+            try:
+                store.gc()
+            except Exception:
+                _logger.exception("Cannot remove the expired HTTP sessions")
+
+    thread = threading.Thread(target=loop, name="openerp.http.session_gc")
+    thread.setDaemon(True)
+    thread.start()
+    return thread
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+""" Static copies of the asset bundles.
+
+The bundles generated by :class:`~openerp.addons.base.ir.ir_qweb.AssetsBundle`
+are copied once to the directory ``assets`` of ``data_dir``, with gzip (and
+brotli, if available) precompressed variants. Their urls contain the sha1 of
+their content::
+
+    /web/assets/<sha1>/<filename>
+
+so that they never change, and can be cached forever by the browsers. Those
+urls are served by :func:`get_response` without any database access; a file
+missing on this server is handled by the regular controller of the url, which
+copies it from its attachment first.
+"""
+import cStringIO
+import gzip
+import logging
+import os
+import re
+import tempfile
+
+import werkzeug.http
+import werkzeug.wrappers
+import werkzeug.wsgi
+
+from .config import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_logger = logging.getLogger(__name__)
+
+URL_PREFIX = '/web/assets/'
+URL_RE = re.compile(r'^/web/assets/([0-9a-f]{40})/([\w.-]+\.(js|css))$')
+MAX_AGE = 60 * 60 * 24 * 365            # 1 year
+
+MIMETYPES = {
+    'js': 'application/javascript',
+    'css': 'text/css',
+}
+
+# content encodings, by order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def path():
+    """ Return the directory of the static copies. """
+    return os.path.join(config['data_dir'], 'assets')
+
+
+def _filename(checksum, extension):
+    return os.path.join(path(), checksum[:2], '%s.%s' % (checksum, extension))
+
+
+def _write(fname, data):
+    """ Write ``data`` atomically to file ``fname``. """
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(fname))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.rename(tmp, fname)
+
+
+def save(checksum, filename, get_content):
+    """ Make the static copy of a bundle file, unless it already exists, and
+    return its url.
+
+    :param checksum: the sha1 of the file content
+    :param filename: the name of the file in the url, ending by ``.js`` or
+        ``.css``
+    :param get_content: a function returning the file content, only called
+        if the copy does not exist yet
+    """
+    url = '%s%s/%s' % (URL_PREFIX, checksum, filename)
+    extension = filename.rsplit('.', 1)[-1]
+    fname = _filename(checksum, extension)
+    if os.path.exists(fname):
+        return url
+
+    dirname = os.path.dirname(fname)
+    if not os.path.isdir(dirname):
+        try:
+            os.makedirs(dirname, 0700)
+        except OSError:
+            if not os.path.isdir(dirname):
+                raise
+    content = get_content()
+    # the compressed variants are written first: a file is only served
+    # once its variants exist
+    buf = cStringIO.StringIO()
+    with gzip.GzipFile(filename='', mode='wb', fileobj=buf, mtime=0) as f:
+        f.write(content)
+    _write(fname + '.gz', buf.getvalue())
+    if brotli is not None:
+        _write(fname + '.br', brotli.compress(content, mode=brotli.MODE_TEXT))
+    _write(fname, content)
+    _logger.debug('static copy of %s written to %s', filename, fname)
+    return url
+
+
+def get_response(environ):
+    """ Return a response serving the static copy requested by ``environ``,
+    or ``None`` if the request is not for an existing static copy.
+    """
+    match = URL_RE.match(environ.get('PATH_INFO', ''))
+    if not match:
+        return None
+    checksum, _name, extension = match.groups()
+    fname = _filename(checksum, extension)
+    if not os.path.exists(fname):
+        return None
+
+    headers = [('Vary', 'Accept-Encoding')]
+    accepted = environ.get('HTTP_ACCEPT_ENCODING', '')
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.exists(fname + suffix):
+            fname += suffix
+            headers.append(('Content-Encoding', encoding))
+            break
+
+    response = werkzeug.wrappers.Response(
+        mimetype=MIMETYPES[extension], headers=headers, direct_passthrough=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = MAX_AGE
+    response.cache_control['immutable'] = None
+    response.set_etag(checksum)
+    if werkzeug.http.is_resource_modified(environ, etag=checksum):
+        f = open(fname, 'rb')
+        response.content_length = os.fstat(f.fileno()).st_size
+        response.response = werkzeug.wsgi.wrap_file(environ, f)
+    else:
+        response.status_code = 304
+    return response
@@ -0,0 +1,74 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+""" Benchmark of the translation of domains into SQL by
+:mod:`openerp.osv.expression`, with and without the compiled domains.
+
+Run it on an existing database with::
+
+    setup/domain_bench.py -d <database> [--count N]
+"""
+import optparse
+import sys
+import time
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, abspath(join(dirname(__file__), '..')))
+
+import openerp
+from openerp import SUPERUSER_ID
+from openerp.osv import expression
+
+
+def domains(count):
+    """ Return ``count`` domains of a few shapes, with different values. """
+    shapes = [
+        lambda i: [('active', '=', 1), ('customer', '=', True), ('name', 'ilike', 'name%d' % i)],
+        lambda i: [('active', '=', 1), ('id', 'in', range(i % 20 + 1, i % 20 + 11))],
+        lambda i: ['|', ('email', '=ilike', 'user%d@example.com' % i), ('ref', '=', 'REF%d' % i),
+                   ('company_id', 'in', [1, False]), ('write_date', '>=', '2015-01-01 00:00:%02d' % (i % 60))],
+    ]
+    return [shapes[i % len(shapes)](i) for i in xrange(count)]
+
+
+def run(func, doms):
+    start = time.time()
+    for domain in doms:
+        func(domain)
+    return (time.time() - start) / len(doms)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-d', '--database', dest='db_name')
+    parser.add_option('-c', '--config', dest='config')
+    parser.add_option('--count', type='int', default=20000, help="number of domains")
+    opts, _ = parser.parse_args()
+    if not opts.db_name:
+        parser.error("a database is required")
+    args = ['-d', opts.db_name] + (['-c', opts.config] if opts.config else [])
+    openerp.tools.config.parse_config(args)
+
+    registry = openerp.registry(opts.db_name)
+    doms = domains(opts.count)
+    with registry.cursor() as cr:
+        model = registry['res.partner']
+        context = {}
+
+        def parse(domain):
+            e = expression.expression(cr, SUPERUSER_ID, domain, model, context)
+            e.get_tables()
+            e.to_sql()
+
+        def compiled(domain):
+            expression.domain_to_sql(cr, SUPERUSER_ID, domain, model, context)
+
+        registry.clear_cache('domains')
+        for name, func in [('parse', parse), ('compiled', compiled)]:
+            duration = run(func, doms)
+            print "%-10s %8.1f us per domain" % (name, duration * 1e6)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+""" Microbenchmark of :class:`openerp.tools.lru.LRU` against the previous
+linked-list implementation, guarded by a single reentrant lock.
+
+Run it with::
+
+    setup/lru_bench.py [--threads N] [--ops N]
+"""
+import optparse
+import random
+import sys
+import threading
+import time
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, abspath(join(dirname(__file__), '..')))
+
+from openerp.tools.func import synchronized
+from openerp.tools.lru import LRU
+
+
+class LRUNode(object):
+    __slots__ = ['prev', 'next', 'me']
+    def __init__(self, prev, me):
+        self.prev = prev
+        self.me = me
+        self.next = None
+
+
+class LinkedLRU(object):
+    """ The previous implementation of LRU (only the benchmarked methods). """
+    def __init__(self, count):
+        self._lock = threading.RLock()
+        self.count = max(count, 1)
+        self.d = {}
+        self.first = None
+        self.last = None
+
+    def get(self, obj, val=None):
+        try:
+            return self[obj]
+        except KeyError:
+            return val
+
+    @synchronized()
+    def __getitem__(self, obj):
+        a = self.d[obj].me
+        self[a[0]] = a[1]
+        return a[1]
+
+    @synchronized()
+    def __setitem__(self, obj, val):
+        if obj in self.d:
+            del self[obj]
+        nobj = LRUNode(self.last, (obj, val))
+        if self.first is None:
+            self.first = nobj
+        if self.last:
+            self.last.next = nobj
+        self.last = nobj
+        self.d[obj] = nobj
+        if len(self.d) > self.count:
+            if self.first == self.last:
+                self.first = None
+                self.last = None
+                return
+            a = self.first
+            a.next.prev = None
+            self.first = a.next
+            a.next = None
+            del self.d[a.me[0]]
+            del a
+
+    @synchronized()
+    def __delitem__(self, obj):
+        nobj = self.d[obj]
+        if nobj.prev:
+            nobj.prev.next = nobj.next
+        else:
+            self.first = nobj.next
+        if nobj.next:
+            nobj.next.prev = nobj.prev
+        else:
+            self.last = nobj.prev
+        del self.d[obj]
+
+
+def workload(cache, keys, ops):
+    """ ormcache-like access pattern: mostly hits, a miss fills the cache. """
+    for key in keys[:ops]:
+        try:
+            cache[key]
+        except KeyError:
+            cache[key] = key
+
+
+def run(klass, nthreads, ops, count=8192):
+    cache = klass(count)
+    rnd = random.Random(42)
+    # skewed keys like ormcache keys: (model, method, args)
+    population = [('res.partner', 'method%d' % (i % 16), i) for i in xrange(count * 2)]
+    keys = [[population[int(rnd.paretovariate(1.2)) % len(population)] for _ in xrange(ops)]
+            for _ in xrange(nthreads)]
+    threads = [threading.Thread(target=workload, args=(cache, keys[n], ops)) for n in xrange(nthreads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--threads', type='int', default=8)
+    parser.add_option('--ops', type='int', default=200000, help="operations per thread")
+    opts, _ = parser.parse_args()
+    for nthreads in sorted(set([1, opts.threads])):
+        total = nthreads * opts.ops
+        for name, klass in [('linked list', LinkedLRU), ('sharded', LRU)]:
+            duration = run(klass, nthreads, opts.ops)
+            print "%-12s %2d thread(s): %8.0f ops/s (%.2fs)" % (name, nthreads, total / duration, duration)
+
+
+if __name__ == '__main__':
+    main()